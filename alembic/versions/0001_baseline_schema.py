@@ -0,0 +1,117 @@
+"""Baseline schema: races, horses, analyses, bets, bankroll, risk parameters
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 19:00:00
+
+The schema the app's create_all() built before migrations existed. Mark such a
+database with `alembic stamp 0001`, then `alembic upgrade head`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def timestamps():
+    return [sa.Column("created_at", sa.DateTime()), sa.Column("updated_at", sa.DateTime())]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "races",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("race_date", sa.DateTime()),
+        sa.Column("track", sa.String()),
+        sa.Column("distance", sa.Integer()),
+        sa.Column("race_type", sa.String()),
+        sa.Column("class_rating", sa.Integer()),
+        sa.Column("total_runners", sa.Integer()),
+        *timestamps(),
+    )
+    op.create_index("ix_races_id", "races", ["id"])
+
+    op.create_table(
+        "horses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("race_id", sa.Integer(), sa.ForeignKey("races.id")),
+        sa.Column("name", sa.String()),
+        sa.Column("jockey", sa.String()),
+        sa.Column("trainer", sa.String()),
+        sa.Column("odds", sa.Float()),
+        sa.Column("starting_position", sa.Integer()),
+        sa.Column("weight", sa.Float()),
+        sa.Column("last_race_days", sa.Integer()),
+        sa.Column("wins", sa.Integer()),
+        sa.Column("places", sa.Integer()),
+        sa.Column("starts", sa.Integer()),
+        sa.Column("avg_position", sa.Float()),
+        *timestamps(),
+    )
+    op.create_index("ix_horses_id", "horses", ["id"])
+
+    op.create_table(
+        "race_analysis",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("race_id", sa.Integer(), sa.ForeignKey("races.id"), unique=True),
+        sa.Column("winner_prediction", sa.String()),
+        sa.Column("confidence_score", sa.Float()),
+        sa.Column("stake_recommendation", sa.Float()),
+        sa.Column("expected_profit", sa.Float()),
+        sa.Column("analysis_reasoning", sa.Text()),
+        sa.Column("risk_assessment", sa.Text()),
+        sa.Column("analysis_date", sa.DateTime()),
+        *timestamps(),
+    )
+    op.create_index("ix_race_analysis_id", "race_analysis", ["id"])
+
+    op.create_table(
+        "bets",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("race_id", sa.Integer(), sa.ForeignKey("races.id")),
+        sa.Column("horse_id", sa.Integer(), sa.ForeignKey("horses.id")),
+        sa.Column("stake", sa.Float()),
+        sa.Column("odds", sa.Float()),
+        sa.Column("bet_type", sa.String()),
+        sa.Column("placed_at", sa.DateTime()),
+        sa.Column("result", sa.String()),
+        sa.Column("profit", sa.Float()),
+        *timestamps(),
+    )
+    op.create_index("ix_bets_id", "bets", ["id"])
+
+    op.create_table(
+        "bankroll",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("current_amount", sa.Float()),
+        sa.Column("initial_amount", sa.Float()),
+        sa.Column("max_drawdown", sa.Float()),
+        sa.Column("daily_limit", sa.Float()),
+        sa.Column("weekly_limit", sa.Float()),
+        *timestamps(),
+    )
+    op.create_index("ix_bankroll_id", "bankroll", ["id"])
+
+    op.create_table(
+        "risk_parameters",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("confidence_threshold", sa.Float()),
+        sa.Column("max_stake_percentage", sa.Float()),
+        sa.Column("correlation_threshold", sa.Float()),
+        sa.Column("stop_loss_daily", sa.Float()),
+        sa.Column("stop_loss_weekly", sa.Float()),
+        *timestamps(),
+    )
+    op.create_index("ix_risk_parameters_id", "risk_parameters", ["id"])
+
+
+def downgrade() -> None:
+    for table in ("risk_parameters", "bankroll", "bets", "race_analysis", "horses", "races"):
+        op.drop_table(table)
@@ -0,0 +1,130 @@
+"""Natural keys for races and runners, keyset index, analysis batch jobs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 19:02:00
+
+Every GET /race-cards before the upsert ingest inserted the whole card again,
+so an existing database holds one copy of each race (and its runners) per
+refresh. Before the unique constraints can be created those copies are
+collapsed onto the newest row of each group, with horses, bets and the
+race analysis re-pointed at the survivor:
+
+  races   - legacy rows have no off time, so a race is identified by
+            (race_date, track, race_type) plus the names of its runners
+  horses  - (race_id, name) once their races have been merged
+
+Legacy races keep off_time NULL; the constraint treats NULLs as distinct, and
+cards ingested from now on carry the off time.
+"""
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+races = sa.table(
+    "races", sa.column("id"), sa.column("race_date"), sa.column("track"),
+    sa.column("off_time"), sa.column("race_type"),
+)
+horses = sa.table("horses", sa.column("id"), sa.column("race_id"), sa.column("name"))
+bets = sa.table("bets", sa.column("id"), sa.column("race_id"), sa.column("horse_id"))
+race_analysis = sa.table("race_analysis", sa.column("id"), sa.column("race_id"))
+
+
+def duplicate_groups(rows) -> dict:
+    """{survivor id: [duplicate ids]} for groups of rows sharing a key; the newest row survives."""
+    groups = defaultdict(list)
+    for key, row_id in rows:
+        groups[key].append(row_id)
+    return {max(ids): sorted(set(ids) - {max(ids)}) for ids in groups.values() if len(ids) > 1}
+
+
+def merge_duplicate_races(conn):
+    runners = defaultdict(set)
+    for race_id, name in conn.execute(sa.select(horses.c.race_id, horses.c.name)):
+        runners[race_id].add(name)
+    rows = [
+        ((race_date, track, off_time) if off_time is not None
+         else (race_date, track, race_type, frozenset(runners[race_id])), race_id)
+        for race_id, race_date, track, off_time, race_type in conn.execute(
+            sa.select(races.c.id, races.c.race_date, races.c.track, races.c.off_time, races.c.race_type)
+        )
+    ]
+    for survivor, duplicates in duplicate_groups(rows).items():
+        group = [survivor, *duplicates]
+        conn.execute(horses.update().where(horses.c.race_id.in_(duplicates)).values(race_id=survivor))
+        conn.execute(bets.update().where(bets.c.race_id.in_(duplicates)).values(race_id=survivor))
+        # race_analysis.race_id is unique: keep the newest analysis of the group
+        analysis_ids = conn.execute(
+            sa.select(race_analysis.c.id).where(race_analysis.c.race_id.in_(group))
+        ).scalars().all()
+        if analysis_ids:
+            keep = max(analysis_ids)
+            conn.execute(race_analysis.delete().where(
+                race_analysis.c.race_id.in_(group), race_analysis.c.id != keep
+            ))
+            conn.execute(race_analysis.update().where(race_analysis.c.id == keep).values(race_id=survivor))
+        conn.execute(races.delete().where(races.c.id.in_(duplicates)))
+
+
+def merge_duplicate_horses(conn):
+    rows = [
+        ((race_id, name), horse_id)
+        for horse_id, race_id, name in conn.execute(
+            sa.select(horses.c.id, horses.c.race_id, horses.c.name).where(horses.c.name.is_not(None))
+        )
+    ]
+    for survivor, duplicates in duplicate_groups(rows).items():
+        conn.execute(bets.update().where(bets.c.horse_id.in_(duplicates)).values(horse_id=survivor))
+        conn.execute(horses.delete().where(horses.c.id.in_(duplicates)))
+
+
+def upgrade() -> None:
+    op.add_column("races", sa.Column("off_time", sa.String()))
+
+    conn = op.get_bind()
+    merge_duplicate_races(conn)
+    merge_duplicate_horses(conn)
+
+    with op.batch_alter_table("races") as batch:
+        batch.create_unique_constraint("uq_races_natural_key", ["race_date", "track", "off_time"])
+        batch.create_index("ix_races_race_date_id", ["race_date", "id"])
+    with op.batch_alter_table("horses") as batch:
+        batch.create_unique_constraint("uq_horses_race_name", ["race_id", "name"])
+
+    op.create_table(
+        "analysis_batch_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("batch_id", sa.String(), unique=True),
+        sa.Column("race_date", sa.DateTime()),
+        sa.Column("race_ids", sa.Text()),
+        sa.Column("status", sa.String()),
+        sa.Column("succeeded", sa.Integer()),
+        sa.Column("errored", sa.Integer()),
+        sa.Column("error", sa.Text()),
+        sa.Column("submitted_at", sa.DateTime()),
+        sa.Column("completed_at", sa.DateTime()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+    op.create_index("ix_analysis_batch_jobs_id", "analysis_batch_jobs", ["id"])
+    op.create_index("ix_analysis_batch_jobs_race_date", "analysis_batch_jobs", ["race_date"])
+
+
+def downgrade() -> None:
+    # Merged duplicates are not restored
+    op.drop_table("analysis_batch_jobs")
+    with op.batch_alter_table("horses") as batch:
+        batch.drop_constraint("uq_horses_race_name", type_="unique")
+    with op.batch_alter_table("races") as batch:
+        batch.drop_index("ix_races_race_date_id")
+        batch.drop_constraint("uq_races_natural_key", type_="unique")
+        batch.drop_column("off_time")
@@ -0,0 +1,44 @@
+"""Indexes for the hot query paths: races by track, bets by race/horse/placement time
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 19:05:00
+
+Already covered by existing composite keys, so not duplicated here:
+  races.race_date (and race_date + track)  -> uq_races_natural_key (race_date, track, off_time)
+  horses.race_id                           -> uq_horses_race_name (race_id, name)
+
+On Postgres the indexes are built CONCURRENTLY so a live races/bets table keeps
+taking writes during the upgrade.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_races_track_race_date", "races", ["track", "race_date"]),
+    ("ix_bets_race_id", "bets", ["race_id"]),
+    ("ix_bets_horse_id", "bets", ["horse_id"]),
+    ("ix_bets_placed_at", "bets", ["placed_at"]),
+    ("ix_analysis_batch_jobs_status", "analysis_batch_jobs", ["status"]),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
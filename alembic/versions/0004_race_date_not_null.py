@@ -0,0 +1,34 @@
+"""races.race_date NOT NULL
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 19:10:00
+
+race_date leads the (race_date, id) keyset: a NULL there made the next-page
+predicate NULL for every row and ended GET /races early. Rows that lost their
+date through PUT /races/{id} fall back to their created_at.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE races SET race_date = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE race_date IS NULL"
+    )
+    with op.batch_alter_table("races") as batch:
+        batch.alter_column("race_date", existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("races") as batch:
+        batch.alter_column("race_date", existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,142 @@
+"""Monthly range partitions for horses (by race date) and bets (by placed_at)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 19:20:00
+
+Runners and bets are where the 5+ years of history accumulate, so on Postgres
+both become declaratively partitioned tables with one partition per month
+plus a DEFAULT partition that catches rows outside the created range:
+
+  horses - partitioned by race_date, a copy of the race's date kept in step
+           by the app; the primary key becomes (id, race_date) and the
+           natural key (race_id, race_date, name)
+  bets   - partitioned by placed_at, now NOT NULL; primary key (id, placed_at)
+
+Postgres can't point a foreign key at a partitioned table without its
+partition key, so bets.horse_id loses its foreign key on every dialect.
+races stays a plain table: every other table references races.id and it
+grows by only thousands of rows a year.
+
+Each table is rebuilt by copying into a new partitioned table, so run this
+inside a maintenance window on large databases. Partitions for months after
+the data are created by PartitionManager (src/app/services/partitions.py).
+Other dialects get the same columns and constraints without partitioning.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+# Constraints and indexes recreated on the rebuilt tables, after the data is copied
+TABLE_DDL = {
+    "horses": [
+        "ALTER TABLE horses ADD PRIMARY KEY ({pk})",
+        "ALTER TABLE horses ADD CONSTRAINT uq_horses_race_name UNIQUE (race_id, race_date, name)",
+        "ALTER TABLE horses ADD CONSTRAINT horses_race_id_fkey FOREIGN KEY (race_id) REFERENCES races (id)",
+        "CREATE INDEX ix_horses_id ON horses (id)",
+    ],
+    "bets": [
+        "ALTER TABLE bets ADD PRIMARY KEY ({pk})",
+        "ALTER TABLE bets ADD CONSTRAINT bets_race_id_fkey FOREIGN KEY (race_id) REFERENCES races (id)",
+        "CREATE INDEX ix_bets_id ON bets (id)",
+        "CREATE INDEX ix_bets_race_id ON bets (race_id)",
+        "CREATE INDEX ix_bets_horse_id ON bets (horse_id)",
+        "CREATE INDEX ix_bets_placed_at ON bets (placed_at)",
+    ],
+}
+PARTITION_KEYS = {"horses": "race_date", "bets": "placed_at"}
+
+fk_naming = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """First day of the month `months` after the one containing `value`."""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def rebuild(conn, table: str, partitioned: bool):
+    """Copy `table` into a new table, partitioned by month or plain, and swap it in."""
+    key = PARTITION_KEYS[table]
+    new = f"{table}_rebuild"
+    partition_by = f" PARTITION BY RANGE ({key})" if partitioned else ""
+    # LIKE keeps the columns, NOT NULLs and the id default; the sequence must outlive the old table
+    conn.exec_driver_sql(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+    conn.exec_driver_sql(f"CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS){partition_by}")
+    if partitioned:
+        first, last = conn.exec_driver_sql(f"SELECT min({key}), max({key}) FROM {table}").one()
+        now = datetime.utcnow()
+        month, end = add_months(first or now, 0), add_months(max(last or now, now), MONTHS_AHEAD + 1)
+        while month < end:
+            conn.exec_driver_sql(
+                f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {new} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            )
+            month = add_months(month, 1)
+        conn.exec_driver_sql(f"CREATE TABLE {table}_default PARTITION OF {new} DEFAULT")
+    conn.exec_driver_sql(f"INSERT INTO {new} SELECT * FROM {table}")
+    conn.exec_driver_sql(f"DROP TABLE {table}")
+    conn.exec_driver_sql(f"ALTER TABLE {new} RENAME TO {table}")
+    conn.exec_driver_sql(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    pk = f"id, {key}" if partitioned else "id"
+    for statement in TABLE_DDL[table]:
+        conn.exec_driver_sql(statement.format(pk=pk))
+
+
+def upgrade() -> None:
+    op.add_column("horses", sa.Column("race_date", sa.DateTime()))
+    op.execute("UPDATE horses SET race_date = (SELECT race_date FROM races WHERE races.id = horses.race_id)")
+    # Orphaned runners (no race) keep their own timestamp so they still have a partition
+    op.execute("UPDATE horses SET race_date = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE race_date IS NULL")
+    op.execute("UPDATE bets SET placed_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE placed_at IS NULL")
+
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        op.alter_column("horses", "race_date", existing_type=sa.DateTime(), nullable=False)
+        op.alter_column("bets", "placed_at", existing_type=sa.DateTime(), nullable=False)
+        # bets first: the old bets table holds the foreign key into the old horses table
+        rebuild(conn, "bets", partitioned=True)
+        rebuild(conn, "horses", partitioned=True)
+        return
+
+    with op.batch_alter_table("horses") as batch:
+        batch.alter_column("race_date", existing_type=sa.DateTime(), nullable=False)
+        batch.drop_constraint("uq_horses_race_name", type_="unique")
+        batch.create_unique_constraint("uq_horses_race_name", ["race_id", "race_date", "name"])
+    # The baseline left this foreign key unnamed; name it so batch mode can drop it
+    with op.batch_alter_table("bets", naming_convention=fk_naming) as batch:
+        batch.alter_column("placed_at", existing_type=sa.DateTime(), nullable=False)
+        batch.drop_constraint("fk_bets_horse_id_horses", type_="foreignkey")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        rebuild(conn, "horses", partitioned=False)
+        rebuild(conn, "bets", partitioned=False)
+        op.create_foreign_key("bets_horse_id_fkey", "bets", "horses", ["horse_id"], ["id"])
+        with op.batch_alter_table("horses") as batch:
+            batch.drop_constraint("uq_horses_race_name", type_="unique")
+            batch.create_unique_constraint("uq_horses_race_name", ["race_id", "name"])
+        op.alter_column("bets", "placed_at", existing_type=sa.DateTime(), nullable=True)
+        op.drop_column("horses", "race_date")
+        return
+
+    with op.batch_alter_table("bets") as batch:
+        batch.alter_column("placed_at", existing_type=sa.DateTime(), nullable=True)
+        batch.create_foreign_key("fk_bets_horse_id_horses", "horses", ["horse_id"], ["id"])
+    with op.batch_alter_table("horses") as batch:
+        batch.drop_constraint("uq_horses_race_name", type_="unique")
+        batch.create_unique_constraint("uq_horses_race_name", ["race_id", "name"])
+        batch.drop_column("race_date")
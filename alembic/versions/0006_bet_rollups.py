@@ -0,0 +1,51 @@
+"""Daily bet rollups for /analytics and the index the incremental refresh scans
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 19:30:00
+
+bet_rollups starts empty; the app's refresh worker (or POST
+/analytics/refresh?full=true) fills it from the existing bets.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "bet_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("dimension", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("bets", sa.Integer(), nullable=False),
+        sa.Column("settled", sa.Integer(), nullable=False),
+        sa.Column("wins", sa.Integer(), nullable=False),
+        sa.Column("staked", sa.Float(), nullable=False),
+        sa.Column("settled_stake", sa.Float(), nullable=False),
+        sa.Column("profit", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.UniqueConstraint("dimension", "day", "key", name="uq_bet_rollups_dimension_day_key"),
+    )
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("refreshed_through", sa.DateTime()),
+    )
+    # Not CONCURRENTLY: Postgres can't build a partitioned table's index that way
+    op.create_index("ix_bets_updated_at", "bets", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bets_updated_at", table_name="bets")
+    op.drop_table("rollup_watermarks")
+    op.drop_table("bet_rollups")
@@ -0,0 +1,62 @@
+"""Race card snapshots, the race card change feed and scratched runners
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 19:50:00
+
+Snapshots start empty: the first refresh of a day records it whole, as
+race_added changes, and later refreshes record only what differs.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "race_card_snapshots",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("race_date", sa.DateTime(), nullable=False),
+        sa.Column("cards", sa.JSON(), nullable=False),
+        sa.Column("content_hash", sa.String(), nullable=False),
+        sa.Column("etag", sa.String()),
+        sa.Column("last_modified", sa.String()),
+        sa.Column("checked_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.UniqueConstraint("source", "race_date", name="uq_race_card_snapshots_source_date"),
+    )
+    op.create_table(
+        "race_card_changes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("race_date", sa.DateTime(), nullable=False),
+        sa.Column("change_type", sa.String(), nullable=False),
+        sa.Column("race_id", sa.Integer()),
+        sa.Column("track", sa.String(), nullable=False),
+        sa.Column("off_time", sa.String()),
+        sa.Column("horse_name", sa.String()),
+        sa.Column("field", sa.String()),
+        sa.Column("old_value", sa.JSON()),
+        sa.Column("new_value", sa.JSON()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index("ix_race_card_changes_race_date_id", "race_card_changes", ["race_date", "id"])
+    # On Postgres this reaches every monthly partition of horses
+    op.add_column("horses", sa.Column("scratched_at", sa.DateTime()))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("horses") as batch:
+        batch.drop_column("scratched_at")
+    op.drop_index("ix_race_card_changes_race_date_id", table_name="race_card_changes")
+    op.drop_table("race_card_changes")
+    op.drop_table("race_card_snapshots")
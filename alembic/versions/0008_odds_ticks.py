@@ -0,0 +1,70 @@
+"""odds_ticks: runner odds history flushed from the in-memory odds store
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 20:00:00
+
+On Postgres the table is range-partitioned by recorded_at like bets (see
+0005): monthly partitions from this month to MONTHS_AHEAD months on plus a
+DEFAULT, with later months created by PartitionManager and old ones dropped
+by its retention. The primary key is (id, recorded_at) there and id is a
+BIGINT, since a busy feed can write billions of ticks.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """First day of the month `months` after the one containing `value`."""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(
+            "CREATE TABLE odds_ticks ("
+            " id BIGSERIAL NOT NULL,"
+            " horse_id INTEGER NOT NULL,"
+            " race_id INTEGER NOT NULL REFERENCES races (id),"
+            " odds DOUBLE PRECISION NOT NULL,"
+            " recorded_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,"
+            " PRIMARY KEY (id, recorded_at)"
+            ") PARTITION BY RANGE (recorded_at)"
+        )
+        month = add_months(datetime.utcnow(), 0)
+        for _ in range(MONTHS_AHEAD + 1):
+            conn.exec_driver_sql(
+                f"CREATE TABLE odds_ticks_p{month:%Y%m} PARTITION OF odds_ticks "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            )
+            month = add_months(month, 1)
+        conn.exec_driver_sql("CREATE TABLE odds_ticks_default PARTITION OF odds_ticks DEFAULT")
+    else:
+        op.create_table(
+            "odds_ticks",
+            sa.Column("id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), primary_key=True),
+            sa.Column("horse_id", sa.Integer(), nullable=False),
+            sa.Column("race_id", sa.Integer(), sa.ForeignKey("races.id"), nullable=False),
+            sa.Column("odds", sa.Float(), nullable=False),
+            sa.Column("recorded_at", sa.DateTime(), nullable=False),
+        )
+    op.create_index("ix_odds_ticks_horse_id_recorded_at", "odds_ticks", ["horse_id", "recorded_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_odds_ticks_horse_id_recorded_at", table_name="odds_ticks")
+    op.drop_table("odds_ticks")
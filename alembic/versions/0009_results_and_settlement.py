@@ -0,0 +1,40 @@
+"""Race results and bet settlement: finishing positions, when a result came in and the bankroll's peak
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 20:10:00
+
+peak_amount starts as the larger of a bankroll's initial and current
+amount; max_drawdown (percent below it) is measured from there on.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # On Postgres horses is partitioned (0005); a column added to the parent reaches every partition
+    op.add_column("horses", sa.Column("finish_position", sa.Integer()))
+    op.add_column("races", sa.Column("result_at", sa.DateTime()))
+    op.add_column("bankroll", sa.Column("peak_amount", sa.Float()))
+    op.execute(
+        "UPDATE bankroll SET peak_amount = CASE WHEN initial_amount > current_amount "
+        "THEN initial_amount ELSE current_amount END"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("bankroll") as batch:
+        batch.drop_column("peak_amount")
+    with op.batch_alter_table("races") as batch:
+        batch.drop_column("result_at")
+    with op.batch_alter_table("horses") as batch:
+        batch.drop_column("finish_position")
@@ -0,0 +1,172 @@
+"""Benchmark /analytics rollup reads against full scans of the bets table.
+
+Usage:
+    python scripts/benchmark_analytics.py [--bets 1000000] [--years 5] [--database-url URL]
+
+Migrates an empty database to head and seeds `--bets` settled bets spread
+over `--years` years of races. It then times:
+  full refresh       - building every rollup from scratch
+  incremental        - settling the latest 100 bets and folding just their days back in
+and, for monthly P&L and the by-track/by-jockey breakdowns, the median time of
+  python scan        - loading every bet into Python and aggregating there
+  sql scan           - one GROUP BY over bets (plus joins)
+  rollups            - the AnalyticsService query behind the endpoint
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from src.app import models
+from src.app.services.analytics import AnalyticsService
+
+TRACKS = ["Ascot", "Ayr", "Newmarket", "Kempton", "Leopardstown", "Haydock", "Doncaster", "Chester"]
+JOCKEYS = [f"Jockey {n}" for n in range(60)]
+START = datetime(2020, 1, 1, 12, 0)
+
+
+def seed(engine, bets: int, years: int, races_per_day: int = 8, runners: int = 8, chunk: int = 50_000):
+    rng = random.Random(7)
+    days = 365 * years
+    with engine.begin() as conn:
+        race_rows, horse_rows = [], []
+        for day in range(days):
+            for slot in range(races_per_day):
+                race_id = day * races_per_day + slot + 1
+                race_date = START + timedelta(days=day, minutes=slot * 30)
+                race_rows.append({"id": race_id, "race_date": race_date, "track": TRACKS[slot % len(TRACKS)],
+                                  "off_time": f"{12 + slot // 2}:{(slot % 2) * 30:02d}", "race_type": "Flat"})
+                for n in range(runners):
+                    horse_rows.append({"id": (race_id - 1) * runners + n + 1, "race_id": race_id, "race_date": race_date,
+                                       "name": f"Horse {race_id}-{n}", "jockey": rng.choice(JOCKEYS), "trainer": "T"})
+        conn.execute(insert(models.Race), race_rows)
+        for i in range(0, len(horse_rows), chunk):
+            conn.execute(insert(models.Horse), horse_rows[i:i + chunk])
+
+        rows = []
+        for bet_id in range(1, bets + 1):
+            race_id = rng.randrange(len(race_rows)) + 1
+            won = rng.random() < 0.2
+            stake = float(rng.choice([5, 10, 20]))
+            placed_at = race_rows[race_id - 1]["race_date"] - timedelta(hours=1)
+            rows.append({
+                "id": bet_id, "race_id": race_id, "horse_id": (race_id - 1) * runners + rng.randrange(runners) + 1,
+                "stake": stake, "odds": 4.0, "bet_type": rng.choice(["WIN", "PLACE", "EACH_WAY"]),
+                "placed_at": placed_at, "result": "WON" if won else "LOST",
+                "profit": stake * 3.0 if won else -stake, "created_at": placed_at, "updated_at": placed_at,
+            })
+            if len(rows) >= chunk:
+                conn.execute(insert(models.Bet), rows)
+                rows.clear()
+        if rows:
+            conn.execute(insert(models.Bet), rows)
+
+
+def python_scan(db, dimension: str):
+    columns = [models.Bet.placed_at, models.Bet.result, models.Bet.stake, models.Bet.profit]
+    stmt = (
+        select(*columns, models.Race.track, models.Horse.jockey)
+        .select_from(models.Bet)
+        .join(models.Race, models.Bet.race_id == models.Race.id)
+        .join(models.Horse, models.Bet.horse_id == models.Horse.id)
+    )
+    groups = defaultdict(lambda: [0, 0, 0.0])
+    for placed_at, result, stake, profit, track, jockey in db.execute(stmt):
+        key = {"month": placed_at.strftime("%Y-%m"), "track": track, "jockey": jockey}[dimension]
+        group = groups[key]
+        group[0] += 1
+        group[1] += result == "WON"
+        group[2] += profit or 0.0
+    return groups
+
+
+def sql_scan(db, dimension: str):
+    key = {
+        "month": func.strftime("%Y-%m", models.Bet.placed_at) if db.get_bind().dialect.name == "sqlite"
+        else func.date_trunc("month", models.Bet.placed_at),
+        "track": models.Race.track,
+        "jockey": models.Horse.jockey,
+    }[dimension]
+    stmt = select(key, func.count(), func.sum(models.Bet.profit)).select_from(models.Bet)
+    if dimension == "track":
+        stmt = stmt.join(models.Race, models.Bet.race_id == models.Race.id)
+    if dimension == "jockey":
+        stmt = stmt.join(models.Horse, models.Bet.horse_id == models.Horse.id)
+    return db.execute(stmt.group_by(key)).all()
+
+
+def median_ms(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bets", type=int, default=1_000_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL"))
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark_analytics.db'}"
+    os.environ["DATABASE_URL"] = database_url  # read by alembic/env.py
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.downgrade(config, "base")
+    command.upgrade(config, "head")
+
+    engine = create_engine(database_url)
+    Session = sessionmaker(bind=engine)
+    started = time.perf_counter()
+    seed(engine, args.bets, args.years)
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"Seeded {args.bets} bets over {args.years} years in {time.perf_counter() - started:.1f}s")
+
+    service = AnalyticsService(Session)
+    db = Session()
+    started = time.perf_counter()
+    days = service.refresh(db, full=True)["days"]
+    print(f"full refresh       {(time.perf_counter() - started) * 1000:>10.1f}ms  ({days} days)")
+
+    settle = select(models.Bet.id).order_by(models.Bet.placed_at.desc()).limit(100).scalar_subquery()
+    db.execute(update(models.Bet).where(models.Bet.id.in_(settle)).values(result="WON", updated_at=datetime.utcnow()))
+    db.commit()
+    started = time.perf_counter()
+    days = service.refresh(db)["days"]
+    print(f"incremental        {(time.perf_counter() - started) * 1000:>10.1f}ms  ({days} days)")
+
+    reads = {
+        "month": lambda: service.pnl(db, "month"),
+        "track": lambda: service.breakdown(db, "track"),
+        "jockey": lambda: service.breakdown(db, "jockey"),
+    }
+    print(f"\n{'query':<10} {'python scan':>12} {'sql scan':>12} {'rollups':>12}")
+    for dimension, read in reads.items():
+        python_ms = median_ms(lambda: python_scan(db, dimension), max(1, args.repeats // 2))
+        sql_ms = median_ms(lambda: sql_scan(db, dimension), args.repeats)
+        rollup_ms = median_ms(read, args.repeats)
+        print(f"{dimension:<10} {python_ms:>10.1f}ms {sql_ms:>10.1f}ms {rollup_ms:>10.2f}ms")
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark race-card scrape latency with cold vs warm (pooled) browsers.
+
+Usage:
+    python scripts/benchmark_browser_pool.py [--fetches 10] [--page PATH]
+
+Serves a saved racecard page from a local HTTP server and scrapes it with
+headless Chrome, first starting a fresh browser per fetch (the old
+behaviour) and then reusing a warm driver from a BrowserPool.
+Requires Chrome and chromedriver on PATH.
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.app.services.browser_pool import BrowserPool
+from src.app.services.racing_post_service import RacingPostService
+
+DEFAULT_PAGE = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "racecards" / "ayr_ascot.html"
+
+
+def serve_page(page: Path) -> ThreadingHTTPServer:
+    body = page.read_bytes()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def time_fetches(service: RacingPostService, fetches: int) -> list:
+    timings = []
+    for _ in range(fetches):
+        start = time.perf_counter()
+        service.get_race_cards(date.today())
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{label:<6} mean {statistics.mean(timings) * 1000:8.1f} ms   "
+          f"p50 {statistics.median(timings) * 1000:8.1f} ms   p95 {p95 * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fetches", type=int, default=10)
+    parser.add_argument("--page", type=Path, default=DEFAULT_PAGE)
+    args = parser.parse_args()
+
+    server = serve_page(args.page)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # Cold: a pool that recycles after every page is equivalent to a new browser per fetch
+    cold_pool = BrowserPool(max_size=1, max_pages_per_driver=1)
+    cold = time_fetches(RacingPostService(base_url=base_url, browser_pool=cold_pool), args.fetches)
+    cold_pool.close()
+
+    warm_pool = BrowserPool(max_size=1)
+    warm_pool.warm()
+    warm = time_fetches(RacingPostService(base_url=base_url, browser_pool=warm_pool), args.fetches)
+    warm_pool.close()
+
+    server.shutdown()
+    print(f"\n{args.fetches} fetches of {args.page.name}")
+    report("cold", cold)
+    report("warm", warm)
+    print(f"speedup {statistics.mean(cold) / statistics.mean(warm):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
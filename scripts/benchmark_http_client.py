@@ -0,0 +1,110 @@
+"""Benchmark horse-form fetching against a local mock API.
+
+Usage:
+    python scripts/benchmark_http_client.py [--horses 700] [--latency 0.05] [--concurrency 10]
+
+Compares the original per-call `requests.get`, a keep-alive `requests.Session`
+and the pooled async client's `get_horse_forms` fan-out. The mock server adds
+`--latency` seconds per request and counts TCP connections opened. The rate
+limit is lifted to --calls-per-minute so the benchmark measures the client,
+not the 100 calls/minute provider quota.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import requests
+
+from src.app.services.http_client import AsyncAPIClient, create_session
+
+
+class FormHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients can reuse connections
+    disable_nagle_algorithm = True  # otherwise delayed ACKs add ~40ms to every keep-alive response
+    latency = 0.0
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        data = json.dumps({"horse_id": self.path.split("/")[2], "runs": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(latency: float) -> ThreadingHTTPServer:
+    FormHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FormHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch_per_call(base_url: str, horse_ids: list) -> int:
+    return sum(requests.get(f"{base_url}/horses/{horse_id}/form").ok for horse_id in horse_ids)
+
+
+def fetch_session(base_url: str, horse_ids: list) -> int:
+    with create_session() as session:
+        return sum(session.get(f"{base_url}/horses/{horse_id}/form").ok for horse_id in horse_ids)
+
+
+def fetch_async(base_url: str, horse_ids: list, concurrency: int, calls_per_minute: int) -> int:
+    async def run():
+        async with AsyncAPIClient(base_url, max_concurrency=concurrency, calls=calls_per_minute, period=60) as api:
+            forms = await api.get_horse_forms(horse_ids)
+        return sum(form is not None for form in forms.values())
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--horses", type=int, default=700, help="runners on a full Saturday card")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock server latency per request (s)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--calls-per-minute", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    server = start_server(args.latency)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    horse_ids = [f"horse-{i}" for i in range(args.horses)]
+    modes = {
+        "requests.get": lambda: fetch_per_call(base_url, horse_ids),
+        "session": lambda: fetch_session(base_url, horse_ids),
+        f"async x{args.concurrency}": lambda: fetch_async(base_url, horse_ids, args.concurrency, args.calls_per_minute),
+    }
+
+    print(f"{args.horses} horses, {args.latency * 1000:.0f}ms latency per request")
+    print(f"{'mode':<14} {'ok':>6} {'seconds':>9} {'req/s':>9} {'connections':>12}")
+    for name, fetch in modes.items():
+        server.connections = 0
+        start = time.perf_counter()
+        ok = fetch()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<14} {ok:>6} {elapsed:>9.2f} {ok / elapsed:>9.1f} {server.connections:>12}")
+    print(f"\nAt the live 100 calls/minute quota {args.horses} forms take at least {args.horses / 100:.0f} minutes.")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
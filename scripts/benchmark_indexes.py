@@ -0,0 +1,150 @@
+"""Benchmark the hot query paths before and after the index migration (0003).
+
+Usage:
+    python scripts/benchmark_indexes.py [--years 3] [--races-per-day 40] [--database-url URL]
+
+Migrates an empty database to revision 0002, seeds several years of races,
+runners and bets, then for each query prints its plan (EXPLAIN QUERY PLAN on
+SQLite, EXPLAIN ANALYZE on Postgres) and the median time. It then upgrades to
+head and repeats, so the two sections show what the new indexes change.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, func, insert, select, text
+
+from src.app import models
+
+TRACKS = ["Ascot", "Ayr", "Newmarket", "Kempton", "Leopardstown", "Haydock", "Doncaster", "Chester"]
+START = datetime(2020, 1, 1, 12, 0)
+
+
+def seed(engine, years: int, races_per_day: int, runners: int, chunk: int = 20_000):
+    """Insert `years` of races with `runners` horses each and a bet on every third runner."""
+    days = 365 * years
+    race_rows, horse_rows, bet_rows = [], [], []
+    race_id = horse_id = 0
+
+    def flush(conn, force=False):
+        for model, rows in ((models.Race, race_rows), (models.Horse, horse_rows), (models.Bet, bet_rows)):
+            if rows and (force or len(rows) >= chunk):
+                conn.execute(insert(model), rows)
+                rows.clear()
+
+    with engine.begin() as conn:
+        for day in range(days):
+            for slot in range(races_per_day):
+                race_id += 1
+                race_date = START + timedelta(days=day, minutes=slot * 5)
+                race_rows.append({
+                    "id": race_id, "race_date": race_date, "track": TRACKS[slot % len(TRACKS)],
+                    "off_time": f"{12 + slot // 12}:{(slot % 12) * 5:02d}", "distance": 1600,
+                    "race_type": "Flat" if slot % 2 else "Hurdle", "created_at": race_date, "updated_at": race_date,
+                })
+                for n in range(runners):
+                    horse_id += 1
+                    horse_rows.append({"id": horse_id, "race_id": race_id, "name": f"Horse {horse_id}", "odds": 2.0 + n})
+                    if n % 3 == 0:
+                        bet_rows.append({
+                            "race_id": race_id, "horse_id": horse_id, "stake": 10.0, "odds": 2.0 + n,
+                            "bet_type": "WIN", "placed_at": race_date - timedelta(hours=1),
+                            "result": "LOST", "profit": -10.0,
+                        })
+            # Races and horses first so foreign keys resolve on Postgres
+            if len(horse_rows) >= chunk:
+                flush(conn, force=True)
+        flush(conn, force=True)
+    return race_id, horse_id
+
+
+def queries(race_id: int, horse_id: int, years: int) -> dict:
+    day = START + timedelta(days=365 * years // 2)
+    return {
+        "race-cards by date": select(models.Race).where(
+            models.Race.race_date >= day, models.Race.race_date < day + timedelta(days=1)
+        ),
+        "races by date+track": select(models.Race).where(
+            models.Race.race_date >= day, models.Race.race_date < day + timedelta(days=1), models.Race.track == "Ascot"
+        ),
+        "races by track, 1 month": select(models.Race).where(
+            models.Race.track == "Ayr", models.Race.race_date >= day, models.Race.race_date < day + timedelta(days=30)
+        ).order_by(models.Race.race_date),
+        "horses by race": select(models.Horse).where(models.Horse.race_id == race_id // 2),
+        "bets by race": select(models.Bet).where(models.Bet.race_id == race_id // 2),
+        "bets by horse": select(models.Bet).where(models.Bet.horse_id == horse_id // 2 // 3 * 3 + 1),
+        "bets placed in a week": select(func.sum(models.Bet.stake)).where(
+            models.Bet.placed_at >= day, models.Bet.placed_at < day + timedelta(days=7)
+        ),
+    }
+
+
+def explain(conn, stmt) -> str:
+    compiled = stmt.compile(conn, compile_kwargs={"literal_binds": True})
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        return "; ".join(row[-1] for row in rows)
+    rows = conn.execute(text(f"EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF) {compiled}")).all()
+    return "; ".join(row[0].strip() for row in rows if not row[0].lstrip().startswith(("Planning", "Execution")))
+
+
+def median_ms(conn, stmt, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        conn.execute(stmt).all()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def report(engine, label: str, stmts: dict, repeats: int):
+    print(f"\n== {label} ==")
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE"))
+        for name, stmt in stmts.items():
+            print(f"{name:<26} {median_ms(conn, stmt, repeats):>9.2f}ms  {explain(conn, stmt)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--races-per-day", type=int, default=40)
+    parser.add_argument("--runners", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL"))
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark_indexes.db'}"
+    os.environ["DATABASE_URL"] = database_url  # read by alembic/env.py
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+
+    command.downgrade(config, "base")
+    command.upgrade(config, "0002")
+    engine = create_engine(database_url)
+    started = time.perf_counter()
+    race_id, horse_id = seed(engine, args.years, args.races_per_day, args.runners)
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"Seeded {race_id} races, {horse_id} horses, {(horse_id + 2) // 3} bets in {time.perf_counter() - started:.1f}s")
+
+    stmts = queries(race_id, horse_id, args.years)
+    report(engine, "before (revision 0002)", stmts, args.repeats)
+    engine.dispose()
+    command.upgrade(config, "head")
+    report(engine, "after (head)", stmts, args.repeats)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
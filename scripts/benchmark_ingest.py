@@ -0,0 +1,126 @@
+"""Benchmark race-card ingest: per-row ORM path vs the bulk ingest engine.
+
+Usage:
+    python scripts/benchmark_ingest.py [--scales 10 100 1000] [--database-url URL]
+
+A "normal day" is a full UK/IRE Saturday: 60 races with ~700 runners.
+Defaults to a throwaway SQLite file; point --database-url (or DATABASE_URL)
+at Postgres to measure the real round-trip cost.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app import models
+from src.app.services.bulk_ingest import BulkIngestService, as_race_datetime
+
+RACES_PER_DAY = 60
+TRACKS = ["Ascot", "Ayr", "Newmarket", "Kempton", "Leopardstown", "Haydock", "Doncaster"]
+
+
+def make_race_cards(scale: int, seed: int = 42) -> list:
+    """Build `scale` days worth of synthetic race cards (~700 runners per day)."""
+    rng = random.Random(seed)
+    race_cards = []
+    for i in range(RACES_PER_DAY * scale):
+        day, slot = divmod(i, RACES_PER_DAY)
+        runners = rng.randint(8, 16)
+        race_cards.append({
+            "race_time": f"{12 + slot // 12}:{(slot % 12) * 5:02d}",
+            "race_track": f"{TRACKS[slot % len(TRACKS)]} {day}",
+            "race_type": rng.choice(["Flat", "Hurdle", "Chase"]),
+            "horses": [
+                {
+                    "name": f"Horse {i}-{n}",
+                    "jockey": f"Jockey {rng.randint(1, 200)}",
+                    "trainer": f"Trainer {rng.randint(1, 150)}",
+                    "odds": round(rng.uniform(1.5, 50.0), 2),
+                }
+                for n in range(runners)
+            ],
+        })
+    return race_cards
+
+
+def ingest_row_by_row(db, race_date: date, race_cards: list):
+    """The original save_race_cards_to_db loop: flush per race, add per horse."""
+    for race_card in race_cards:
+        race = models.Race(
+            race_date=as_race_datetime(race_date),
+            track=race_card["race_track"],
+            off_time=race_card["race_time"],
+            race_type=race_card["race_type"],
+            created_at=datetime.utcnow(),
+        )
+        db.add(race)
+        db.flush()
+
+        for horse_data in race_card["horses"]:
+            db.add(models.Horse(
+                race_id=race.id,
+                name=horse_data["name"],
+                jockey=horse_data["jockey"],
+                trainer=horse_data["trainer"],
+                odds=horse_data["odds"],
+                created_at=datetime.utcnow(),
+            ))
+    db.commit()
+
+
+def time_ingest(engine, fn, race_cards: list, runs: int = 1) -> list:
+    """Time `runs` consecutive ingests of the same cards into fresh tables."""
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    timings = []
+    for _ in range(runs):
+        db = Session()
+        try:
+            start = time.perf_counter()
+            fn(db, date.today(), race_cards)
+            timings.append(time.perf_counter() - start)
+        finally:
+            db.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark_ingest.db'}"
+    engine = create_engine(database_url)
+    bulk = BulkIngestService()
+
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{'scale':>6} {'races':>8} {'runners':>9} {'row-by-row':>12} {'bulk':>10} {'speedup':>8} {'re-ingest':>10}")
+    for scale in args.scales:
+        race_cards = make_race_cards(scale)
+        runners = sum(len(card["horses"]) for card in race_cards)
+        row_time, = time_ingest(engine, ingest_row_by_row, race_cards)
+        # The second bulk run re-ingests an unchanged card: every row is a no-op upsert
+        bulk_time, rerun_time = time_ingest(engine, bulk.ingest_race_cards, race_cards, runs=2)
+        print(
+            f"{scale:>5}x {len(race_cards):>8} {runners:>9} {row_time:>11.2f}s {bulk_time:>9.2f}s "
+            f"{row_time / bulk_time:>7.1f}x {rerun_time:>9.2f}s"
+        )
+
+    models.Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    main()
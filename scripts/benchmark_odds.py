@@ -0,0 +1,130 @@
+"""Drive the odds store and its odds_ticks flush with a simulated feed.
+
+Usage:
+    python scripts/benchmark_odds.py [--rate 10000] [--seconds 10] [--runners 2000] [--database-url URL]
+
+Migrates an empty database to head, then runs a local feed that records
+random-walk prices for `--runners` runners at `--rate` ticks/second for
+`--seconds`. It records them in 10ms bursts, the way a streaming odds feed
+delivers them. Meanwhile the tracker's flush writes pending ticks every
+ODDS_FLUSH_SECONDS and a reader issues drift queries. It reports:
+  feed     - ticks recorded and the rate held
+  flush    - rows written, median/max flush time and ticks left pending or dropped
+  drift    - median/p99 latency of a 5-minute drift query on a random runner
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from src.app import models
+from src.app.services.odds_tracker import OddsStore, OddsTracker
+
+
+def feed(store: OddsStore, rate: int, seconds: float, runners: int, races: int, stop: threading.Event) -> int:
+    """Record `rate` ticks/second in 10ms bursts; returns how many were recorded."""
+    rng = random.Random(7)
+    prices = [rng.uniform(1.5, 30.0) for _ in range(runners)]
+    burst = max(1, rate // 100)
+    recorded = 0
+    started = time.perf_counter()
+    while not stop.is_set() and time.perf_counter() - started < seconds:
+        now = time.time()
+        for _ in range(burst):
+            runner = rng.randrange(runners)
+            prices[runner] = max(1.01, prices[runner] * rng.uniform(0.97, 1.03))
+            store.record(runner + 1, runner % races + 1, round(prices[runner], 2), now)
+        recorded += burst
+        # Pace to the target rate; a feed that can't keep up just runs flat out
+        ahead = recorded / rate - (time.perf_counter() - started)
+        if ahead > 0:
+            time.sleep(ahead)
+    return recorded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=int, default=10_000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--runners", type=int, default=2_000)
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL"))
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark_odds.db'}"
+    os.environ["DATABASE_URL"] = database_url  # read by alembic/env.py
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.downgrade(config, "base")
+    command.upgrade(config, "head")
+
+    engine = create_engine(database_url)
+    Session = sessionmaker(bind=engine)
+    races = max(1, args.runners // 10)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Race), [
+            {"id": n, "race_date": datetime(2030, 1, 1), "track": "Sim", "off_time": f"{n // 60:02d}:{n % 60:02d}"}
+            for n in range(1, races + 1)
+        ])
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+
+    store = OddsStore()
+    tracker = OddsTracker(Session, api=object(), store=store)
+    stop = threading.Event()
+    flush_ms, drift_us = [], []
+
+    def flusher():
+        while not stop.is_set():
+            db = Session()
+            started = time.perf_counter()
+            if tracker.flush(db):
+                flush_ms.append((time.perf_counter() - started) * 1000)
+            db.close()
+            stop.wait(tracker.flush_interval)
+
+    def reader():
+        rng = random.Random(11)
+        while not stop.is_set():
+            started = time.perf_counter()
+            store.drift(rng.randrange(args.runners) + 1, minutes=5)
+            drift_us.append((time.perf_counter() - started) * 1e6)
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=flusher), threading.Thread(target=reader)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    recorded = feed(store, args.rate, args.seconds, args.runners, races, stop)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+    db = Session()
+    tracker.flush(db)
+    written = db.scalar(select(func.count()).select_from(models.OddsTick))
+    db.close()
+
+    drift_us.sort()
+    print(f"feed     {recorded} ticks in {elapsed:.1f}s = {recorded / elapsed:,.0f} ticks/s (target {args.rate:,})")
+    print(f"flush    {written} rows in {len(flush_ms)} flushes, median {statistics.median(flush_ms):.1f}ms, "
+          f"max {max(flush_ms):.1f}ms, {store.dropped} dropped")
+    print(f"drift    {len(drift_us)} queries, median {statistics.median(drift_us):.1f}us, "
+          f"p99 {drift_us[int(len(drift_us) * 0.99)]:.1f}us")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark GET /races listing strategies as the races table grows.
+
+Usage:
+    python scripts/benchmark_pagination.py [--scales 10000 100000 1000000] [--limit 100] [--database-url URL]
+
+For each table size it times, as median milliseconds per request:
+  all       - the original db.query(Race).all() serialised through RaceRead
+  offset    - LIMIT/OFFSET at 90% depth
+  keyset    - the keyset page at the start and at 90% depth
+The full listing is skipped above --full-max rows.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from src.app import models, pagination, schemas
+
+TRACKS = ["Ascot", "Ayr", "Newmarket", "Kempton", "Leopardstown", "Haydock", "Doncaster"]
+RACE_FIELDS = [column.key for column in models.Race.__table__.columns]
+
+
+def grow(engine, target: int, chunk: int = 50_000):
+    """Insert synthetic races until the table holds `target` rows (60 races a day)."""
+    with engine.begin() as conn:
+        count = conn.execute(select(func.count()).select_from(models.Race)).scalar()
+        start = datetime(2000, 1, 1, 12, 0)
+        while count < target:
+            rows = []
+            for i in range(count, min(target, count + chunk)):
+                day, slot = divmod(i, 60)
+                rows.append({
+                    "race_date": start + timedelta(days=day, minutes=slot * 5),
+                    "track": TRACKS[slot % len(TRACKS)],
+                    "off_time": f"{12 + slot // 12}:{(slot % 12) * 5:02d}",
+                    "distance": 1600,
+                    "race_type": "Flat" if slot % 2 else "Hurdle",
+                    "created_at": start,
+                    "updated_at": start,
+                })
+            conn.execute(insert(models.Race), rows)
+            count += len(rows)
+
+
+def median_ms(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--full-max", type=int, default=100_000)
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL"))
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark_pagination.db'}"
+    engine = create_engine(database_url)
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    key_columns = [models.Race.race_date, models.Race.id]
+
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{'rows':>10} {'all':>10} {'offset@90%':>11} {'keyset@0':>9} {'keyset@90%':>11}")
+    for scale in args.scales:
+        grow(engine, scale)
+        db = Session()
+        try:
+            depth = int(scale * 0.9)
+            deep_key = db.execute(
+                select(*key_columns).order_by(*key_columns).offset(depth).limit(1)
+            ).one()
+            deep_cursor = pagination.encode_cursor(list(deep_key))
+
+            def full():
+                return [schemas.RaceRead.model_validate(race, from_attributes=True).model_dump()
+                        for race in db.query(models.Race).all()]
+
+            def offset():
+                return db.query(models.Race).order_by(*key_columns).offset(depth).limit(args.limit).all()
+
+            def keyset(cursor=None):
+                return pagination.paginate(db, models.Race, key_columns, RACE_FIELDS, cursor=cursor, limit=args.limit)
+
+            full_ms = f"{median_ms(full, 1):>8.1f}ms" if scale <= args.full_max else f"{'skipped':>10}"
+            print(
+                f"{scale:>10} {full_ms} {median_ms(offset, args.repeats):>9.1f}ms "
+                f"{median_ms(keyset, args.repeats):>7.1f}ms "
+                f"{median_ms(lambda: keyset(deep_cursor), args.repeats):>9.1f}ms"
+            )
+            db.expunge_all()
+        finally:
+            db.close()
+
+    models.Base.metadata.drop_all(bind=engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark race-card parser backends in pages/second.
+
+Usage:
+    python scripts/benchmark_parsers.py [--seconds 2] [--races 60] [--runners 12]
+
+Runs every backend over the saved racecard corpus in tests/fixtures/racecards
+plus a synthetic full-day page (60 races by default), checking that each
+backend returns the same result as the BeautifulSoup reference.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.app.services.racecard_parsers import PARSERS, BeautifulSoupParser, get_parser
+
+CORPUS_DIR = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "racecards"
+
+
+def make_full_day_page(races: int, runners: int) -> str:
+    """Render a synthetic racecards page shaped like the live Racing Post markup."""
+    cards = []
+    for r in range(races):
+        horses = "".join(
+            f'<div class="rp-racecard__horse">'
+            f'<div class="rp-racecard__horse-name"><a href="/horse/{r}{n}">Horse {r}-{n}</a></div>'
+            f'<div class="rp-racecard__jockey">Jockey {n}</div>'
+            f'<div class="rp-racecard__trainer">Trainer {n}</div>'
+            f'<div class="rp-racecard__odds">{2 + n * 0.5}</div>'
+            f'</div>'
+            for n in range(runners)
+        )
+        cards.append(
+            f'<div class="rp-racecard__race-card">'
+            f'<div class="rp-racecard__race-time">{12 + r // 12}:{(r % 12) * 5:02d}</div>'
+            f'<div class="rp-racecard__race-track">Track {r % 7}</div>'
+            f'<div class="rp-racecard__race-info">Flat Handicap (Class 4) 1m</div>'
+            f'{horses}</div>'
+        )
+    return f"<html><body><main>{''.join(cards)}</main></body></html>"
+
+
+def pages_per_second(parser, html: str, seconds: float) -> float:
+    pages = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        parser.parse(html)
+        pages += 1
+    return pages / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="time budget per backend per page")
+    parser.add_argument("--races", type=int, default=60)
+    parser.add_argument("--runners", type=int, default=12)
+    args = parser.parse_args()
+
+    pages = {path.name: path.read_text() for path in sorted(CORPUS_DIR.glob("*.html"))}
+    pages[f"full_day_{args.races}x{args.runners}"] = make_full_day_page(args.races, args.runners)
+
+    reference = BeautifulSoupParser()
+    backends = [get_parser(name) for name in PARSERS]
+
+    print(f"{'page':<24} {'KB':>7} " + " ".join(f"{backend.name:>12}" for backend in backends))
+    for name, html in pages.items():
+        expected = reference.parse(html)
+        rates = []
+        for backend in backends:
+            if backend.parse(html) != expected:
+                raise SystemExit(f"{backend.name} output differs from the reference on {name}")
+            rates.append(pages_per_second(backend, html, args.seconds))
+        print(f"{name:<24} {len(html) / 1024:>7.1f} " + " ".join(f"{rate:>8.1f} p/s" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Fan messages out from the push hub to many simulated WebSocket clients.
+
+Usage:
+    python scripts/benchmark_push.py [--subscribers 5000] [--messages 2000] [--rate 500] [--slow 0.05] [--races 50]
+
+Connects `--subscribers` in-process clients, each subscribed to one of
+`--races` races, and publishes `--messages` odds moves across those races
+at `--rate` a second from a worker thread, the way the odds tracker does. A `--slow` fraction of
+clients never finish a send, so they show how backpressure keeps them from
+holding up the rest. It reports:
+  publish  - how long publishing took and messages/second
+  deliver  - median/p99 time from publish to a fast client's send
+  queues   - messages coalesced or dropped for slow clients, and slow disconnects
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from src.app.services.push import PushHub
+
+
+class SimulatedClient:
+    """Stands in for a WebSocket; a slow one never finishes a send."""
+
+    def __init__(self, slow: bool, latencies: list):
+        self.slow = slow
+        self.latencies = latencies
+        self.received = 0
+
+    async def send_text(self, text):
+        if self.slow:
+            await asyncio.sleep(3600)
+        self.received += 1
+        message = json.loads(text)
+        if "sent_at" in message:
+            self.latencies.append((time.perf_counter() - message["sent_at"]) * 1000)
+
+    async def receive_json(self):
+        await asyncio.Event().wait()
+
+    async def close(self, code):
+        pass
+
+
+async def run(args):
+    hub = PushHub(send_timeout=2.0)
+    rng = random.Random(3)
+    latencies = []
+    clients = [SimulatedClient(rng.random() < args.slow, latencies) for _ in range(args.subscribers)]
+    tasks = [
+        asyncio.create_task(hub.serve(client, {("race_id", n % args.races + 1)}))
+        for n, client in enumerate(clients)
+    ]
+    while hub.metrics()["subscribers"] < args.subscribers:
+        await asyncio.sleep(0.01)
+
+    def publisher():
+        begun = time.perf_counter()
+        for n in range(args.messages):
+            ahead = n / args.rate - (time.perf_counter() - begun)
+            if ahead > 0:
+                time.sleep(ahead)
+            race_id = n % args.races + 1
+            hub.publish("odds", race_id, None, None, key=("odds", race_id),
+                        odds={rng.randrange(12): round(rng.uniform(1.5, 20), 2)}, sent_at=time.perf_counter())
+
+    started = time.perf_counter()
+    thread = threading.Thread(target=publisher)
+    thread.start()
+    await asyncio.to_thread(thread.join)
+    published = time.perf_counter() - started
+    # Let fast clients drain and slow ones hit the send timeout
+    await asyncio.sleep(hub.send_timeout + 0.5)
+    metrics = hub.metrics()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies.sort()
+    slow = sum(client.slow for client in clients)
+    print(f"publish  {args.messages} messages to {args.subscribers} subscribers ({slow} slow) in "
+          f"{published * 1000:.0f}ms = {args.messages / published:,.0f} messages/s, "
+          f"{metrics['delivered']:,} deliveries")
+    print(f"deliver  {len(latencies):,} sends, median {statistics.median(latencies):.1f}ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)]:.1f}ms")
+    print(f"queues   {metrics['coalesced']:,} coalesced, {metrics['dropped']:,} dropped, "
+          f"{metrics['slow_disconnects']} slow disconnects")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=5_000)
+    parser.add_argument("--messages", type=int, default=2_000)
+    parser.add_argument("--rate", type=float, default=500)
+    parser.add_argument("--slow", type=float, default=0.05)
+    parser.add_argument("--races", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
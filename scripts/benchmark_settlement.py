@@ -0,0 +1,145 @@
+"""Benchmark settling a day's pending bets against its results.
+
+Usage:
+    python scripts/benchmark_settlement.py [--bets 100000] [--races 60] [--runners 12] [--database-url URL]
+
+Migrates an empty database to head and seeds one day of `--races` races of
+`--runners` runners with `--bets` pending WIN/PLACE/EACH_WAY bets and a
+bankroll, then generates a result per race (a non-runner in every fifth). It times:
+  settle       - SettlementService.settle: recording the results, numpy payouts, one UPDATE per race
+  row by row   - the same bets reset to PENDING and settled one ORM object at a time
+and checks both came to the same total profit.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from src.app import models
+from src.app.services.settlement import SettlementService, place_terms
+
+DAY = datetime(2031, 6, 14)
+TRACKS = ["Ascot", "Ayr", "Newmarket", "Kempton", "Haydock", "Doncaster"]
+
+
+def seed(engine, bets: int, races: int, runners: int, chunk: int = 50_000):
+    rng = random.Random(11)
+    results = []
+    with engine.begin() as conn:
+        race_rows, horse_rows = [], []
+        for n in range(races):
+            race_id = n + 1
+            off = DAY + timedelta(hours=12, minutes=n * 10)
+            race_rows.append({"id": race_id, "race_date": DAY, "track": TRACKS[n % len(TRACKS)],
+                              "off_time": off.strftime("%H:%M"), "race_type": "Handicap" if n % 3 else "Flat"})
+            finish = list(range(1, runners + 1))
+            rng.shuffle(finish)
+            result = []
+            for h in range(runners):
+                name = f"Runner {race_id}-{h}"
+                horse_rows.append({"id": n * runners + h + 1, "race_id": race_id, "race_date": DAY, "name": name})
+                result.append({"name": name, "position": "NR" if n % 5 == 0 and h == 0 else finish[h]})
+            results.append({"track": race_rows[-1]["track"], "off_time": race_rows[-1]["off_time"], "runners": result})
+        conn.execute(insert(models.Race), race_rows)
+        conn.execute(insert(models.Horse), horse_rows)
+        conn.execute(insert(models.Bankroll), [{"current_amount": 100_000.0, "initial_amount": 100_000.0}])
+
+        rows = []
+        for bet_id in range(1, bets + 1):
+            race = rng.randrange(races)
+            rows.append({
+                "id": bet_id, "race_id": race + 1, "horse_id": race * runners + rng.randrange(runners) + 1,
+                "stake": float(rng.choice([2, 5, 10, 20])), "odds": round(rng.uniform(1.5, 30.0), 2),
+                "bet_type": rng.choice(["WIN", "PLACE", "EACH_WAY"]), "placed_at": DAY, "result": "PENDING",
+            })
+            if len(rows) >= chunk:
+                conn.execute(insert(models.Bet), rows)
+                rows.clear()
+        if rows:
+            conn.execute(insert(models.Bet), rows)
+    return results
+
+
+def settle_row_by_row(db):
+    """One Python payout and one UPDATE per bet, from the positions settle() stored."""
+    races = {race.id: race for race in db.scalars(select(models.Race).where(models.Race.race_date == DAY))}
+    terms, shares = {}, {}
+    for race in races.values():
+        runners = [horse for horse in race.horses if horse.scratched_at is None]
+        terms[race.id] = place_terms(len(runners), "handicap" in race.race_type.lower())
+        for horse in runners:
+            tied = sum(other.finish_position == horse.finish_position for other in runners)
+            position = horse.finish_position or 99
+            places = terms[race.id][0]
+            shares[horse.id] = (
+                1 / tied if position == 1 else 0.0,
+                min(tied, places - position + 1) / tied if position <= places else 0.0,
+            )
+    for bet in db.scalars(select(models.Bet).where(models.Bet.result == "PENDING")):
+        if bet.horse_id not in shares:
+            bet.result, bet.profit = "VOID", 0.0
+            continue
+        win, place = shares[bet.horse_id]
+        fraction = terms[bet.race_id][1]
+        place_return = place * (1 + (bet.odds - 1) * fraction)
+        returns = {"WIN": win * bet.odds, "PLACE": place_return,
+                   "EACH_WAY": (win * bet.odds + place_return) / 2}[bet.bet_type] * bet.stake
+        bet.result, bet.profit = ("WON" if returns > 0 else "LOST"), returns - bet.stake
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bets", type=int, default=100_000)
+    parser.add_argument("--races", type=int, default=60)
+    parser.add_argument("--runners", type=int, default=12)
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL"))
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{Path(tempfile.mkdtemp()) / 'benchmark_settlement.db'}"
+    os.environ["DATABASE_URL"] = database_url  # read by alembic/env.py
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.downgrade(config, "base")
+    command.upgrade(config, "head")
+
+    engine = create_engine(database_url)
+    Session = sessionmaker(bind=engine)
+    started = time.perf_counter()
+    results = seed(engine, args.bets, args.races, args.runners)
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"Seeded {args.bets} pending bets on {args.races} races in {time.perf_counter() - started:.1f}s")
+
+    service = SettlementService(Session, {})
+    db = Session()
+    started = time.perf_counter()
+    report = service.settle(db, DAY.date(), results)
+    settled = time.perf_counter() - started
+    print(f"settle       {settled * 1000:>10.1f}ms  ({report.bets_settled} bets = {report.bets_settled / settled:,.0f}/s, "
+          f"{report.won} won, {report.void} void, profit {report.profit:,.2f}, max drawdown {report.max_drawdown:.2f}%)")
+
+    db.execute(update(models.Bet).values(result="PENDING", profit=None))
+    db.commit()
+    started = time.perf_counter()
+    settle_row_by_row(db)
+    row_by_row = time.perf_counter() - started
+    profit = db.scalar(select(func.sum(models.Bet.profit)))
+    print(f"row by row   {row_by_row * 1000:>10.1f}ms  (profit {profit:,.2f}, {row_by_row / settled:.0f}x slower)")
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Load-test the race/horse read routes: sync (threadpool) vs async (AsyncSession) handlers.
+
+Usage:
+    python scripts/load_test.py [--concurrency 64] [--duration 10] [--database-url URL]
+
+Starts two uvicorn servers in subprocesses against the same database:
+  sync  - `sync_app` below: the pre-async handlers, `def` routes on get_db
+  async - src.app.main:app: `async def` routes on get_async_db
+then drives both with the same request mix (/races/{id}/full, /races and
+/horses/{id}) and reports requests/sec, p50 and p99.
+
+Defaults to a SQLite stand-in. SQLite answers in microseconds, so it
+understates the gain; point --database-url at Postgres to see handlers
+waiting on the network instead of holding threadpool workers.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, Query
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, joinedload, sessionmaker
+
+from src.app import models, pagination, schemas
+from src.app.database import get_db
+
+# -------------------- Sync comparison app --------------------
+sync_app = FastAPI(title="sync comparison")
+
+
+@sync_app.get("/health")
+def sync_health():
+    return {"status": "ok"}
+
+
+@sync_app.get("/races/{race_id}/full", response_model=schemas.RaceFullRead)
+def sync_race_full(race_id: int, db: Session = Depends(get_db)):
+    race = db.execute(
+        select(models.Race)
+        .options(joinedload(models.Race.horses), joinedload(models.Race.analysis))
+        .where(models.Race.id == race_id)
+    ).unique().scalar_one_or_none()
+    if not race:
+        raise HTTPException(status_code=404, detail="Race not found")
+    return race
+
+
+@sync_app.get("/races", response_model=schemas.Page)
+def sync_list_races(cursor: Optional[str] = None, limit: int = Query(pagination.DEFAULT_LIMIT),
+                    track: Optional[str] = None, db: Session = Depends(get_db)):
+    return pagination.paginate(
+        db, models.Race, [models.Race.race_date, models.Race.id],
+        pagination.parse_fields(None, models.Race),
+        filters=pagination.race_filters(None, None, track, None), cursor=cursor, limit=limit,
+    )
+
+
+@sync_app.get("/horses/{horse_id}", response_model=schemas.HorseRead)
+def sync_get_horse(horse_id: int, db: Session = Depends(get_db)):
+    horse = db.get(models.Horse, horse_id)
+    if not horse:
+        raise HTTPException(status_code=404, detail="Horse not found")
+    return horse
+
+
+# -------------------- Harness --------------------
+def seed(database_url: str, races: int, runners: int) -> tuple:
+    engine = create_engine(database_url)
+    models.Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        start = datetime(2038, 1, 1, 12, 0)
+        for i in range(races):
+            race = models.Race(race_date=start + timedelta(minutes=5 * i), track="Load Test Park",
+                               off_time=f"{i}", race_type="Flat", distance=1600)
+            race.horses = [models.Horse(name=f"Load {i}-{n}", odds=2.0 + n) for n in range(runners)]
+            db.add(race)
+        db.commit()
+        race_ids = db.scalars(select(models.Race.id).where(models.Race.track == "Load Test Park")).all()
+        horse_ids = db.scalars(
+            select(models.Horse.id).join(models.Race).where(models.Race.track == "Load Test Park")
+        ).all()
+        return race_ids, horse_ids
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app: str, port: int, database_url: str) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": database_url, "ANALYSIS_BATCH_WORKER": "false"}
+    env.setdefault("ANTHROPIC_API_KEY", "load-test")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning",
+         "--no-access-log", "--app-dir", str(ROOT / "scripts")],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit(f"{app} did not start")
+
+
+async def drive(base_url: str, race_ids: list, horse_ids: list, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], 0
+    rng = random.Random(7)
+    paths = [
+        lambda: f"/races/{rng.choice(race_ids)}/full",
+        lambda: "/races?track=Load%20Test%20Park&limit=50",
+        lambda: f"/horses/{rng.choice(horse_ids)}",
+    ]
+    deadline = time.monotonic() + duration
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            response = await client.get(rng.choice(paths)())
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.monotonic()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per mode")
+    parser.add_argument("--races", type=int, default=200)
+    parser.add_argument("--runners", type=int, default=12)
+    parser.add_argument("--database-url", default=os.getenv("LOAD_TEST_DATABASE_URL"))
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{Path(tempfile.mkdtemp()) / 'load_test.db'}"
+    race_ids, horse_ids = seed(database_url, args.races, args.runners)
+
+    print(f"Database: {database_url.split('@')[-1]}, concurrency {args.concurrency}, {args.duration:.0f}s per mode")
+    print(f"{'mode':<6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50':>9} {'p99':>9}")
+    for mode, app in (("sync", "load_test:sync_app"), ("async", "src.app.main:app")):
+        port = free_port()
+        server = start_server(app, port, database_url)
+        try:
+            result = asyncio.run(drive(f"http://127.0.0.1:{port}", race_ids, horse_ids, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        print(
+            f"{mode:<6} {result['requests']:>9} {result['errors']:>7} {result['rps']:>9.1f} "
+            f"{result['p50']:>7.1f}ms {result['p99']:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
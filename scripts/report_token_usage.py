@@ -0,0 +1,118 @@
+"""Token accounting for a whole day's card: compact cached prompts vs the legacy prompt.
+
+Usage:
+    python scripts/report_token_usage.py --date 2024-06-15 [--database-url URL] [--base-url URL]
+    python scripts/report_token_usage.py --synthetic 60
+
+Analyses every race on the date (or `--synthetic` generated races) once with
+the legacy self-contained prompt and once with the compact prompt plus cached
+system block, then prints input/cached/output tokens per race and the totals.
+Calls the real API with ANTHROPIC_API_KEY unless --base-url points at a mock.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from src.app import models
+from src.app.services.bulk_ingest import as_race_datetime
+from src.app.services.claude_service import ClaudeService, RaceAnalysisRequest
+
+
+def load_requests(database_url: str, race_date: date, service: ClaudeService) -> dict:
+    engine = create_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        day_start = as_race_datetime(race_date)
+        races = (
+            db.query(models.Race)
+            .options(selectinload(models.Race.horses))
+            .filter(models.Race.race_date >= day_start, models.Race.race_date < day_start + timedelta(days=1))
+            .order_by(models.Race.race_date, models.Race.id)
+            .all()
+        )
+        return {race.id: service.format_race_data(race, race.horses) for race in races if race.horses}
+    finally:
+        db.close()
+
+
+def make_requests(count: int, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    return {
+        race_id: RaceAnalysisRequest(
+            race={"date": datetime(2024, 6, 15, 12 + race_id // 12).isoformat(), "track": "Ascot",
+                  "distance": rng.choice([1000, 1600, 2400]), "race_type": "Flat", "class_rating": None,
+                  "total_runners": None},
+            horses=[
+                {"name": f"Horse {race_id}-{n}", "jockey": f"Jockey {rng.randint(1, 200)}",
+                 "trainer": f"Trainer {rng.randint(1, 150)}", "odds": round(rng.uniform(1.5, 50.0), 2),
+                 "starting_position": n + 1, "weight": None, "last_race_days": rng.randint(7, 90),
+                 "wins": None, "places": None, "starts": None, "avg_position": None}
+                for n in range(rng.randint(8, 16))
+            ],
+        )
+        for race_id in range(1, count + 1)
+    }
+
+
+def run(service: ClaudeService, requests: dict) -> dict:
+    service.usage.clear()
+    for race_id, request in requests.items():
+        try:
+            service.analyze_request(request, race_id=race_id)
+        except Exception as e:
+            print(f"Race {race_id}: {str(e)}")
+    return service.usage.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--synthetic", type=int, help="analyse N generated races instead of the database card")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///./test.db"))
+    parser.add_argument("--base-url", default=os.getenv("ANTHROPIC_BASE_URL"))
+    args = parser.parse_args()
+
+    api_key = os.getenv("ANTHROPIC_API_KEY", "test-key")
+    legacy = ClaudeService(api_key=api_key, base_url=args.base_url, compact_prompts=False)
+    compact = ClaudeService(api_key=api_key, base_url=args.base_url, compact_prompts=True)
+    if args.synthetic:
+        requests = make_requests(args.synthetic)
+    else:
+        requests = load_requests(args.database_url, args.date, compact)
+    if not requests:
+        raise SystemExit(f"No races with runners found for {args.date}")
+
+    reports = {"legacy": run(legacy, requests), "compact": run(compact, requests)}
+
+    print(f"{'mode':<8} {'race':>6} {'input':>7} {'cache_w':>8} {'cache_r':>8} {'output':>7} {'latency':>9}")
+    for mode, report in reports.items():
+        for row in report["races"]:
+            print(
+                f"{mode:<8} {row['race_id']:>6} {row['input_tokens']:>7} {row['cache_creation_input_tokens']:>8} "
+                f"{row['cache_read_input_tokens']:>8} {row['output_tokens']:>7} {row['latency_ms']:>7.0f}ms"
+            )
+
+    print()
+    print(f"{'mode':<8} {'calls':>6} {'input':>9} {'cache_w':>9} {'cache_r':>9} {'output':>8} {'cost':>9} {'avg latency':>12}")
+    for mode, report in reports.items():
+        totals = report["totals"]
+        print(
+            f"{mode:<8} {totals['calls']:>6} {totals['input_tokens']:>9} {totals['cache_creation_input_tokens']:>9} "
+            f"{totals['cache_read_input_tokens']:>9} {totals['output_tokens']:>8} ${totals['cost_usd']:>8.4f} "
+            f"{totals['avg_latency_ms'] or 0:>10.0f}ms"
+        )
+    before, after = reports["legacy"]["totals"]["cost_usd"], reports["compact"]["totals"]["cost_usd"]
+    if before:
+        print(f"\nCompact prompts cost {after / before:.0%} of the legacy prompt for this card.")
+
+
+if __name__ == "__main__":
+    main()
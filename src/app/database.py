@@ -1,11 +1,17 @@
 import os
+import threading
 from functools import lru_cache
+from typing import Any, Callable, Dict
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
 
+from .db_pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, PoolMetrics, instrument_engine, pool_settings_from_env
+
 load_dotenv()
 
 
@@ -20,14 +26,111 @@ def get_database_url() -> str:
     )
 
 
+@lru_cache()
+def get_async_database_url() -> str:
+    """The async-driver form of the database URL (asyncpg / aiosqlite).
+    ASYNC_DATABASE_URL overrides the derived value.
+    """
+    override = os.getenv("ASYNC_DATABASE_URL")
+    if override:
+        return override
+    url = make_url(get_database_url())
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+asyncpg")
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+def pool_kwargs(settings: dict) -> dict:
+    """create_engine() pool arguments for the DB_POOL_* settings."""
+    return {
+        "pool_size": settings["pool_size"],
+        "max_overflow": settings["max_overflow"],
+        "pool_recycle": settings["pool_recycle"],
+        "pool_timeout": settings["pool_timeout"],
+        "pool_pre_ping": settings["pre_ping"] == "always",
+    }
+
+
 def create_db_engine() -> Engine:
-    """Create and return a SQLAlchemy engine."""
-    return create_engine(get_database_url(), pool_pre_ping=True, echo=False)
+    """Create and return a SQLAlchemy engine with an instrumented pool."""
+    settings = pool_settings_from_env()
+    engine = create_engine(get_database_url(), poolclass=InstrumentedQueuePool, echo=False, **pool_kwargs(settings))
+    POOL_METRICS["sync"] = instrument_engine(engine, settings["pre_ping"], settings["pre_ping_idle_seconds"])
+    return engine
+
+
+def create_async_db_engine() -> AsyncEngine:
+    """Create and return an async SQLAlchemy engine for the async routes."""
+    settings = pool_settings_from_env()
+    url = get_async_database_url()
+    if make_url(url).get_backend_name() == "sqlite":
+        # aiosqlite connections are tied to the event loop that opened them; don't pool them
+        engine = create_async_engine(url, poolclass=NullPool, echo=False)
+    else:
+        engine = create_async_engine(url, poolclass=InstrumentedAsyncQueuePool, echo=False, **pool_kwargs(settings))
+    POOL_METRICS["async"] = instrument_engine(
+        engine.sync_engine, settings["pre_ping"], settings["pre_ping_idle_seconds"]
+    )
+    return engine
+
+
+# Pool metrics per engine, exported at /metrics/db-pool
+POOL_METRICS: Dict[str, PoolMetrics] = {}
+
+# Engines and session factories, built on first use so importing the app never connects
+_LAZY: Dict[str, Any] = {}
+# Re-entrant: the session factories build their engine while holding it
+_LAZY_LOCK = threading.RLock()
+
 
+def _lazy(name: str, factory: Callable[[], Any]) -> Any:
+    value = _LAZY.get(name)
+    if value is None:
+        with _LAZY_LOCK:
+            value = _LAZY.get(name)
+            if value is None:
+                value = _LAZY[name] = factory()
+    return value
 
-# Global engine and session factory
-ENGINE: Engine = create_db_engine()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=ENGINE)
+
+def get_engine() -> Engine:
+    """The process-wide sync engine, created on first call."""
+    return _lazy("engine", create_db_engine)
+
+
+def get_async_engine() -> AsyncEngine:
+    """The process-wide async engine, created on first call."""
+    return _lazy("async_engine", create_async_db_engine)
+
+
+def SessionLocal() -> Session:
+    """A new Session bound to the sync engine."""
+    factory = _lazy("sessionmaker", lambda: sessionmaker(autocommit=False, autoflush=False, bind=get_engine()))
+    return factory()
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """A new AsyncSession bound to the async engine."""
+    factory = _lazy(
+        "async_sessionmaker",
+        lambda: async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False),
+    )
+    return factory()
+
+
+async def dispose_engines():
+    """Close pooled connections and forget the engines; the next session builds fresh ones."""
+    with _LAZY_LOCK:
+        engines = [_LAZY.pop(name, None) for name in ("engine", "async_engine")]
+        _LAZY.clear()
+    sync_engine, async_engine = engines
+    if async_engine is not None:
+        await async_engine.dispose()
+    if sync_engine is not None:
+        sync_engine.dispose()
+    POOL_METRICS.clear()
 
 
 def get_db():
@@ -37,3 +140,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """FastAPI dependency that yields an AsyncSession and closes it afterwards."""
+    async with AsyncSessionLocal() as db:
+        yield db
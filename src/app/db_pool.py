@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+PRE_PING_STRATEGIES = ("always", "idle", "never")
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, float("inf"))
+
+
+def pool_settings_from_env() -> Dict[str, Any]:
+    """Pool tuning from DB_POOL_* variables.
+
+    DB_POOL_PRE_PING picks the liveness check: "always" pings on every
+    checkout (one extra round trip each), "idle" only pings connections that
+    sat in the pool longer than DB_POOL_PRE_PING_IDLE_SECONDS, "never" skips it.
+    """
+    pre_ping = os.getenv("DB_POOL_PRE_PING", "idle").lower()
+    if pre_ping not in PRE_PING_STRATEGIES:
+        raise ValueError(f"DB_POOL_PRE_PING must be one of {', '.join(PRE_PING_STRATEGIES)}")
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pre_ping": pre_ping,
+        "pre_ping_idle_seconds": float(os.getenv("DB_POOL_PRE_PING_IDLE_SECONDS", "30")),
+    }
+
+
+class PoolMetrics:
+    """Counters and a checkout wait histogram for one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.pre_pings = 0
+        self.pre_ping_failures = 0
+        self.max_checked_out = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self.pool: Optional[Pool] = None
+
+    def observe_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self.wait_buckets[next(i for i, bound in enumerate(WAIT_BUCKETS) if seconds <= bound)] += 1
+            if isinstance(self.pool, QueuePool):
+                self.max_checked_out = max(self.max_checked_out, self.pool.checkedout())
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _pool_state(self) -> Dict[str, Any]:
+        pool = self.pool
+        if not isinstance(pool, QueuePool):
+            # NullPool and friends hold no connections between checkouts
+            return {"pool": type(pool).__name__ if pool is not None else None}
+        return {
+            "pool": type(pool).__name__,
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self._pool_state()
+        with self._lock:
+            return {
+                **state,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "pre_pings": self.pre_pings,
+                "pre_ping_failures": self.pre_ping_failures,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_histogram": {
+                    ("+Inf" if bound == float("inf") else f"le_{bound:g}"): count
+                    for bound, count in zip(WAIT_BUCKETS, self.wait_buckets)
+                },
+            }
+
+
+class _InstrumentedMixin:
+    """Times `_do_get`, i.e. how long a checkout waited for a free (or new) connection."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.observe_wait(time.perf_counter() - start)
+        return record
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine: Engine, pre_ping: str = "never", pre_ping_idle_seconds: float = 30.0) -> PoolMetrics:
+    """Attach metrics and the idle pre-ping strategy to `engine`'s pool.
+
+    Pass `engine.sync_engine` for an AsyncEngine.
+    """
+    metrics = PoolMetrics()
+    metrics.pool = engine.pool
+    if isinstance(engine.pool, _InstrumentedMixin):
+        engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.increment("connects")
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("invalidations")
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    if pre_ping == "idle":
+        @event.listens_for(engine, "checkout")
+        def ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+            checked_in_at = connection_record.info.get("checked_in_at")
+            if checked_in_at is None or time.monotonic() - checked_in_at < pre_ping_idle_seconds:
+                return
+            metrics.increment("pre_pings")
+            try:
+                alive = engine.dialect.do_ping(dbapi_connection)
+            except Exception:
+                alive = False
+            if not alive:
+                metrics.increment("pre_ping_failures")
+                # The pool discards this connection and retries the checkout with a fresh one
+                raise exc.DisconnectionError("Connection failed idle pre-ping")
+
+    return metrics
@@ -1,14 +1,139 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import datetime
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
-from .database import get_db, ENGINE
-from . import models, schemas
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, WebSocket, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from starlette.concurrency import run_in_threadpool
+
+from .database import dispose_engines, get_async_db, get_db, POOL_METRICS, SessionLocal
+from . import models, pagination, schemas
+from .services.analysis_cache import AnalysisCache
+from .services.analytics import BREAKDOWNS, AnalyticsService
+from .services.batch_analysis import BatchAnalysisService
+from .services.bulk_ingest import as_race_datetime
+from .services.claude_service import ClaudeService, RaceAnalysisResponse
+from .services.export import EXPORT_MODELS, MEDIA_TYPES, ExportService
+from .services.jobs import Job, JobScheduler
+from .services.odds_tracker import OddsTracker
+from .services.partitions import PartitionManager
+from .services.pipeline import DailyPipeline
+from .services.push import PushHub, parse_topics
+from .services.race_card_refresh import RaceCardRefresher
+from .services.racing_api import RacingAPI
+from .services.racing_post_api import RacingPostAPI
 from .services.racing_post_service import RacingPostService
+from .services.settlement import FixtureResults, SettlementService
+from .services.staking import StakingService, current_bankroll
+
+push_hub = PushHub()
+racing_post_service = RacingPostService()
+# /race-cards sources; each has fetch_race_cards(date, validators)
+race_card_sources = {
+    "racing_post": racing_post_service,
+    "racing_api": RacingAPI(),
+    "racing_post_api": RacingPostAPI(),
+}
+race_card_refresher = RaceCardRefresher(racing_post_service.bulk_ingest, push=push_hub)
+analysis_cache = AnalysisCache.from_env()
+claude_service = ClaudeService(api_key=os.getenv("ANTHROPIC_API_KEY"), cache=analysis_cache)
+batch_analysis_service = BatchAnalysisService(claude_service, SessionLocal, push=push_hub)
+export_service = ExportService(SessionLocal)
+partition_manager = PartitionManager(SessionLocal)
+analytics_service = AnalyticsService(SessionLocal)
+staking_service = StakingService()
+odds_tracker = OddsTracker(SessionLocal, api=race_card_sources["racing_post_api"], push=push_hub)
+# Results sources; each has fetch_results(date)
+results_sources = {"racing_api": race_card_sources["racing_api"], "racing_post_api": race_card_sources["racing_post_api"]}
+if os.getenv("RESULTS_FIXTURE_DIR"):
+    results_sources["fixture"] = FixtureResults(os.getenv("RESULTS_FIXTURE_DIR"))
+settlement_service = SettlementService(SessionLocal, results_sources, push=push_hub)
+job_scheduler = JobScheduler()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers; the schema is managed by `alembic upgrade head`, not here.
+
+    Engines are created on the first request that needs one, so the app comes
+    up (and /health answers) even while the database is unreachable.
+    """
+    # Resumes any batch submitted before a restart
+    if os.getenv("ANALYSIS_BATCH_WORKER", "true").lower() == "true":
+        batch_analysis_service.start()
+    # Creates next months' partitions ahead of time and applies PARTITION_RETENTION_MONTHS
+    if os.getenv("PARTITION_MAINTENANCE", "true").lower() == "true":
+        partition_manager.start()
+    # Folds newly placed and settled bets into the /analytics rollups
+    if os.getenv("ANALYTICS_REFRESH_WORKER", "true").lower() == "true":
+        analytics_service.start()
+    # Polls odds for races near the off; off by default as it spends the Racing Post API quota
+    if os.getenv("ODDS_TRACKER", "false").lower() == "true":
+        odds_tracker.start()
+    # Runs /jobs and background=true work on this event loop, and the daily pipeline at DAILY_PIPELINE_AT
+    job_scheduler.start()
+    daily_pipeline.start()
+    yield
+    await daily_pipeline.stop()
+    await job_scheduler.stop(5)
+    await run_in_threadpool(odds_tracker.stop, 5)
+    await run_in_threadpool(analytics_service.stop, 5)
+    await run_in_threadpool(partition_manager.stop, 5)
+    await run_in_threadpool(batch_analysis_service.stop, 5)
+    # Otherwise warm chromedriver/Chrome processes outlive every reload or worker restart
+    await run_in_threadpool(racing_post_service.close)
+    await dispose_engines()
+
+
+app = FastAPI(title="Horse Racing Betting Analyzer", version="0.1.0", lifespan=lifespan)
+
+
+def save_race_analysis(db: Session, race_id: int, claude_analysis: RaceAnalysisResponse) -> models.RaceAnalysis:
+    """Create or replace the stored analysis for a race."""
+    analysis = db.query(models.RaceAnalysis).filter(models.RaceAnalysis.race_id == race_id).first()
+    if analysis is None:
+        analysis = models.RaceAnalysis(race_id=race_id)
+        db.add(analysis)
+
+    fields = claude_analysis.analysis_fields(current_bankroll(db))
+    for field, value in fields.items():
+        setattr(analysis, field, value)
+    analysis.analysis_date = datetime.datetime.utcnow()
+
+    db.commit()
+    db.refresh(analysis)
+    race = db.get(models.Race, race_id)
+    push_hub.publish("analysis", race_id, race.race_date, race.track, analysis={**fields, "analysis_date": analysis.analysis_date})
+    return analysis
+
 
-# Create tables if they don't exist (simple approach for early dev)
-models.Base.metadata.create_all(bind=ENGINE)
+daily_pipeline = DailyPipeline(
+    job_scheduler, SessionLocal, race_card_refresher, race_card_sources, claude_service, save_race_analysis, odds_tracker,
+    settle=settlement_service.run,
+)
 
-app = FastAPI(title="Horse Racing Betting Analyzer", version="0.1.0")
+
+def submit_job(stage: str, params: dict, dedup_key: Optional[str] = None) -> Job:
+    try:
+        return job_scheduler.submit(stage, params, dedup_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def job_accepted(job: Job) -> JSONResponse:
+    """202 with the job as a handle to poll at its Location."""
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=schemas.JobRead.model_validate(job, from_attributes=True).model_dump(mode="json"),
+        headers={"Location": f"/jobs/{job.id}"},
+    )
 
 
 @app.get("/health", tags=["Utility"])
@@ -16,44 +141,390 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/analysis-cache/stats", tags=["Utility"])
+def analysis_cache_stats():
+    return analysis_cache.snapshot()
+
+
+@app.get("/analysis-parse/stats", tags=["Utility"])
+def analysis_parse_stats():
+    """How Claude replies were parsed: forced tool call, JSON in text, or text fallback."""
+    parsed = sum(claude_service.parse_stats.values())
+    return {
+        **claude_service.parse_stats,
+        "fallback_rate": claude_service.parse_stats["fallback"] / parsed if parsed else 0.0,
+    }
+
+
+@app.get("/analysis-usage", tags=["Utility"])
+def analysis_usage():
+    """Per-race token accounting (fresh input, cache writes/reads, output) for recent Claude calls."""
+    return claude_service.usage.report()
+
+
+@app.get("/metrics/db-pool", tags=["Utility"])
+def db_pool_metrics():
+    """Connection pool saturation per engine: checkout waits, checked-out/overflow counts, pre-pings."""
+    return {name: metrics.snapshot() for name, metrics in POOL_METRICS.items()}
+
+
+@app.get("/metrics/push", tags=["Utility"])
+def push_metrics():
+    """WebSocket subscribers, queued messages and delivery counters for /ws."""
+    return push_hub.metrics()
+
+
+@app.websocket("/ws")
+async def push_updates(
+    websocket: WebSocket,
+    date: List[datetime.date] = Query([]),
+    track: List[str] = Query([]),
+    race_id: List[int] = Query([]),
+):
+    """Live race card changes, odds moves and analyses for the dates, tracks and races subscribed to.
+
+    Topics can be given as query parameters and changed later by sending
+    {"action": "subscribe" | "unsubscribe", "date": ..., "track": ..., "race_id": ...}.
+    Messages are JSON deltas with a `type` of race_card, odds or analysis
+    plus the race's race_id, date and track. A client that falls behind gets
+    {"type": "resync"} and should re-read what it shows over HTTP.
+    """
+    await websocket.accept()
+    await push_hub.serve(websocket, parse_topics(date, track, race_id))
+
+
+# -------------------- Analytics Routes --------------------
+@app.get("/analytics/summary", response_model=schemas.AnalyticsTotals, tags=["Analytics"])
+def analytics_summary(
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    db: Session = Depends(get_db),
+):
+    """Totals, strike rate and ROI for bets placed in the range, read from the daily rollups."""
+    return analytics_service.summary(db, date_from, date_to)
+
+
+@app.get("/analytics/pnl", response_model=List[schemas.AnalyticsPeriod], tags=["Analytics"])
+def analytics_pnl(
+    period: str = Query("day", pattern="^(day|week|month)$"),
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    db: Session = Depends(get_db),
+):
+    return analytics_service.pnl(db, period, date_from, date_to)
+
+
+@app.post("/analytics/refresh", response_model=schemas.AnalyticsRefresh, tags=["Analytics"])
+def refresh_analytics(full: bool = False, db: Session = Depends(get_db)):
+    """Fold bets changed since the last refresh into the rollups now; `full` recomputes every day."""
+    return analytics_service.refresh(db, full=full)
+
+
+@app.get("/analytics/{dimension}", response_model=List[schemas.AnalyticsBreakdown], tags=["Analytics"])
+def analytics_breakdown(
+    dimension: str,
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db),
+):
+    """P&L per track, bet_type, jockey or trainer, most profitable first."""
+    if dimension not in BREAKDOWNS:
+        raise HTTPException(status_code=404, detail=f"Unknown analytics dimension: {dimension}")
+    return analytics_service.breakdown(db, dimension, date_from, date_to, limit)
+
+
+@app.post("/staking/plan", response_model=schemas.StakingPlan, tags=["Staking"])
+def staking_plan(plan_in: schemas.StakingPlanRequest, db: Session = Depends(get_db)):
+    """Fractional-Kelly stakes for a whole card within the stored risk parameters and bankroll limits."""
+    if plan_in.candidates is not None:
+        candidates = [candidate.model_dump() for candidate in plan_in.candidates]
+    elif plan_in.race_date is not None:
+        candidates = staking_service.candidates_for_date(db, plan_in.race_date)
+    else:
+        raise HTTPException(status_code=422, detail="Provide candidates or a race_date")
+    return staking_service.plan(db, candidates, kelly_fraction=plan_in.kelly_fraction)
+
+
+# -------------------- Results Routes --------------------
+@app.post("/results/{race_date}/settle", response_model=schemas.ResultsSettlement, tags=["Results"])
+def settle_results(
+    race_date: datetime.date,
+    source: Optional[str] = None,
+    background: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Fetch a day's results from `source` (RESULTS_SOURCE by default) and settle its pending bets.
+
+    Positions are stored on the runners, then every pending bet on a resulted
+    race is settled and its profit added to the bankroll in one transaction.
+    With `background` it runs as a settle job and a 202 with the job is returned.
+    """
+    source = source or settlement_service.default_source
+    if source not in results_sources:
+        raise HTTPException(status_code=400, detail=f"Unknown results source: {source}")
+    if background:
+        return job_accepted(submit_job("settle", {"date": race_date.isoformat(), "source": source}))
+    try:
+        results = results_sources[source].fetch_results(race_date)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to fetch results: {str(e)}")
+    if not results:
+        return schemas.ResultsSettlement(status="no_results")
+    return settlement_service.settle(db, race_date, results)
+
+
+# -------------------- Odds Routes --------------------
+@app.get("/odds/{horse_id}/drift", response_model=schemas.OddsDrift, tags=["Odds"])
+def odds_drift(horse_id: int, minutes: float = Query(10, gt=0, le=1440)):
+    """How far a runner's price has moved over the last `minutes`, from the in-memory odds store."""
+    drift = odds_tracker.drift(horse_id, minutes)
+    if drift is None:
+        raise HTTPException(status_code=404, detail="No odds tracked for this horse")
+    return drift
+
+
+@app.get("/races/{race_id}/odds-drift", response_model=List[schemas.OddsDrift], tags=["Odds"])
+def race_odds_drift(race_id: int, minutes: float = Query(10, gt=0, le=1440)):
+    """Drift of every tracked runner in a race, `cancel` marking those past ODDS_DRIFT_CANCEL_PCT."""
+    return odds_tracker.race_drift(race_id, minutes)
+
+
 @app.post("/races", response_model=schemas.RaceRead, status_code=status.HTTP_201_CREATED, tags=["Races"])
-def create_race(race_in: schemas.RaceCreate, db: Session = Depends(get_db)):
+async def create_race(race_in: schemas.RaceCreate, db: AsyncSession = Depends(get_async_db)):
     race = models.Race(**race_in.model_dump())
     db.add(race)
-    db.commit()
-    db.refresh(race)
+    await db.commit()
+    await db.refresh(race)
     return race
 
 
-@app.get("/races", response_model=list[schemas.RaceRead], tags=["Races"])
-def list_races(db: Session = Depends(get_db)):
-    return db.query(models.Race).all()
+@app.get("/races", response_model=schemas.Page, tags=["Races"])
+async def list_races(
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    track: Optional[str] = None,
+    race_type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,track,race_date"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Races in (race_date, id) order, one keyset page at a time."""
+    try:
+        return await pagination.paginate_async(
+            db, models.Race,
+            key_columns=[models.Race.race_date, models.Race.id],
+            fields=pagination.parse_fields(fields, models.Race),
+            filters=pagination.race_filters(date_from, date_to, track, race_type),
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/race-cards", response_model=List[schemas.RaceRead], tags=["Races"])
-def get_race_cards(date: datetime.date, db: Session = Depends(get_db)):
-    """Get race cards from Racing Post and save to database."""
+def get_race_cards(
+    date: datetime.date,
+    response: Response,
+    source: str = Query("racing_post", pattern="^(racing_post|racing_api|racing_post_api)$"),
+    full: bool = False,
+    background: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Refresh a day's race cards from `source` and return its races.
+
+    Only what changed since the last refresh is written and appended to
+    /race-cards/changes; API sources are asked with If-None-Match/If-Modified-Since
+    first. `full` re-fetches and re-ingests every race. The X-Ingest-Report
+    header carries the inserted/updated/unchanged counts and X-Race-Card-Refresh
+    the whole refresh outcome. With `background` the refresh runs as an
+    ingest job instead and a 202 with the job is returned straight away.
+    """
+    if background:
+        return job_accepted(submit_job("ingest", {"date": date.isoformat(), "source": source, "full": full}))
     try:
-        # Get race cards from Racing Post
-        racing_post_service.save_race_cards_to_db(db, date)
-        
+        refresh = race_card_refresher.refresh(db, date, source, race_card_sources[source].fetch_race_cards, full=full)
+        response.headers["X-Ingest-Report"] = refresh.ingest.model_dump_json()
+        response.headers["X-Race-Card-Refresh"] = refresh.model_dump_json(exclude={"ingest"})
+
         # Return all races for the date
         races = db.query(models.Race).filter(
-            models.Race.race_date == date
+            models.Race.race_date == as_race_datetime(date)
         ).all()
-        
+
         return races
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get race cards: {str(e)}")
 
+
+@app.get("/race-cards/changes", response_model=schemas.RaceCardChanges, tags=["Races"])
+def race_card_changes(
+    since: int = Query(0, ge=0),
+    date: Optional[datetime.date] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    """Race card changes after the change id `since`, oldest first; poll again with `next`."""
+    changes = race_card_refresher.changes(db, since, date, limit)
+    return {"changes": changes, "next": changes[-1].id if changes else since}
+
+
+@app.post("/races/analyze-batch", tags=["Races"])
+def analyze_races_batch(batch_in: schemas.RaceAnalysisBatchRequest, db: Session = Depends(get_db)):
+    """Analyse many races concurrently, streaming each result as NDJSON as soon as it is stored."""
+    query = db.query(models.Race).options(selectinload(models.Race.horses))
+    if batch_in.race_ids:
+        query = query.filter(models.Race.id.in_(batch_in.race_ids))
+    else:
+        day_start = datetime.datetime.combine(batch_in.race_date, datetime.time.min)
+        query = query.filter(
+            models.Race.race_date >= day_start,
+            models.Race.race_date < day_start + datetime.timedelta(days=1),
+        )
+    races = query.all()
+    if not races:
+        raise HTTPException(status_code=404, detail="No races found")
+
+    requests = {race.id: claude_service.format_race_data(race, race.horses) for race in races if race.horses}
+    skipped = [race.id for race in races if not race.horses]
+
+    def persist(race_id: int, claude_analysis: RaceAnalysisResponse) -> dict:
+        # The request session is closed once streaming starts, so each write gets its own
+        session = SessionLocal()
+        try:
+            analysis = save_race_analysis(session, race_id, claude_analysis)
+            return schemas.RaceAnalysisRead.model_validate(analysis, from_attributes=True).model_dump(mode="json")
+        finally:
+            session.close()
+
+    async def stream_results():
+        for race_id in skipped:
+            yield json.dumps({"race_id": race_id, "status": "error", "detail": "No horses found for this race"}) + "\n"
+        async for race_id, result in claude_service.analyze_races(requests, batch_in.concurrency):
+            if isinstance(result, Exception):
+                line = {"race_id": race_id, "status": "error", "detail": str(result)}
+            else:
+                try:
+                    line = {"race_id": race_id, "status": "ok", "analysis": await run_in_threadpool(persist, race_id, result)}
+                except Exception as e:
+                    line = {"race_id": race_id, "status": "error", "detail": f"Failed to save analysis: {str(e)}"}
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+# -------------------- Job Routes --------------------
+@app.post("/jobs", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED, tags=["Jobs"])
+async def create_job(job_in: schemas.JobCreate):
+    """Queue a stage job (ingest, analyse, odds, settle); an unfinished duplicate is returned instead."""
+    return submit_job(job_in.stage, job_in.params, job_in.dedup_key)
+
+
+@app.post("/pipeline/daily", response_model=schemas.JobRead, status_code=status.HTTP_202_ACCEPTED, tags=["Jobs"])
+async def run_daily_pipeline(pipeline_in: schemas.DailyPipelineCreate):
+    """Queue ingest → analyse → odds → settle for a day; returns the ingest job, which queues the rest."""
+    try:
+        return daily_pipeline.run(pipeline_in.race_date, pipeline_in.source)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.get("/jobs", response_model=List[schemas.JobRead], tags=["Jobs"])
+async def list_jobs(
+    stage: Optional[str] = None,
+    status: Optional[str] = Query(None, pattern="^(queued|running|retrying|succeeded|failed|cancelled)$"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Recent jobs, newest first."""
+    return job_scheduler.list(stage, status, limit)
+
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobRead, tags=["Jobs"])
+async def get_job(job_id: str):
+    job = job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.delete("/jobs/{job_id}", response_model=schemas.JobRead, tags=["Jobs"])
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; only the worker running it can."""
+    job = await job_scheduler.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No unfinished job with that id in this worker")
+    return job
+
+
+# -------------------- Analysis Batch Routes --------------------
+@app.post("/analysis-batches", response_model=schemas.AnalysisBatchJobRead, status_code=status.HTTP_202_ACCEPTED, tags=["Analysis"])
+def submit_analysis_batch(batch_in: schemas.AnalysisBatchCreate, db: Session = Depends(get_db)):
+    """Queue every race on a date for overnight analysis via the Message Batches API."""
+    try:
+        return batch_analysis_service.submit_for_date(db, batch_in.race_date, force=batch_in.force)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+
+@app.get("/analysis-batches", response_model=list[schemas.AnalysisBatchJobRead], tags=["Analysis"])
+def list_analysis_batches(db: Session = Depends(get_db)):
+    return db.query(models.AnalysisBatchJob).order_by(models.AnalysisBatchJob.id.desc()).all()
+
+
+@app.get("/analysis-batches/{job_id}", response_model=schemas.AnalysisBatchJobRead, tags=["Analysis"])
+def get_analysis_batch(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(models.AnalysisBatchJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Analysis batch not found")
+    return job
+
+
+@app.get("/races/{race_id}/analysis/stream", tags=["Races"])
+def stream_race_analysis(race_id: int, db: Session = Depends(get_db)):
+    """Analyse a race, streaming each field as NDJSON as soon as Claude has written it."""
+    race = db.query(models.Race).options(selectinload(models.Race.horses)).filter(models.Race.id == race_id).first()
+    if not race:
+        raise HTTPException(status_code=404, detail="Race not found")
+    if not race.horses:
+        raise HTTPException(status_code=400, detail="No horses found for this race")
+    request = claude_service.format_race_data(race, race.horses)
+
+    def persist(claude_analysis: RaceAnalysisResponse) -> dict:
+        session = SessionLocal()
+        try:
+            analysis = save_race_analysis(session, race_id, claude_analysis)
+            return schemas.RaceAnalysisRead.model_validate(analysis, from_attributes=True).model_dump(mode="json")
+        finally:
+            session.close()
+
+    async def stream_fields():
+        try:
+            async for field, value in claude_service.stream_analysis(request, race_id):
+                if field == "analysis":
+                    value = await run_in_threadpool(persist, value)
+                yield json.dumps({"field": field, "value": value}) + "\n"
+        except Exception as e:
+            yield json.dumps({"field": "error", "value": str(e)}) + "\n"
+
+    return StreamingResponse(stream_fields(), media_type="application/x-ndjson")
+
+
 @app.get("/races/{race_id}", response_model=schemas.RaceAnalysisRead, tags=["Races"])
-def analyze_race(race_id: int, db: Session = Depends(get_db)):
-    race = db.get(models.Race, race_id)
+def analyze_race(race_id: int, background: bool = False, db: Session = Depends(get_db)):
+    """Analyse a race and store the analysis; `background` queues an analyse job and returns it with a 202."""
+    if background:
+        if db.get(models.Race, race_id) is None:
+            raise HTTPException(status_code=404, detail="Race not found")
+        return job_accepted(submit_job("analyse", {"race_id": race_id}))
+    race = db.query(models.Race).options(selectinload(models.Race.horses)).filter(models.Race.id == race_id).first()
     if not race:
         raise HTTPException(status_code=404, detail="Race not found")
     
-    horses = db.query(models.Horse).filter(models.Horse.race_id == race_id).all()
+    horses = race.horses
     if not horses:
         raise HTTPException(status_code=400, detail="No horses found for this race")
     
@@ -61,101 +532,177 @@ def analyze_race(race_id: int, db: Session = Depends(get_db)):
         # Get Claude analysis
         claude_analysis = claude_service.analyze_race(race, horses)
         
-        # Create RaceAnalysis record
-        analysis = models.RaceAnalysis(
-            race_id=race_id,
-            winner_prediction=claude_analysis.winner_prediction,
-            confidence_score=claude_analysis.confidence_score,
-            stake_recommendation=claude_analysis.suggested_stake * 1000,  # Convert percentage to dollar amount
-            expected_profit=claude_analysis.expected_profit,
-            analysis_reasoning=claude_analysis.analysis_reasoning,
-            risk_assessment=claude_analysis.risk_assessment
-        )
-        
-        db.add(analysis)
-        db.commit()
-        db.refresh(analysis)
-        return analysis
+        return save_race_analysis(db, race_id, claude_analysis)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+@app.get("/races/{race_id}/full", response_model=schemas.RaceFullRead, tags=["Races"])
+async def get_race_full(race_id: int, db: AsyncSession = Depends(get_async_db)):
+    """A race with its runners and analysis, fetched in a single joined query."""
+    race = (await db.execute(
+        select(models.Race)
+        .options(joinedload(models.Race.horses), joinedload(models.Race.analysis))
+        .where(models.Race.id == race_id)
+    )).unique().scalar_one_or_none()
+    if not race:
+        raise HTTPException(status_code=404, detail="Race not found")
+    return race
+
+
 @app.get("/races/{race_id}", response_model=schemas.RaceRead, tags=["Races"])
-def get_race(race_id: int, db: Session = Depends(get_db)):
-    race = db.get(models.Race, race_id)
+async def get_race(race_id: int, db: AsyncSession = Depends(get_async_db)):
+    race = await db.get(models.Race, race_id)
     if not race:
         raise HTTPException(status_code=404, detail="Race not found")
     return race
 
 
 @app.put("/races/{race_id}", response_model=schemas.RaceRead, tags=["Races"])
-def update_race(race_id: int, race_in: schemas.RaceUpdate, db: Session = Depends(get_db)):
-    race = db.get(models.Race, race_id)
+async def update_race(race_id: int, race_in: schemas.RaceUpdate, db: AsyncSession = Depends(get_async_db)):
+    race = await db.get(models.Race, race_id)
     if not race:
         raise HTTPException(status_code=404, detail="Race not found")
-    for field, value in race_in.model_dump(exclude_unset=True).items():
+    changes = race_in.model_dump(exclude_unset=True)
+    for field, value in changes.items():
         setattr(race, field, value)
-    db.commit()
-    db.refresh(race)
+    if "race_date" in changes:
+        # Runners carry the race date as their partition key; moving the race moves them
+        await db.execute(
+            update(models.Horse).where(models.Horse.race_id == race_id).values(race_date=race.race_date)
+        )
+    await db.commit()
+    await db.refresh(race)
     return race
 
 
 @app.delete("/races/{race_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Races"])
-def delete_race(race_id: int, db: Session = Depends(get_db)):
-    race = db.get(models.Race, race_id)
+async def delete_race(race_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Cascaded children must be loaded up front; async sessions can't lazy-load them
+    race = await db.get(
+        models.Race, race_id,
+        options=[selectinload(models.Race.horses), selectinload(models.Race.analysis)],
+    )
     if not race:
         raise HTTPException(status_code=404, detail="Race not found")
-    db.delete(race)
-    db.commit()
+    await db.delete(race)
+    await db.commit()
     return None
 
 
 # -------------------- Horse Routes --------------------
 @app.post("/horses", response_model=schemas.HorseRead, status_code=status.HTTP_201_CREATED, tags=["Horses"])
-def create_horse(horse_in: schemas.HorseCreate, db: Session = Depends(get_db)):
+async def create_horse(horse_in: schemas.HorseCreate, db: AsyncSession = Depends(get_async_db)):
      # Ensure race exists
-     race = db.get(models.Race, horse_in.race_id)
+     race = await db.get(models.Race, horse_in.race_id)
      if not race:
          raise HTTPException(status_code=404, detail="Race not found")
 
-     horse = models.Horse(**horse_in.model_dump())
+     horse = models.Horse(**horse_in.model_dump(), race_date=race.race_date)
      db.add(horse)
-     db.commit()
-     db.refresh(horse)
+     await db.commit()
+     await db.refresh(horse)
      return horse
 
 
-@app.get("/horses", response_model=list[schemas.HorseRead], tags=["Horses"])
-def list_horses(db: Session = Depends(get_db)):
-     return db.query(models.Horse).all()
+@app.get("/horses", response_model=schemas.Page, tags=["Horses"])
+async def list_horses(
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_LIMIT, ge=1, le=pagination.MAX_LIMIT),
+    race_id: Optional[int] = None,
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    track: Optional[str] = None,
+    race_type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. id,name,odds"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Horses in id order, one keyset page at a time; race filters apply to the horse's race."""
+    filters = pagination.race_filters(date_from, date_to, track, race_type, date_column=models.Horse.race_date)
+    joins = [(models.Race, models.Horse.race_id == models.Race.id)] if track or race_type else []
+    if race_id is not None:
+        filters.append(models.Horse.race_id == race_id)
+    try:
+        return await pagination.paginate_async(
+            db, models.Horse,
+            key_columns=[models.Horse.id],
+            fields=pagination.parse_fields(fields, models.Horse),
+            filters=filters,
+            joins=joins,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# -------------------- Export Routes --------------------
+@app.get("/export/{entity}", tags=["Export"])
+def export_rows(
+    entity: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|arrow)$"),
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    track: Optional[str] = None,
+    race_type: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to export"),
+):
+    """Stream every matching race, horse or bet as NDJSON, CSV or Arrow IPC in constant memory."""
+    model = EXPORT_MODELS.get(entity)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {entity}")
+    try:
+        columns = pagination.parse_fields(fields, model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    date_column = models.Horse.race_date if model is models.Horse else None
+    filters = pagination.race_filters(date_from, date_to, track, race_type, date_column=date_column)
+    needs_race = track or race_type or (filters and model is models.Bet)
+    joins = [(models.Race, model.race_id == models.Race.id)] if needs_race and model is not models.Race else []
+    try:
+        body = export_service.stream(format, model, columns, filters, joins)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    extension = {"ndjson": "ndjson", "csv": "csv", "arrow": "arrows"}[format]
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{extension}"'},
+    )
 
 
 @app.get("/horses/{horse_id}", response_model=schemas.HorseRead, tags=["Horses"])
-def get_horse(horse_id: int, db: Session = Depends(get_db)):
-     horse = db.get(models.Horse, horse_id)
+async def get_horse(horse_id: int, db: AsyncSession = Depends(get_async_db)):
+     horse = await db.get(models.Horse, horse_id)
      if not horse:
          raise HTTPException(status_code=404, detail="Horse not found")
      return horse
 
 
 @app.put("/horses/{horse_id}", response_model=schemas.HorseRead, tags=["Horses"])
-def update_horse(horse_id: int, horse_in: schemas.HorseUpdate, db: Session = Depends(get_db)):
-     horse = db.get(models.Horse, horse_id)
+async def update_horse(horse_id: int, horse_in: schemas.HorseUpdate, db: AsyncSession = Depends(get_async_db)):
+     horse = await db.get(models.Horse, horse_id)
      if not horse:
          raise HTTPException(status_code=404, detail="Horse not found")
+     old_odds = horse.odds
      for field, value in horse_in.model_dump(exclude_unset=True).items():
          setattr(horse, field, value)
-     db.commit()
-     db.refresh(horse)
+     await db.commit()
+     await db.refresh(horse)
+     # A price move makes any cached analysis of the race stale
+     if horse.odds != old_odds:
+         analysis_cache.invalidate_race(horse.race_id)
      return horse
 
 
 @app.delete("/horses/{horse_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Horses"])
-def delete_horse(horse_id: int, db: Session = Depends(get_db)):
-     horse = db.get(models.Horse, horse_id)
+async def delete_horse(horse_id: int, db: AsyncSession = Depends(get_async_db)):
+     horse = await db.get(models.Horse, horse_id)
      if not horse:
          raise HTTPException(status_code=404, detail="Horse not found")
-     db.delete(horse)
-     db.commit()
+     await db.delete(horse)
+     await db.commit()
      return None
@@ -1,19 +1,31 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, ForeignKey, Boolean, Text, JSON, UniqueConstraint, Index, event, select
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
 
 class Race(Base):
     __tablename__ = "races"
+    __table_args__ = (
+        # Natural identity of a race: one meeting, one off time per day.
+        # Its leading columns also serve race_date and (race_date, track) lookups.
+        UniqueConstraint("race_date", "track", "off_time", name="uq_races_natural_key"),
+        # Keyset pagination order for GET /races
+        Index("ix_races_race_date_id", "race_date", "id"),
+        # Track-filtered listings and exports, ordered by date within the track
+        Index("ix_races_track_race_date", "track", "race_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    race_date = Column(DateTime)
+    race_date = Column(DateTime, nullable=False)
     track = Column(String)
+    off_time = Column(String)  # local off time, e.g. "14:30"
     distance = Column(Integer)  # metres
     race_type = Column(String)
     class_rating = Column(Integer)
     total_runners = Column(Integer)
+    # When the race's result was recorded; its bets can be settled from then on
+    result_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -22,9 +34,16 @@ class Race(Base):
 
 class Horse(Base):
     __tablename__ = "horses"
+    __table_args__ = (
+        # Also the horses-by-race index (race_id is the leading column). race_date
+        # is implied by race_id but Postgres needs the partition key in every unique key.
+        UniqueConstraint("race_id", "race_date", "name", name="uq_horses_race_name"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     race_id = Column(Integer, ForeignKey("races.id"))
+    # Copy of the race's date: the monthly partition key on Postgres (migration 0005)
+    race_date = Column(DateTime, nullable=False)
     name = Column(String)
     jockey = Column(String)
     trainer = Column(String)
@@ -36,11 +55,26 @@ class Horse(Base):
     places = Column(Integer)
     starts = Column(Integer)
     avg_position = Column(Float)
+    # Set when a refresh finds the runner gone from its race card; cleared if it returns
+    scratched_at = Column(DateTime)
+    finish_position = Column(Integer)  # from the race's result; NULL if unplaced (pulled up, fell, ...) or not yet run
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     race = relationship("Race", back_populates="horses")
 
+@event.listens_for(Horse, "before_insert")
+def copy_race_date(mapper, connection, horse):
+    """Fill a new runner's race_date from its race unless the caller set it."""
+    if horse.race_date is not None:
+        return
+    # Only use an already loaded race; async sessions can't lazy-load here
+    race = horse.__dict__.get("race")
+    if race is not None:
+        horse.race_date = race.race_date
+    else:
+        horse.race_date = connection.scalar(select(Race.race_date).where(Race.id == horse.race_id))
+
 class RaceAnalysis(Base):
     __tablename__ = "race_analysis"
 
@@ -58,23 +92,105 @@ class RaceAnalysis(Base):
 
     race = relationship("Race", back_populates="analysis")
 
+class AnalysisBatchJob(Base):
+    __tablename__ = "analysis_batch_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String, unique=True)  # Anthropic Message Batch ID, set once submitted
+    race_date = Column(DateTime, index=True)
+    race_ids = Column(Text)  # JSON list of the races packed into the batch
+    status = Column(String, index=True)  # PENDING, SUBMITTED, COMPLETED, FAILED
+    succeeded = Column(Integer)
+    errored = Column(Integer)
+    error = Column(Text)
+    submitted_at = Column(DateTime)
+    completed_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Bet(Base):
     __tablename__ = "bets"
 
     id = Column(Integer, primary_key=True, index=True)
-    race_id = Column(Integer, ForeignKey("races.id"))
-    horse_id = Column(Integer, ForeignKey("horses.id"))
+    race_id = Column(Integer, ForeignKey("races.id"), index=True)
+    # No foreign key: horses is partitioned on Postgres and its id alone isn't unique there
+    horse_id = Column(Integer, index=True)
     stake = Column(Float)
     odds = Column(Float)
     bet_type = Column(String)  # WIN, PLACE, EACH_WAY
-    placed_at = Column(DateTime, default=datetime.utcnow)
-    result = Column(String)  # WON, LOST, PENDING
+    placed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)  # monthly partition key on Postgres
+    result = Column(String)  # PENDING, then WON (any part paid out), LOST or VOID (non-runner, stake returned)
     profit = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Indexed: the analytics refresh finds changed bets by it
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     race = relationship("Race")
-    horse = relationship("Horse")
+    horse = relationship("Horse", primaryjoin="foreign(Bet.horse_id) == Horse.id")
+
+class BetRollup(Base):
+    """Daily bet totals per dimension value, maintained by AnalyticsService.refresh()."""
+    __tablename__ = "bet_rollups"
+    __table_args__ = (
+        # Also the (dimension, day range) index every /analytics query uses
+        UniqueConstraint("dimension", "day", "key", name="uq_bet_rollups_dimension_day_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    dimension = Column(String, nullable=False)  # all, track, bet_type, jockey, trainer
+    key = Column(String, nullable=False)  # the track, bet type, ... ("" for all)
+    day = Column(Date, nullable=False)  # date the bets were placed
+    bets = Column(Integer, nullable=False)
+    settled = Column(Integer, nullable=False)  # WON or LOST
+    wins = Column(Integer, nullable=False)
+    staked = Column(Float, nullable=False)
+    settled_stake = Column(Float, nullable=False)
+    profit = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class RollupWatermark(Base):
+    """How far a rollup has caught up with its source table's updated_at."""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    refreshed_through = Column(DateTime)
+
+class RaceCardSnapshot(Base):
+    """The last race cards fetched from a source for a day, with the validators to fetch them conditionally."""
+    __tablename__ = "race_card_snapshots"
+    __table_args__ = (
+        UniqueConstraint("source", "race_date", name="uq_race_card_snapshots_source_date"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, nullable=False)  # racing_post, racing_api, racing_post_api
+    race_date = Column(DateTime, nullable=False)
+    cards = Column(JSON, nullable=False)  # see race_card_refresh.snapshot_cards
+    content_hash = Column(String, nullable=False)
+    etag = Column(String)
+    last_modified = Column(String)
+    checked_at = Column(DateTime)  # last fetch, 304s included
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RaceCardChange(Base):
+    """One difference between consecutive snapshots of a day's cards; `id` is the /race-cards/changes cursor."""
+    __tablename__ = "race_card_changes"
+    __table_args__ = (
+        Index("ix_race_card_changes_race_date_id", "race_date", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, nullable=False)
+    race_date = Column(DateTime, nullable=False)
+    change_type = Column(String, nullable=False)  # race_added, race_removed, race_changed, runner_added, ...
+    race_id = Column(Integer)
+    track = Column(String, nullable=False)
+    off_time = Column(String)
+    horse_name = Column(String)
+    field = Column(String)  # the changed column for race_changed, runner_changed and odds_changed
+    old_value = Column(JSON)
+    new_value = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 class Bankroll(Base):
     __tablename__ = "bankroll"
@@ -82,7 +198,8 @@ class Bankroll(Base):
     id = Column(Integer, primary_key=True, index=True)
     current_amount = Column(Float)
     initial_amount = Column(Float)
-    max_drawdown = Column(Float)
+    max_drawdown = Column(Float)  # percent: the largest fall from peak_amount, kept up to date by settlement
+    peak_amount = Column(Float)  # highest current_amount reached
     daily_limit = Column(Float)
     weekly_limit = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -99,3 +216,19 @@ class RiskParameter(Base):
     stop_loss_weekly = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class OddsTick(Base):
+    """One observed price for a runner, flushed in batches from the in-memory OddsStore."""
+    __tablename__ = "odds_ticks"
+    __table_args__ = (
+        # Per-runner history in time order
+        Index("ix_odds_ticks_horse_id_recorded_at", "horse_id", "recorded_at"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    # No foreign key: horses is partitioned on Postgres (migration 0005)
+    horse_id = Column(Integer, nullable=False)
+    race_id = Column(Integer, ForeignKey("races.id"), nullable=False)
+    odds = Column(Float, nullable=False)  # decimal
+    # Monthly partition key on Postgres (migration 0008)
+    recorded_at = Column(DateTime, nullable=False)
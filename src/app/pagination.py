@@ -0,0 +1,119 @@
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Opaque, URL-safe token holding the sort key of the last row on a page."""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, key_columns: Sequence) -> List[Any]:
+    """Inverse of `encode_cursor`; raises ValueError for malformed or foreign tokens."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(key_columns):
+        raise ValueError("Invalid cursor")
+    return [
+        datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+        for column, value in zip(key_columns, values)
+    ]
+
+
+def parse_fields(fields: Optional[str], model) -> List[str]:
+    """Validate a comma-separated sparse fieldset against the model's columns."""
+    columns = [column.key for column in model.__table__.columns]
+    if not fields:
+        return columns
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in columns]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
+
+
+def race_filters(date_from: Optional[date], date_to: Optional[date],
+                 track: Optional[str], race_type: Optional[str], date_column=None) -> list:
+    """WHERE clauses on races shared by the list and export endpoints.
+
+    `date_column` bounds a copy of the race date instead, e.g. Horse.race_date,
+    whose partition key lets Postgres skip the months outside the range.
+    """
+    date_column = models.Race.race_date if date_column is None else date_column
+    filters = []
+    if date_from:
+        filters.append(date_column >= datetime.combine(date_from, time.min))
+    if date_to:
+        filters.append(date_column < datetime.combine(date_to + timedelta(days=1), time.min))
+    if track:
+        filters.append(models.Race.track == track)
+    if race_type:
+        filters.append(models.Race.race_type == race_type)
+    return filters
+
+
+def page_statement(
+    model,
+    key_columns: Sequence,
+    fields: List[str],
+    filters: Sequence = (),
+    joins: Sequence = (),
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT,
+) -> Tuple[Select, List[str]]:
+    """SELECT for one keyset page, plus the labels its sort-key columns are selected under."""
+    key_labels = [f"_key_{i}" for i in range(len(key_columns))]
+    stmt = select(
+        *[getattr(model, field) for field in fields],
+        *[column.label(label) for column, label in zip(key_columns, key_labels)],
+    ).select_from(model)
+    for target, onclause in joins:
+        stmt = stmt.join(target, onclause)
+    stmt = stmt.where(*filters)
+    if cursor:
+        stmt = stmt.where(tuple_(*key_columns) > tuple_(*decode_cursor(cursor, key_columns)))
+    return stmt.order_by(*key_columns).limit(limit + 1), key_labels
+
+
+def build_page(rows: Sequence, fields: List[str], key_labels: List[str], limit: int) -> schemas.Page:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor([rows[-1][label] for label in key_labels]) if has_more else None
+    return schemas.Page(
+        items=[{field: row[field] for field in fields} for row in rows],
+        next_cursor=next_cursor,
+        limit=limit,
+    )
+
+
+def paginate(db: Session, model, key_columns: Sequence, fields: List[str], limit: int = DEFAULT_LIMIT, **kwargs) -> schemas.Page:
+    """Fetch one keyset page of `model` rows as plain dicts.
+
+    Rows are ordered by `key_columns` (unique as a whole, ending in the
+    primary key) and the page starts strictly after the cursor's key, so
+    every page costs one index range scan however deep it is. Only the
+    requested `fields` are selected; no ORM objects are built.
+    """
+    stmt, key_labels = page_statement(model, key_columns, fields, limit=limit, **kwargs)
+    return build_page(db.execute(stmt).mappings().all(), fields, key_labels, limit)
+
+
+async def paginate_async(
+    db: AsyncSession, model, key_columns: Sequence, fields: List[str], limit: int = DEFAULT_LIMIT, **kwargs
+) -> schemas.Page:
+    """`paginate` for an AsyncSession."""
+    stmt, key_labels = page_statement(model, key_columns, fields, limit=limit, **kwargs)
+    return build_page((await db.execute(stmt)).mappings().all(), fields, key_labels, limit)
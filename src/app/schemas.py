@@ -1,12 +1,14 @@
-from datetime import datetime
-from typing import Optional, List
+import json
+from datetime import datetime, date
+from typing import Any, Dict, Optional, List
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class RaceBase(BaseModel):
     race_date: datetime
     track: str
+    off_time: Optional[str] = None
     distance: int = Field(..., ge=0)
     race_type: str
     class_rating: Optional[int] = None
@@ -20,14 +22,25 @@ class RaceCreate(RaceBase):
 class RaceUpdate(BaseModel):
     race_date: Optional[datetime] = None
     track: Optional[str] = None
+    off_time: Optional[str] = None
     distance: Optional[int] = Field(None, ge=0)
     race_type: Optional[str] = None
     class_rating: Optional[int] = None
     total_runners: Optional[int] = None
 
+    @field_validator("race_date")
+    @classmethod
+    def race_date_not_null(cls, value):
+        # Omit race_date to keep it; it is the keyset sort key and can't be cleared
+        if value is None:
+            raise ValueError("race_date cannot be null")
+        return value
+
 
 class RaceRead(RaceBase):
     id: int
+    distance: Optional[int] = None  # not on scraped race cards
+    result_at: datetime | None = None  # when its result was recorded
     created_at: datetime
     updated_at: datetime
 
@@ -39,6 +52,55 @@ class RacesList(BaseModel):
     races: List[RaceRead]
 
 
+# -------------------- Pagination Schemas --------------------
+class Page(BaseModel):
+    """One keyset page; pass `next_cursor` back as `cursor` for the next one."""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    limit: int
+
+
+# -------------------- Ingest Schemas --------------------
+class IngestCounts(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+class IngestReport(BaseModel):
+    races: IngestCounts = Field(default_factory=IngestCounts)
+    horses: IngestCounts = Field(default_factory=IngestCounts)
+
+
+class RaceCardRefresh(BaseModel):
+    status: str  # changed, unchanged, not_modified (304), empty (nothing fetched) or skipped (refresh in progress)
+    changes: int = 0  # rows appended to the /race-cards/changes feed
+    ingest: IngestReport = Field(default_factory=IngestReport)
+
+
+class RaceCardChangeRead(BaseModel):
+    id: int  # pass the last one seen as `since`
+    source: str
+    race_date: datetime
+    change_type: str  # race_added, race_removed, race_changed, runner_added, runner_scratched, runner_changed, odds_changed
+    race_id: Optional[int] = None
+    track: str
+    off_time: Optional[str] = None
+    horse_name: Optional[str] = None
+    field: Optional[str] = None
+    old_value: Any = None
+    new_value: Any = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class RaceCardChanges(BaseModel):
+    changes: List[RaceCardChangeRead]
+    next: int  # `since` for the next poll
+
+
 # -------------------- Horse Schemas --------------------
 class HorseBase(BaseModel):
     name: str
@@ -75,6 +137,8 @@ class HorseUpdate(BaseModel):
 class HorseRead(HorseBase):
     id: int
     race_id: int
+    scratched_at: datetime | None = None
+    finish_position: int | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -115,6 +179,80 @@ class BetRead(BetBase):
         orm_mode = True
 
 
+# -------------------- Analytics Schemas --------------------
+class AnalyticsTotals(BaseModel):
+    bets: int
+    settled: int  # WON or LOST
+    wins: int
+    staked: float
+    profit: float
+    strike_rate: Optional[float] = None  # wins / settled
+    roi: Optional[float] = None  # profit / stake of settled bets
+
+
+class AnalyticsPeriod(AnalyticsTotals):
+    period: date  # first day of the day, week (Monday) or month
+
+
+class AnalyticsBreakdown(AnalyticsTotals):
+    key: str  # track, bet type, jockey or trainer
+
+
+class AnalyticsRefresh(BaseModel):
+    days: int  # days recomputed
+    skipped: bool  # another worker was refreshing
+
+
+# -------------------- Staking Schemas --------------------
+class StakingCandidate(BaseModel):
+    race_id: int  # runners of one race share the correlation limit
+    horse_id: int
+    odds: float = Field(..., gt=1)  # decimal
+    probability: float = Field(..., ge=0, le=1)  # model win probability
+
+
+class StakingPlanRequest(BaseModel):
+    candidates: Optional[List[StakingCandidate]] = None
+    race_date: Optional[date] = None  # without candidates: each analysed race's predicted winner that day
+    kelly_fraction: Optional[float] = Field(None, gt=0, le=1)
+
+
+class StakingBet(StakingCandidate):
+    kelly: float  # full Kelly fraction of the bankroll
+    stake: float
+    expected_profit: float
+    limits: List[str]  # constraints that cut the stake below fractional Kelly
+
+
+class StakingExposure(BaseModel):
+    staked_today: float
+    staked_week: float
+    pnl_today: float
+    pnl_week: float
+
+
+class StakingPlan(BaseModel):
+    bankroll: float
+    kelly_fraction: float
+    total_stake: float
+    expected_profit: float
+    halted: bool  # a stop-loss has been hit; every stake is 0
+    exposure: StakingExposure
+    bets: List[StakingBet]
+
+
+# -------------------- Odds Schemas --------------------
+class OddsDrift(BaseModel):
+    horse_id: int
+    race_id: int
+    odds: float  # latest
+    previous_odds: float  # at `since`
+    change_pct: float  # positive when the price lengthened
+    since: datetime
+    complete: bool  # False when the kept history is shorter than the window asked for
+    cancel: bool  # change_pct reached ODDS_DRIFT_CANCEL_PCT
+
+
 # -------------------- Bankroll Schemas --------------------
 class BankrollBase(BaseModel):
     current_amount: float
@@ -137,6 +275,7 @@ class BankrollUpdate(BaseModel):
 
 class BankrollRead(BankrollBase):
     id: int
+    peak_amount: float | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -144,6 +283,23 @@ class BankrollRead(BankrollBase):
         orm_mode = True
 
 
+# -------------------- Results Schemas --------------------
+class ResultsSettlement(BaseModel):
+    status: str  # settled, no_results (nothing fetched) or skipped (settlement in progress)
+    races_resulted: int = 0  # races whose result was recorded
+    unmatched: List[str] = []  # results with no race on the card, as "track|off_time"
+    races_settled: int = 0  # races with pending bets settled
+    bets_settled: int = 0
+    won: int = 0  # any part paid out
+    lost: int = 0
+    void: int = 0  # non-runners; stake returned
+    staked: float = 0.0
+    returns: float = 0.0
+    profit: float = 0.0
+    bankroll: Optional[float] = None  # after settlement; None without a bankroll row
+    max_drawdown: Optional[float] = None  # percent
+
+
 # -------------------- Race Analysis Schemas --------------------
 class RaceAnalysisBase(BaseModel):
     race_id: int
@@ -174,3 +330,83 @@ class RaceAnalysisRead(RaceAnalysisBase):
 
     class Config:
         orm_mode = True
+
+
+class RaceFullRead(RaceRead):
+    """A race with its runners and stored analysis, for GET /races/{id}/full."""
+    horses: List[HorseRead] = []
+    analysis: Optional[RaceAnalysisRead] = None
+
+    class Config:
+        orm_mode = True
+
+
+class RaceAnalysisBatchRequest(BaseModel):
+    race_date: Optional[date] = None
+    race_ids: Optional[List[int]] = None
+    concurrency: Optional[int] = Field(None, ge=1, le=50)
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.race_date is None) == (not self.race_ids):
+            raise ValueError("Provide either race_date or race_ids")
+        return self
+
+
+# -------------------- Analysis Batch Schemas --------------------
+class AnalysisBatchCreate(BaseModel):
+    race_date: date
+    force: bool = False
+
+
+class AnalysisBatchJobRead(BaseModel):
+    id: int
+    batch_id: Optional[str] = None
+    race_date: datetime
+    race_ids: List[int]
+    status: str
+    succeeded: Optional[int] = None
+    errored: Optional[int] = None
+    error: Optional[str] = None
+    submitted_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+
+    @field_validator("race_ids", mode="before")
+    @classmethod
+    def parse_race_ids(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+
+    class Config:
+        orm_mode = True
+
+
+# -------------------- Job Schemas --------------------
+class JobCreate(BaseModel):
+    stage: str
+    params: Dict[str, Any] = {}
+    dedup_key: Optional[str] = None  # defaults to the stage and params
+
+
+class DailyPipelineCreate(BaseModel):
+    race_date: date
+    source: str = Field("racing_post", pattern="^(racing_post|racing_api|racing_post_api)$")
+
+
+class JobRead(BaseModel):
+    id: str
+    stage: str
+    params: Dict[str, Any]
+    dedup_key: str
+    status: str  # queued, running, retrying, succeeded, failed or cancelled
+    attempts: int
+    max_attempts: int
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
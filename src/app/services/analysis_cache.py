@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from .claude_service import RaceAnalysisRequest, RaceAnalysisResponse
+
+REDIS_PREFIX = "analysis-cache"
+
+
+def make_cache_key(request: RaceAnalysisRequest, model: str) -> str:
+    """Content address of an analysis: SHA-256 of the normalised request plus model name.
+
+    Runners are sorted by name and the JSON is canonicalised, so the same card
+    always hashes the same way while any change (odds, jockey, ...) gives a new key.
+    """
+    payload = request.model_dump()
+    payload["horses"] = sorted(payload["horses"], key=lambda horse: str(horse.get("name")))
+    canonical = json.dumps(
+        {"model": model, "request": payload},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class AnalysisCache:
+    """Two-tier cache of Claude race analyses.
+
+    An in-process LRU with a TTL sits in front of an optional Redis tier that
+    is shared between workers. Entries are indexed by race so they can be
+    dropped when a runner's odds change.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 6 * 3600,
+        redis_client=None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis_client
+        self.clock = clock
+
+        # key -> (expires_at, analysis dict, race_id)
+        self._entries: "OrderedDict[str, Tuple[float, dict, Optional[int]]]" = OrderedDict()
+        self._race_keys: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    make_key = staticmethod(make_cache_key)
+
+    @classmethod
+    def from_env(cls) -> "AnalysisCache":
+        """Build a cache from ANALYSIS_CACHE_* settings, adding Redis when REDIS_URL is set."""
+        redis_client = None
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url:
+            import redis
+            redis_client = redis.Redis.from_url(redis_url)
+        return cls(
+            max_entries=int(os.getenv("ANALYSIS_CACHE_SIZE", "512")),
+            ttl_seconds=float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(6 * 3600))),
+            redis_client=redis_client,
+        )
+
+    def get(self, key: str, race_id: Optional[int] = None) -> Optional[RaceAnalysisResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return RaceAnalysisResponse(**value)
+                self._drop(key)
+                self.stats["expirations"] += 1
+
+        value = self._redis_get(key)
+        if value is not None:
+            self.stats["redis_hits"] += 1
+            self._store_local(key, value, race_id)
+            return RaceAnalysisResponse(**value)
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, response: RaceAnalysisResponse, race_id: Optional[int] = None):
+        value = response.model_dump()
+        self._store_local(key, value, race_id)
+        self._redis_set(key, value, race_id)
+
+    def invalidate_race(self, race_id: int):
+        """Drop every cached analysis for a race, e.g. after its odds changed."""
+        with self._lock:
+            for key in self._race_keys.pop(race_id, set()):
+                self._entries.pop(key, None)
+        self.stats["invalidations"] += 1
+
+        if self.redis is not None:
+            try:
+                index = f"{REDIS_PREFIX}:race:{race_id}"
+                keys = [f"{REDIS_PREFIX}:{key.decode() if isinstance(key, bytes) else key}"
+                        for key in self.redis.smembers(index)]
+                self.redis.delete(index, *keys)
+            except Exception as e:
+                print(f"Analysis cache Redis invalidation failed: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._race_keys.clear()
+
+    def snapshot(self) -> Dict[str, object]:
+        """Counters plus current size, for the stats endpoint."""
+        lookups = self.stats["hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": (self.stats["hits"] + self.stats["redis_hits"]) / lookups if lookups else 0.0,
+            "redis": self.redis is not None,
+        }
+
+    def _store_local(self, key: str, value: dict, race_id: Optional[int]):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, value, race_id)
+            self._entries.move_to_end(key)
+            if race_id is not None:
+                self._race_keys.setdefault(race_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def _drop(self, key: str):
+        """Remove an entry and its race index link. Caller holds the lock."""
+        _, _, race_id = self._entries.pop(key)
+        keys = self._race_keys.get(race_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._race_keys[race_id]
+
+    def _redis_get(self, key: str) -> Optional[dict]:
+        if self.redis is None:
+            return None
+        try:
+            raw = self.redis.get(f"{REDIS_PREFIX}:{key}")
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            print(f"Analysis cache Redis read failed: {str(e)}")
+            return None
+
+    def _redis_set(self, key: str, value: dict, race_id: Optional[int]):
+        if self.redis is None:
+            return
+        ttl = max(1, int(self.ttl_seconds))
+        try:
+            self.redis.setex(f"{REDIS_PREFIX}:{key}", ttl, json.dumps(value))
+            if race_id is not None:
+                index = f"{REDIS_PREFIX}:race:{race_id}"
+                self.redis.sadd(index, key)
+                self.redis.expire(index, ttl)
+        except Exception as e:
+            print(f"Analysis cache Redis write failed: {str(e)}")
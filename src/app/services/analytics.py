@@ -0,0 +1,222 @@
+import hashlib
+import os
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, Float, and_, case, delete, func, insert, literal, literal_column, or_, select
+from sqlalchemy.orm import Session
+
+from ..models import Bet, BetRollup, Horse, Race, RollupWatermark
+
+WATERMARK = "bet_rollups"
+
+# dimension -> (grouping column, tables joined onto bets to reach it)
+DIMENSIONS = {
+    "all": (literal_column("''"), []),
+    "track": (Race.track, [(Race, Bet.race_id == Race.id)]),
+    "bet_type": (Bet.bet_type, []),
+    "jockey": (Horse.jockey, [(Horse, Bet.horse_id == Horse.id)]),
+    "trainer": (Horse.trainer, [(Horse, Bet.horse_id == Horse.id)]),
+}
+BREAKDOWNS = [dimension for dimension in DIMENSIONS if dimension != "all"]
+PERIODS = ("day", "week", "month")
+
+ROLLUP_COLUMNS = ["dimension", "key", "day", "bets", "settled", "wins", "staked", "settled_stake", "profit", "updated_at"]
+
+# Bets written by a transaction that committed after a refresh read the watermark
+# can carry an older updated_at; rescanning this far back picks them up
+WATERMARK_LAG = timedelta(minutes=5)
+
+ADVISORY_LOCK_KEY = int(hashlib.sha1(b"analytics-refresh").hexdigest()[:15], 16)
+
+
+def period_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def day_ranges(days: List[date]) -> List[Tuple[datetime, datetime]]:
+    """Collapse sorted days into [start, end) datetime ranges of consecutive days."""
+    ranges = []
+    for day in days:
+        start = datetime.combine(day, datetime.min.time())
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], start + timedelta(days=1))
+        else:
+            ranges.append((start, start + timedelta(days=1)))
+    return ranges
+
+
+def totals(bets: int, settled: int, wins: int, staked: float, settled_stake: float, profit: float) -> Dict:
+    """Counts and sums plus the derived rates; ROI is profit over the stake of settled bets."""
+    return {
+        "bets": bets,
+        "settled": settled,
+        "wins": wins,
+        "staked": round(staked, 2),
+        "profit": round(profit, 2),
+        "strike_rate": wins / settled if settled else None,
+        "roi": profit / settled_stake if settled_stake else None,
+    }
+
+
+class AnalyticsService:
+    """P&L, ROI and strike rate from daily rollups instead of scanning bets.
+
+    `bet_rollups` holds one row per (dimension, day, key) with bet counts and
+    stake/profit sums. A refresh recomputes only the days that have bets
+    updated since the last refresh, each with one INSERT ... SELECT per
+    dimension, so settling bets costs work in proportion to the days touched.
+    Weekly and monthly figures are sums of the daily rows.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval: Optional[float] = None,
+        watermark_lag: timedelta = WATERMARK_LAG,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval or float(os.getenv("ANALYTICS_REFRESH_SECONDS", "60"))
+        self.watermark_lag = watermark_lag
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self, db: Session, full: bool = False) -> Dict:
+        """Bring the rollups up to date with bets; `full` recomputes every day that still has bets.
+
+        Days whose bets were all deleted (e.g. by partition retention) keep their rollups.
+        """
+        if db.get_bind().dialect.name == "postgresql" and not db.scalar(
+            select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_KEY))
+        ):
+            return {"days": 0, "skipped": True}
+
+        watermark = db.get(RollupWatermark, WATERMARK)
+        if watermark is None:
+            watermark = RollupWatermark(name=WATERMARK)
+            db.add(watermark)
+        # Read before the scan so bets updated during it are picked up next time
+        latest = db.scalar(select(func.max(Bet.updated_at)))
+
+        bet_day = func.date(Bet.placed_at, type_=Date)
+        changed = select(bet_day).distinct()
+        if not full and watermark.refreshed_through is not None:
+            changed = changed.where(Bet.updated_at > watermark.refreshed_through - self.watermark_lag)
+        days = sorted(day for day in db.scalars(changed) if day is not None)
+
+        if days:
+            now = datetime.utcnow()
+            db.execute(delete(BetRollup).where(BetRollup.day.in_(days)))
+            for dimension, (column, joins) in DIMENSIONS.items():
+                db.execute(insert(BetRollup).from_select(ROLLUP_COLUMNS, self._aggregate(dimension, column, joins, days, now)))
+        watermark.refreshed_through = latest or watermark.refreshed_through
+        db.commit()
+        return {"days": len(days), "skipped": False}
+
+    @staticmethod
+    def _aggregate(dimension: str, column, joins, days: List[date], now: datetime):
+        settled = Bet.result.in_(["WON", "LOST"])
+        bet_day = func.date(Bet.placed_at, type_=Date)
+        # No bound parameters in the grouped expression: Postgres must see the same text in GROUP BY
+        key = func.coalesce(column, literal_column("''"))
+        stmt = select(
+            literal(dimension),
+            key,
+            bet_day,
+            func.count(),
+            func.count(case((settled, 1))),
+            func.count(case((Bet.result == "WON", 1))),
+            func.coalesce(func.sum(Bet.stake), 0.0, type_=Float),
+            func.coalesce(func.sum(case((settled, Bet.stake))), 0.0, type_=Float),
+            func.coalesce(func.sum(case((settled, Bet.profit))), 0.0, type_=Float),
+            literal(now, DateTime),
+        ).select_from(Bet)
+        for target, onclause in joins:
+            stmt = stmt.outerjoin(target, onclause)
+        # Plain placed_at ranges use its index and prune to the affected months
+        return stmt.where(
+            or_(*[and_(Bet.placed_at >= start, Bet.placed_at < end) for start, end in day_ranges(days)])
+        ).group_by(key, bet_day)
+
+    @staticmethod
+    def _sums(*filters):
+        return select(
+            func.sum(BetRollup.bets), func.sum(BetRollup.settled), func.sum(BetRollup.wins),
+            func.sum(BetRollup.staked), func.sum(BetRollup.settled_stake), func.sum(BetRollup.profit),
+        ).where(*filters)
+
+    @staticmethod
+    def _day_filters(date_from: Optional[date], date_to: Optional[date]) -> list:
+        filters = []
+        if date_from:
+            filters.append(BetRollup.day >= date_from)
+        if date_to:
+            filters.append(BetRollup.day <= date_to)
+        return filters
+
+    def summary(self, db: Session, date_from: Optional[date] = None, date_to: Optional[date] = None) -> Dict:
+        row = db.execute(self._sums(BetRollup.dimension == "all", *self._day_filters(date_from, date_to))).one()
+        return totals(*[value or 0 for value in row])
+
+    def pnl(self, db: Session, period: str = "day", date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[Dict]:
+        """P&L per day, week (from Monday) or month, oldest first."""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        rows = db.execute(
+            select(BetRollup.day, BetRollup.bets, BetRollup.settled, BetRollup.wins,
+                   BetRollup.staked, BetRollup.settled_stake, BetRollup.profit)
+            .where(BetRollup.dimension == "all", *self._day_filters(date_from, date_to))
+        )
+        buckets = defaultdict(lambda: [0, 0, 0, 0.0, 0.0, 0.0])
+        for day, *values in rows:
+            bucket = buckets[period_start(day, period)]
+            for i, value in enumerate(values):
+                bucket[i] += value
+        return [{"period": start, **totals(*buckets[start])} for start in sorted(buckets)]
+
+    def breakdown(
+        self, db: Session, dimension: str, date_from: Optional[date] = None, date_to: Optional[date] = None,
+        limit: int = 50,
+    ) -> List[Dict]:
+        """Totals per track, bet type, jockey or trainer, most profitable first."""
+        if dimension not in BREAKDOWNS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        profit = func.sum(BetRollup.profit)
+        stmt = (
+            self._sums(BetRollup.dimension == dimension, *self._day_filters(date_from, date_to))
+            .add_columns(BetRollup.key)
+            .group_by(BetRollup.key)
+            .order_by(profit.desc(), BetRollup.key)
+            .limit(limit)
+        )
+        return [{"key": key, **totals(*values)} for *values, key in db.execute(stmt)]
+
+    def start(self):
+        """Refresh every `interval` seconds in a background thread until `stop()`."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analytics-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            db = self.session_factory()
+            try:
+                self.refresh(db)
+            except Exception as e:
+                print(f"Analytics refresh error: {str(e)}")
+            finally:
+                db.close()
+            self._stop.wait(self.interval)
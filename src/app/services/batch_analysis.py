@@ -0,0 +1,344 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, date as date_type, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session, selectinload
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to ANALYSIS_BATCH_WORKER to pick the single worker
+    fcntl = None
+
+from ..models import AnalysisBatchJob, Race, RaceAnalysis
+from .bulk_ingest import as_race_datetime, dialect_insert
+from .claude_service import ClaudeService
+from .push import PushHub
+from .staking import current_bankroll
+
+PENDING = "PENDING"
+SUBMITTING = "SUBMITTING"  # claimed by one process while batches.create is in flight
+SUBMITTED = "SUBMITTED"
+COMPLETED = "COMPLETED"
+FAILED = "FAILED"
+
+CUSTOM_ID_PREFIX = "race-"
+
+# pg_advisory_lock key for the batch worker ("analysis-batch-worker" folded to a bigint)
+ADVISORY_LOCK_KEY = int(hashlib.sha1(b"analysis-batch-worker").hexdigest()[:15], 16)
+
+
+def upsert_race_analyses(db: Session, rows: List[Dict]):
+    """Write many analyses in one INSERT ... ON CONFLICT (race_id) DO UPDATE."""
+    if not rows:
+        return
+    insert = dialect_insert(db)
+    stmt = insert(RaceAnalysis)
+    update_columns = [col for col in rows[0] if col not in ("race_id", "created_at")]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["race_id"],
+        set_={col: stmt.excluded[col] for col in update_columns},
+    )
+    db.execute(stmt, rows)
+
+
+class WorkerLeaderLock:
+    """Cross-process lock so only one uvicorn worker runs the batch poller.
+
+    Postgres: a session-level advisory lock held on a dedicated connection.
+    Elsewhere: an flock on a file keyed by the database URL (same host only).
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+        self._connection = None
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._connection is not None or self._file is not None
+
+    def acquire(self) -> bool:
+        """Take the lock if it is free; True while this process holds it."""
+        if self.held:
+            return True
+        db = self.session_factory()
+        try:
+            engine = db.get_bind()
+        finally:
+            db.close()
+        if engine.dialect.name == "postgresql":
+            connection = engine.connect()
+            acquired = connection.execute(select(func.pg_try_advisory_lock(ADVISORY_LOCK_KEY))).scalar()
+            connection.commit()
+            if acquired:
+                self._connection = connection
+            else:
+                connection.close()
+            return bool(acquired)
+        if fcntl is None:
+            return True
+        url_hash = hashlib.sha1(engine.url.render_as_string(hide_password=True).encode()).hexdigest()[:12]
+        lock_file = open(Path(tempfile.gettempdir()) / f"analysis-batch-worker-{url_hash}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._connection is not None:
+            self._connection.execute(select(func.pg_advisory_unlock(ADVISORY_LOCK_KEY)))
+            self._connection.commit()
+            self._connection.close()
+            self._connection = None
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class BatchAnalysisService:
+    """Overnight bulk analysis through the Anthropic Message Batches API.
+
+    Every race on a date is packed into one batch job. Job state lives in
+    `analysis_batch_jobs`, so a restarted worker picks up submitted batches
+    where it left off instead of paying for them twice.
+
+    Jobs move between states with compare-and-set UPDATEs, so concurrent
+    pollers (threads or processes) never submit or store the same job twice;
+    on top of that `start()` only polls in the process holding the leader lock.
+    Stored analyses are sent to a `push` hub's subscribers when one is given.
+    """
+
+    def __init__(
+        self,
+        claude_service: ClaudeService,
+        session_factory: Callable[[], Session],
+        poll_interval: Optional[float] = None,
+        resume_grace: Optional[float] = None,
+        push: Optional[PushHub] = None,
+    ):
+        self.claude_service = claude_service
+        self.session_factory = session_factory
+        self.push = push
+        self.poll_interval = poll_interval or float(os.getenv("ANALYSIS_BATCH_POLL_SECONDS", "60"))
+        # A job claimed longer ago than this without a batch_id is assumed to be from a crashed submit
+        self.resume_grace = timedelta(seconds=(
+            resume_grace if resume_grace is not None else float(os.getenv("ANALYSIS_BATCH_RESUME_GRACE_SECONDS", "600"))
+        ))
+        self.leader_lock = WorkerLeaderLock(session_factory)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit_for_date(self, db: Session, race_date: date_type, force: bool = False) -> AnalysisBatchJob:
+        """Submit one batch covering every race on `race_date`.
+
+        Returns the existing job instead if the date was already submitted,
+        unless `force` is set (e.g. the card changed after a completed run).
+        """
+        day_start = as_race_datetime(race_date)
+        if not force:
+            existing = (
+                db.query(AnalysisBatchJob)
+                .filter(AnalysisBatchJob.race_date == day_start, AnalysisBatchJob.status != FAILED)
+                .order_by(AnalysisBatchJob.id.desc())
+                .first()
+            )
+            if existing is not None:
+                return existing
+
+        races = (
+            db.query(Race)
+            .options(selectinload(Race.horses))
+            .filter(Race.race_date >= day_start, Race.race_date < day_start + timedelta(days=1))
+            .all()
+        )
+        races = [race for race in races if race.horses]
+        if not races:
+            raise ValueError(f"No races with runners found for {race_date}")
+
+        # Record the job, already claimed by this call, before calling the API so a
+        # crash mid-submit is resumed (after the grace period), not forgotten
+        job = AnalysisBatchJob(
+            race_date=day_start,
+            race_ids=json.dumps([race.id for race in races]),
+            status=SUBMITTING,
+        )
+        db.add(job)
+        db.commit()
+        return self._submit(db, job, races)
+
+    def resume(self, db: Session) -> List[AnalysisBatchJob]:
+        """Submit jobs that were recorded but never reached the API.
+
+        Only jobs untouched for `resume_grace` are considered, so a submit that
+        is still in flight elsewhere is left alone.
+        """
+        jobs = db.query(AnalysisBatchJob).filter(
+            AnalysisBatchJob.status.in_([PENDING, SUBMITTING]),
+            AnalysisBatchJob.batch_id.is_(None),
+            AnalysisBatchJob.updated_at < datetime.utcnow() - self.resume_grace,
+        ).all()
+        resumed = []
+        for job in jobs:
+            if not self._claim(db, job, job.status, SUBMITTING):
+                continue
+            resumed.append(job)
+            races = (
+                db.query(Race)
+                .options(selectinload(Race.horses))
+                .filter(Race.id.in_(json.loads(job.race_ids)))
+                .all()
+            )
+            try:
+                self._submit(db, job, races)
+            except Exception as e:
+                print(f"Error resuming analysis batch job {job.id}: {str(e)}")
+        return resumed
+
+    def poll_once(self) -> int:
+        """Check every submitted batch once, storing results for the ones that ended."""
+        db = self.session_factory()
+        completed = 0
+        try:
+            self.resume(db)
+            for job in db.query(AnalysisBatchJob).filter(AnalysisBatchJob.status == SUBMITTED).all():
+                try:
+                    batch = self.claude_service.client.messages.batches.retrieve(job.batch_id)
+                except Exception as e:
+                    print(f"Error polling batch {job.batch_id}: {str(e)}")
+                    continue
+                if batch.processing_status == "ended" and self._store_results(db, job):
+                    completed += 1
+        finally:
+            db.close()
+        return completed
+
+    def start(self):
+        """Poll submitted batches in a background thread until `stop()`."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analysis-batch-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    # Standby workers keep retrying so one takes over if the leader exits
+                    if self.leader_lock.acquire():
+                        self.poll_once()
+                except Exception as e:
+                    print(f"Analysis batch worker error: {str(e)}")
+                self._stop.wait(self.poll_interval)
+        finally:
+            self.leader_lock.release()
+
+    @staticmethod
+    def _claim(db: Session, job: AnalysisBatchJob, from_status: str, to_status: str) -> bool:
+        """Move `job` from `from_status` to `to_status` unless another poller got there first.
+
+        The UPDATE matches the status and updated_at this session last saw, so
+        exactly one of several concurrent claimers changes the row.
+        """
+        result = db.execute(
+            update(AnalysisBatchJob)
+            .where(
+                AnalysisBatchJob.id == job.id,
+                AnalysisBatchJob.status == from_status,
+                AnalysisBatchJob.updated_at == job.updated_at,
+            )
+            .values(status=to_status, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            db.rollback()
+            return False
+        db.commit()
+        db.refresh(job)
+        return True
+
+    def _submit(self, db: Session, job: AnalysisBatchJob, races: List[Race]) -> AnalysisBatchJob:
+        requests = [
+            {
+                "custom_id": f"{CUSTOM_ID_PREFIX}{race.id}",
+                "params": self.claude_service.build_message_params(
+                    self.claude_service.format_race_data(race, race.horses)
+                ),
+            }
+            for race in races
+        ]
+        try:
+            batch = self.claude_service.client.messages.batches.create(requests=requests)
+        except Exception as e:
+            job.status = FAILED
+            job.error = f"Batch submission failed: {str(e)}"
+            db.commit()
+            raise Exception(job.error)
+
+        job.batch_id = batch.id
+        job.status = SUBMITTED
+        job.submitted_at = datetime.utcnow()
+        db.commit()
+        print(f"Submitted analysis batch {batch.id} with {len(requests)} races")
+        return job
+
+    def _store_results(self, db: Session, job: AnalysisBatchJob) -> bool:
+        """Store a finished batch's analyses; False if another poller already stored it."""
+        now = datetime.utcnow()
+        rows = []
+        errored = 0
+        bankroll = current_bankroll(db)
+        for result in self.claude_service.client.messages.batches.results(job.batch_id):
+            if result.result.type != "succeeded" or not result.custom_id.startswith(CUSTOM_ID_PREFIX):
+                errored += 1
+                continue
+            race_id = int(result.custom_id[len(CUSTOM_ID_PREFIX):])
+            claude_analysis = self.claude_service.parse_response(result.result.message)
+            self.claude_service.usage.record(result.result.message.usage, race_id, source="batch")
+            rows.append({
+                "race_id": race_id,
+                **claude_analysis.analysis_fields(bankroll),
+                "analysis_date": now,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+        # Flip the status first: on Postgres this row lock makes a concurrent storer
+        # wait, then match nothing, instead of writing the analyses a second time
+        completed = db.execute(
+            update(AnalysisBatchJob)
+            .where(AnalysisBatchJob.id == job.id, AnalysisBatchJob.status == SUBMITTED)
+            .values(status=COMPLETED, succeeded=len(rows), errored=errored, completed_at=now, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if completed.rowcount != 1:
+            db.rollback()
+            return False
+        upsert_race_analyses(db, rows)
+        db.commit()
+        if self.push is not None and rows:
+            races = {race_id: (race_date, track) for race_id, race_date, track in db.execute(
+                select(Race.id, Race.race_date, Race.track).where(Race.id.in_([row["race_id"] for row in rows]))
+            )}
+            for row in rows:
+                race_date, track = races.get(row["race_id"], (None, None))
+                analysis = {field: row[field] for field in row if field not in ("race_id", "created_at", "updated_at")}
+                self.push.publish("analysis", row["race_id"], race_date, track, analysis=analysis)
+        db.refresh(job)
+        print(f"Stored {len(rows)} analyses from batch {job.batch_id} ({errored} errored)")
+        return True
@@ -0,0 +1,185 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+
+def create_headless_chrome():
+    """Start a headless Chrome driver with the options used for scraping."""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(options=chrome_options)
+
+
+class PooledDriver:
+    """A warm driver plus the bookkeeping used to decide when to recycle it."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.monotonic()
+
+
+class BrowserPool:
+    """Bounded pool of long-lived headless browsers.
+
+    Drivers are created lazily up to `max_size`, health-checked on checkout
+    and recycled after `max_pages_per_driver` page loads or `max_age_seconds`,
+    so the multi-second browser start-up is paid once rather than per scrape.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2,
+        max_pages_per_driver: int = 50,
+        max_age_seconds: float = 1800,
+        checkout_timeout: float = 30,
+        driver_factory: Callable = create_headless_chrome,
+    ):
+        self.max_size = max_size
+        self.max_pages_per_driver = max_pages_per_driver
+        self.max_age_seconds = max_age_seconds
+        self.checkout_timeout = checkout_timeout
+        self.driver_factory = driver_factory
+
+        # LIFO so the most recently used (warmest) driver is handed out first
+        self._idle: "queue.LifoQueue[PooledDriver]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._closed = False
+        self.stats: Dict[str, int] = {"created": 0, "checkouts": 0, "recycled": 0, "unhealthy": 0}
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "BrowserPool":
+        """Build a pool sized from BROWSER_POOL_* environment variables."""
+        return cls(
+            max_size=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+            max_pages_per_driver=int(os.getenv("BROWSER_POOL_MAX_PAGES", "50")),
+            max_age_seconds=float(os.getenv("BROWSER_POOL_MAX_AGE_SECONDS", "1800")),
+            checkout_timeout=float(os.getenv("BROWSER_POOL_CHECKOUT_TIMEOUT", "30")),
+            **kwargs,
+        )
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return self._idle.qsize()
+
+    def checkout(self) -> PooledDriver:
+        """Take a healthy driver from the pool, starting one if below `max_size`."""
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            pooled = self._take_idle_or_reserve(deadline)
+            if pooled is None:
+                pooled = self._create()
+                if self._closed:
+                    # close() ran while this driver was starting
+                    self._discard(pooled)
+                    raise RuntimeError("Browser pool is closed")
+            elif not self._is_healthy(pooled):
+                self.stats["unhealthy"] += 1
+                self._discard(pooled)
+                continue
+            self.stats["checkouts"] += 1
+            return pooled
+
+    def checkin(self, pooled: PooledDriver):
+        """Return a driver after use, recycling it once it is worn out."""
+        pooled.pages += 1
+        worn_out = (
+            self._closed
+            or pooled.pages >= self.max_pages_per_driver
+            or time.monotonic() - pooled.created_at >= self.max_age_seconds
+        )
+        if worn_out:
+            self.stats["recycled"] += 1
+            self._discard(pooled)
+        else:
+            self._idle.put(pooled)
+
+    @contextmanager
+    def driver(self):
+        """Check out a driver for the duration of a `with` block."""
+        pooled = self.checkout()
+        try:
+            yield pooled.driver
+        finally:
+            self.checkin(pooled)
+
+    def warm(self, count: Optional[int] = None):
+        """Start drivers ahead of time so the first scrapes are not cold."""
+        drivers = [self.checkout() for _ in range(min(count or self.max_size, self.max_size))]
+        for pooled in drivers:
+            self._idle.put(pooled)
+
+    def close(self):
+        """Quit every idle driver and refuse new checkouts. Drivers still checked out are quit on checkin."""
+        self._closed = True
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(pooled)
+
+    def _take_idle_or_reserve(self, deadline: float) -> Optional[PooledDriver]:
+        """Return an idle driver, or None after reserving a slot for a new one."""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+
+            if self._closed:
+                raise RuntimeError("Browser pool is closed")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"No browser available after {self.checkout_timeout}s (pool size {self.max_size})"
+                )
+            # Wake up periodically in case a recycled driver freed a slot
+            try:
+                return self._idle.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                continue
+
+    def _create(self) -> PooledDriver:
+        try:
+            pooled = PooledDriver(self.driver_factory())
+        except Exception:
+            with self._lock:
+                self._size -= 1
+            raise
+        self.stats["created"] += 1
+        return pooled
+
+    def _is_healthy(self, pooled: PooledDriver) -> bool:
+        try:
+            return pooled.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _discard(self, pooled: PooledDriver):
+        with self._lock:
+            self._size -= 1
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            print(f"Error closing browser: {str(e)}")
@@ -0,0 +1,184 @@
+import csv
+import io
+from datetime import datetime, date as date_type, time
+from typing import List, Dict, Any, Tuple
+
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session
+
+from ..models import Race, Horse
+from ..schemas import IngestCounts, IngestReport
+
+
+# Columns written by the Postgres COPY path, in file order
+HORSE_COPY_COLUMNS = ["race_id", "race_date", "name", "jockey", "trainer", "odds", "created_at", "updated_at"]
+
+# Columns refreshed on conflict; a row is only rewritten when one of these changed
+RACE_UPDATE_COLUMNS = ["race_type", "total_runners"]
+HORSE_UPDATE_COLUMNS = ["jockey", "trainer", "odds"]
+
+
+def as_race_datetime(date: date_type) -> datetime:
+    """Normalise a race date to the midnight datetime stored in `races.race_date`."""
+    if isinstance(date, datetime):
+        return date
+    return datetime.combine(date, time.min)
+
+
+def dialect_insert(db: Session):
+    """Return the dialect-specific `insert` construct that supports ON CONFLICT."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upsert ingest is not supported on {dialect}")
+    return insert
+
+
+class BulkIngestService:
+    """Writes whole race cards with set-based, idempotent upserts.
+
+    Races are keyed on (race_date, track, off_time) and runners on
+    (race_id, race_date, name). Each table is written with one multi-row
+    INSERT ... ON CONFLICT DO UPDATE that only touches rows whose contents
+    changed, so re-ingesting the same card is a no-op. A fresh card with
+    many runners goes through COPY on Postgres instead.
+    """
+
+    def __init__(self, use_copy: bool = True, copy_threshold: int = 5000):
+        self.use_copy = use_copy
+        self.copy_threshold = copy_threshold
+
+    def ingest_race_cards(self, db: Session, date: date_type, race_cards: List[Dict], commit: bool = True) -> IngestReport:
+        """Upsert race cards and their runners, reporting what changed; `commit=False` leaves that to the caller."""
+        report = IngestReport()
+        if not race_cards:
+            return report
+
+        now = datetime.utcnow()
+        race_date = as_race_datetime(date)
+
+        # Later duplicates of the same race/runner in one scrape win
+        race_rows = {}
+        horse_rows = {}
+        for race_card in race_cards:
+            race_key = (race_card["race_track"], race_card["race_time"])
+            race_rows[race_key] = {
+                "race_date": race_date,
+                "track": race_card["race_track"],
+                "off_time": race_card["race_time"],
+                "race_type": race_card["race_type"],
+                "total_runners": len(race_card["horses"]),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for horse_data in race_card["horses"]:
+                horse_rows[(race_key, horse_data["name"])] = {
+                    "race_date": race_date,
+                    "name": horse_data["name"],
+                    "jockey": horse_data["jockey"],
+                    "trainer": horse_data["trainer"],
+                    "odds": horse_data["odds"],
+                    "created_at": now,
+                    "updated_at": now,
+                }
+
+        race_ids, report.races = self._upsert_races(db, race_date, race_rows)
+
+        for (race_key, _), row in horse_rows.items():
+            row["race_id"] = race_ids[race_key]
+        if horse_rows:
+            report.horses = self._upsert_horses(db, race_date, list(horse_rows.values()))
+
+        if commit:
+            db.commit()
+        return report
+
+    def _upsert_races(
+        self, db: Session, race_date: datetime, race_rows: Dict[Tuple[str, str], Dict[str, Any]]
+    ) -> Tuple[Dict[Tuple[str, str], int], IngestCounts]:
+        existing = {
+            (track, off_time): race_id
+            for race_id, track, off_time in db.execute(
+                select(Race.id, Race.track, Race.off_time).where(Race.race_date == race_date)
+            )
+        }
+
+        insert = dialect_insert(db)
+        stmt = insert(Race)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["race_date", "track", "off_time"],
+            set_={col: stmt.excluded[col] for col in RACE_UPDATE_COLUMNS + ["updated_at"]},
+            where=self._changed(Race, stmt, RACE_UPDATE_COLUMNS),
+        ).returning(Race.id, Race.track, Race.off_time)
+        written = {
+            (track, off_time): race_id
+            for race_id, track, off_time in db.execute(stmt, list(race_rows.values()))
+        }
+
+        race_ids = {**existing, **written}
+        return race_ids, self._count(race_rows.keys(), existing.keys(), written.keys())
+
+    def _upsert_horses(self, db: Session, race_date: datetime, horse_rows: List[Dict[str, Any]]) -> IngestCounts:
+        existing = set(
+            db.execute(
+                # Filtering on the partition key reads one month's partition only
+                select(Horse.race_id, Horse.name).where(Horse.race_date == race_date)
+            ).tuples()
+        )
+        keys = [(row["race_id"], row["name"]) for row in horse_rows]
+
+        if not existing and self._can_copy(db, len(horse_rows)):
+            self._copy_horses(db, horse_rows)
+            return IngestCounts(inserted=len(horse_rows))
+
+        insert = dialect_insert(db)
+        stmt = insert(Horse)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["race_id", "race_date", "name"],
+            set_={col: stmt.excluded[col] for col in HORSE_UPDATE_COLUMNS + ["updated_at"]},
+            where=self._changed(Horse, stmt, HORSE_UPDATE_COLUMNS),
+        ).returning(Horse.race_id, Horse.name)
+        written = set(db.execute(stmt, horse_rows).tuples())
+
+        return self._count(keys, existing, written)
+
+    @staticmethod
+    def _changed(model, stmt, columns: List[str]):
+        """WHERE clause matching only conflicting rows whose tracked columns differ."""
+        return or_(*[getattr(model, col).is_distinct_from(stmt.excluded[col]) for col in columns])
+
+    @staticmethod
+    def _count(keys, existing, written) -> IngestCounts:
+        keys = set(keys)
+        existing = set(existing) & keys
+        written = set(written)
+        return IngestCounts(
+            inserted=len(written - existing),
+            updated=len(written & existing),
+            unchanged=len(existing - written),
+        )
+
+    def _can_copy(self, db: Session, row_count: int) -> bool:
+        return (
+            self.use_copy
+            and row_count >= self.copy_threshold
+            and db.get_bind().dialect.name == "postgresql"
+        )
+
+    def _copy_horses(self, db: Session, horse_rows: List[Dict[str, Any]]):
+        """Stream runner rows through COPY ... FROM STDIN on the session's connection."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in horse_rows:
+            writer.writerow(["" if row[col] is None else row[col] for col in HORSE_COPY_COLUMNS])
+        buffer.seek(0)
+
+        dbapi_connection = db.connection().connection.driver_connection
+        with dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY horses ({', '.join(HORSE_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
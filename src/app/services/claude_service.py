@@ -1,9 +1,103 @@
-from typing import Dict, Any, Optional
+import asyncio
+import os
+from typing import Dict, Any, Optional, AsyncIterator, Tuple, Union
 from pydantic import BaseModel
-from anthropic import Anthropic, HUMAN_PROMPT, AI_PROMPT
+from anthropic import Anthropic, AsyncAnthropic
 from datetime import datetime
 import json
+import re
+import time
 from ..models import Race, Horse
+from .rate_limit import AsyncTokenBucket
+from .streaming_json import IncrementalJSONParser
+from .token_usage import TokenLedger
+
+# Static analyst instructions and output schema. Sent as a cached system block so
+# only the per-race card is billed at the full input rate on every call. Together
+# with the tool definition this prefix must stay above the model's minimum
+# cacheable length (CACHE_MIN_PREFIX_TOKENS), or cache_control is silently ignored.
+ANALYST_INSTRUCTIONS = """You are a professional horse racing analyst. You will be given one race card and must predict the winner.
+
+## Card format
+The card arrives in a compact format:
+- A "race" line of key=value pairs separated by semicolons: date, track, distance (metres), race_type (Flat, Hurdle, Chase, NH Flat), class_rating (1 is the highest class) and total_runners. Keys with no value are omitted.
+- A "runners" table: the first row is a pipe-separated header, then one row per runner. Empty cells are unknown. Columns that are unknown for every runner are left out of the header entirely.
+
+Runner columns:
+- name: horse name
+- jockey, trainer: current connections
+- odds: decimal odds (3.5 means a 2.5 unit profit per unit staked)
+- starting_position: stall/draw
+- weight: carried weight in kilograms
+- last_race_days: days since the horse last ran
+- wins, places, starts: career record
+- avg_position: average finishing position
+
+## How to analyse
+Work through the field in this order:
+1. Form and consistency. Win rate is wins/starts and place rate is (wins+places)/starts. Treat records from fewer than three starts as weak evidence, and a low avg_position as a sign of a consistent finisher.
+2. Freshness. 14-60 days since the last run is ideal. Under 7 days can mean a quick turnaround; over 120 days means the horse may need the run. Jumpers (Hurdle, Chase) usually need longer gaps than Flat horses.
+3. Draw and distance. On the Flat, a low or high draw matters most in sprints (under 1400m) and on tight or round tracks. It matters little over jumps.
+4. Weight. In handicaps, more weight means the handicapper rates the horse higher, but each extra kilogram costs ground over longer distances.
+5. Connections. Note jockeys and trainers who appear repeatedly at the top of the market. Do not invent statistics you were not given.
+6. Market. Convert each runner's odds to an implied probability (1/odds) and compare it with your own estimate. The sum of implied probabilities is above 1 because of the bookmaker margin, so normalise before comparing.
+
+## Missing data
+Unknown cells are common on early cards. Never fill them with guesses. A runner with no record is not a bad runner: give it roughly its market chance and let the lack of data raise the risk level rather than lower its probability. If odds are missing for the selection, use the odds implied by your confidence.
+
+## Confidence
+"confidence" is your probability, from 0 to 100, that the selection wins. Calibrate it. A 30 should win about three races in ten. Rarely go above 60 in fields of eight or more, and never above 90. If the card is mostly unknown, stay close to the market's normalised probability.
+
+## Risk
+- LOW: six runners or fewer, a clear form pick and most runner data known.
+- MEDIUM: a competitive field with a defensible edge, or some runners' data missing.
+- HIGH: a big or open field, a favourite with unreliable form, or little data. Pick HIGH whenever unsure between two levels.
+
+## Staking
+"stake" is the fraction of bankroll to bet on your selection, between 0 and 0.1. Start from the Kelly fraction (p*odds - 1)/(odds - 1), with p = confidence/100. Bet a quarter of it, capped at 0.05 for MEDIUM risk and 0.02 for HIGH risk. If the edge p*odds - 1 is zero or negative, stake 0 but still name the most likely winner. "profit" is the expected profit in units for a 1 unit stake: p*odds - 1.
+
+## Reasoning
+Keep the reasoning to four to eight sentences. Name the two or three runners that shaped the decision, state the edge against the market and say what would change your view. Refer to runners by their exact card names.
+
+## Example
+Card:
+race: date=2025-06-20T13:30;track=Ayr;distance=1600;race_type=Flat;total_runners=3
+runners:
+name|odds|wins|places|starts|last_race_days
+Golden Eagle|3.5|4|3|10|21
+Silver Streak|2.5|2|2|9|200
+Bronze Bolt|5|0|1|6|35
+
+A good call: winner "Golden Eagle", confidence 38, risk "MEDIUM", stake 0.01, odds 3.5, profit 0.33. Golden Eagle has the best win and place rates and an ideal 21-day break. The favourite Silver Streak is returning from 200 days off, so the market's 40% looks too high.
+
+Record your analysis by calling the record_race_analysis tool. Fill in the short fields (winner, confidence, risk, stake, odds, profit) before writing the reasoning."""
+
+# Tool-use schema for the analysis. Forcing this tool means the reply arrives as
+# validated JSON input instead of free text; field order puts reasoning last so
+# the headline fields stream first.
+ANALYSIS_TOOL = {
+    "name": "record_race_analysis",
+    "description": "Record the winner prediction, staking advice and reasoning for one race.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "winner": {"type": "string", "description": "Name of the predicted winner, exactly as on the card"},
+            "confidence": {"type": "number", "minimum": 0, "maximum": 100},
+            "risk": {"type": "string", "enum": ["LOW", "MEDIUM", "HIGH"]},
+            "stake": {"type": "number", "minimum": 0, "maximum": 0.1, "description": "Fraction of bankroll"},
+            "odds": {"type": "number", "description": "Decimal odds of the selection"},
+            "profit": {"type": "number", "description": "Expected profit per unit staked"},
+            "reasoning": {"type": "string"},
+        },
+        "required": ["winner", "confidence", "risk", "stake", "odds", "profit", "reasoning"],
+    },
+}
+
+
+DEFAULT_MODEL = "claude-3-5-sonnet-20241022"
+
+# Shortest prefix (tools + system, in tokens) Sonnet models will cache
+CACHE_MIN_PREFIX_TOKENS = 1024
 
 
 class RaceAnalysisRequest(BaseModel):
@@ -22,11 +116,102 @@ class RaceAnalysisResponse(BaseModel):
     expected_profit: float
     odds: float
 
+    def analysis_fields(self, bankroll: float) -> Dict[str, Any]:
+        """Column values for a `models.RaceAnalysis` row, the stake sized from `bankroll`."""
+        return {
+            "winner_prediction": self.winner_prediction,
+            "confidence_score": self.confidence_score,
+            "stake_recommendation": round(self.suggested_stake * bankroll, 2),  # suggested_stake is a fraction
+            "expected_profit": self.expected_profit,
+            "analysis_reasoning": self.analysis_reasoning,
+            "risk_assessment": self.risk_assessment,
+        }
+
+
+def _compact_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return format(value, "g")
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="minutes")
+    return str(value).replace("|", "/").replace(";", ",").replace("\n", " ")
+
+
+def encode_race_card(request: RaceAnalysisRequest) -> str:
+    """Encode a race as a key=value line plus a pipe-separated runners table.
+
+    Columns that are empty for every runner are dropped, so a sparse card
+    costs a fraction of the tokens of the indented JSON it replaces.
+    """
+    race = ";".join(
+        f"{key}={_compact_value(value)}" for key, value in request.race.items() if value is not None
+    )
+    columns = []
+    for horse in request.horses:
+        for key, value in horse.items():
+            if value is not None and key not in columns:
+                columns.append(key)
+    rows = ["|".join(columns)]
+    rows += ["|".join(_compact_value(horse.get(key)) for key in columns) for horse in request.horses]
+    return f"race: {race}\nrunners:\n" + "\n".join(rows)
+
+
+def extract_json_object(content: str) -> Dict[str, Any]:
+    """Return the first complete JSON object in `content`, nested braces included."""
+    decoder = json.JSONDecoder()
+    start = content.find("{")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(content, start)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = content.find("{", start + 1)
+    raise ValueError("No JSON object in response")
+
 
 class ClaudeService:
-    def __init__(self, api_key: str):
-        self.client = Anthropic(api_key=api_key)
-        self.model = "claude-3-sonnet-20240229"
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        cache=None,
+        compact_prompts: Optional[bool] = None,
+    ):
+        self.api_key = api_key
+        self.cache = cache
+        self.base_url = base_url
+        self.client = Anthropic(api_key=api_key, base_url=base_url)
+        self._async_client: Optional[AsyncAnthropic] = None
+        # Prompt caching needs a model that supports it; Claude 3 Sonnet does not
+        self.model = os.getenv("CLAUDE_MODEL", DEFAULT_MODEL)
+        self.max_tokens = 1000
+        self.max_concurrency = max_concurrency or int(os.getenv("CLAUDE_MAX_CONCURRENCY", "5"))
+        self.requests_per_minute = requests_per_minute or float(os.getenv("CLAUDE_REQUESTS_PER_MINUTE", "50"))
+        self._rate_limiter: Optional[AsyncTokenBucket] = None
+        if compact_prompts is None:
+            compact_prompts = os.getenv("CLAUDE_COMPACT_PROMPTS", "true").lower() == "true"
+        self.compact_prompts = compact_prompts
+        self.usage = TokenLedger()
+        # How each reply was parsed; "fallback" means the text heuristics had to guess
+        self.parse_stats: Dict[str, int] = {"tool_use": 0, "json_text": 0, "fallback": 0}
+
+    @property
+    def async_client(self) -> AsyncAnthropic:
+        """Shared async client, created on first use so its connection pool is reused."""
+        if self._async_client is None:
+            self._async_client = AsyncAnthropic(api_key=self.api_key, base_url=self.base_url)
+        return self._async_client
+
+    @property
+    def rate_limiter(self) -> AsyncTokenBucket:
+        if self._rate_limiter is None:
+            self._rate_limiter = AsyncTokenBucket(self.requests_per_minute)
+        return self._rate_limiter
 
     def format_race_data(self, race: Race, horses: list[Horse]) -> RaceAnalysisRequest:
         """Format race data for Claude analysis."""
@@ -61,12 +246,15 @@ class ClaudeService:
             horses=horses_data
         )
 
-    def analyze_race(self, race: Race, horses: list[Horse]) -> RaceAnalysisResponse:
-        """Analyze a race using Claude."""
-        request = self.format_race_data(race, horses)
-        
-        prompt = f"{HUMAN_PROMPT}"
-        prompt += "You are a professional horse racing analyst. Please analyze the following race and provide a detailed prediction."
+    def build_prompt(self, request: RaceAnalysisRequest) -> str:
+        """Build the per-race user prompt; the instructions travel in the system block."""
+        if self.compact_prompts:
+            return encode_race_card(request)
+        return self.build_legacy_prompt(request)
+
+    def build_legacy_prompt(self, request: RaceAnalysisRequest) -> str:
+        """The original self-contained prompt, kept for token comparisons."""
+        prompt = "You are a professional horse racing analyst. Please analyze the following race and provide a detailed prediction."
         prompt += "\n\nRace Details:\n"
         prompt += json.dumps(request.race, indent=2)
         prompt += "\n\nHorses:\n"
@@ -77,93 +265,193 @@ class ClaudeService:
         prompt += "{\n    \"winner\": \"HorseName\",\n    \"confidence\": 85.0,\n    \"reasoning\": \"Detailed reasoning for your prediction\",\n    \"risk\": \"Risk assessment (LOW, MEDIUM, HIGH)\",\n    \"stake\": 0.05,\n    \"profit\": 3.5,\n    \"odds\": 3.5\n}\n"
         
         prompt += "\nMake sure to return ONLY the JSON object. Do not include any additional text."
-        prompt += f"\n{AI_PROMPT}"
+        return prompt
 
+    def build_message_params(self, request: RaceAnalysisRequest) -> Dict[str, Any]:
+        """Messages API parameters for one race, shared by direct and batch calls."""
+        params = {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "tools": [ANALYSIS_TOOL],
+            "tool_choice": {"type": "tool", "name": ANALYSIS_TOOL["name"]},
+            "messages": [
+                {"role": "user", "content": self.build_prompt(request)}
+            ],
+        }
+        if self.compact_prompts:
+            params["system"] = [
+                {"type": "text", "text": ANALYST_INSTRUCTIONS, "cache_control": {"type": "ephemeral"}}
+            ]
+        return params
+
+    def analyze_race(self, race: Race, horses: list[Horse]) -> RaceAnalysisResponse:
+        """Analyze a race using Claude."""
+        return self.analyze_request(self.format_race_data(race, horses), race_id=race.id)
+
+    def analyze_request(self, request: RaceAnalysisRequest, race_id: Optional[int] = None) -> RaceAnalysisResponse:
+        """Analyze an already formatted race using Claude, serving repeats from the cache."""
+        cache_key, cached = self._cache_lookup(request, race_id)
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
+        try:
+            response = self.client.messages.create(**self.build_message_params(request))
+        except Exception as e:
+            raise Exception(f"Claude analysis failed: {str(e)}")
+        self.usage.record(response.usage, race_id, (time.perf_counter() - start) * 1000)
+        return self._cache_store(cache_key, self.parse_response(response), race_id)
+
+    async def analyze_request_async(
+        self, request: RaceAnalysisRequest, race_id: Optional[int] = None
+    ) -> RaceAnalysisResponse:
+        """Analyze a formatted race through the async client, respecting the rate limit."""
+        cache_key, cached = self._cache_lookup(request, race_id)
+        if cached is not None:
+            return cached
+        await self.rate_limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = await self.async_client.messages.create(**self.build_message_params(request))
+        except Exception as e:
+            raise Exception(f"Claude analysis failed: {str(e)}")
+        self.usage.record(response.usage, race_id, (time.perf_counter() - start) * 1000)
+        return self._cache_store(cache_key, self.parse_response(response), race_id)
+
+    async def stream_analysis(
+        self, request: RaceAnalysisRequest, race_id: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Stream an analysis, yielding (field, value) as each tool input field completes.
+
+        The last item is ("analysis", RaceAnalysisResponse) built from the full reply.
+        """
+        cache_key, cached = self._cache_lookup(request, race_id)
+        if cached is not None:
+            yield "analysis", cached
+            return
+        await self.rate_limiter.acquire()
+        parser: Optional[IncrementalJSONParser] = IncrementalJSONParser()
+        start = time.perf_counter()
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            # Get Claude's response
-            content = response.content
-            print(f"\nClaude's Raw Response: {content}")
-            
-            # Try to extract JSON from the response
-            try:
-                # First try to extract JSON if it's in the response
-                import re
-                json_match = re.search(r'\{.*?\}', content)
-                if json_match:
-                    json_str = json_match.group(0)
-                    response_data = json.loads(json_str)
-                    
-                    # Validate the response data
-                    winner = response_data.get("winner")
-                    if not winner:
-                        raise ValueError("No winner predicted in response")
-                    
-                    return RaceAnalysisResponse(
-                        winner_prediction=winner,
-                        confidence_score=response_data.get("confidence", 75.0),
-                        analysis_reasoning=response_data.get("reasoning", "No reasoning provided"),
-                        risk_assessment=response_data.get("risk", "Unknown"),
-                        suggested_stake=response_data.get("stake", 0.05),
-                        expected_profit=response_data.get("profit", 0.0),
-                        odds=response_data.get("odds", 0.0)
-                    )
-                
-            except (json.JSONDecodeError, ValueError):
-                # If we can't extract JSON, try to parse the response as text
-                print("\nCould not extract JSON from Claude's response")
-                
-                # Look for winner prediction in the text
-                winner = "Unknown"
-                confidence = 50.0
-                reasoning = "Could not parse Claude's response"
-                
-                # Look for specific patterns in the text
-                if "winner" in content.lower():
-                    # Try to find the predicted winner
-                    winner_match = re.search(r'winner.*?:\s*(\w+)', content, re.IGNORECASE)
-                    if winner_match:
-                        winner = winner_match.group(1)
-                        confidence = 75.0
-                        reasoning = f"Extracted winner prediction: {winner}"
-                
-                return RaceAnalysisResponse(
-                    winner_prediction=winner,
-                    confidence_score=confidence,
-                    analysis_reasoning=reasoning,
-                    risk_assessment="Unknown",
-                    suggested_stake=0.05,
-                    expected_profit=0.0,
-                    odds=0.0
-                )
-            except Exception as e:
-                print(f"\nError processing Claude response: {str(e)}")
-                return RaceAnalysisResponse(
-                    winner_prediction="Unknown",
-                    confidence_score=50.0,
-                    analysis_reasoning=f"Error: {str(e)}",
-                    risk_assessment="Unknown",
-                    suggested_stake=0.05,
-                    expected_profit=0.0,
-                    odds=0.0
-                )
-                print(f"\nError processing Claude response: {str(e)}")
-                return RaceAnalysisResponse(
-                    winner_prediction="Unknown",
-                    confidence_score=50.0,
-                    analysis_reasoning=f"Error: {str(e)}",
-                    risk_assessment="Unknown",
-                    suggested_stake=0.05,
-                    expected_profit=0.0,
-                    odds=0.0
-                )
-            
+            async with self.async_client.messages.stream(**self.build_message_params(request)) as stream:
+                async for event in stream:
+                    if parser is None or event.type != "content_block_delta" or event.delta.type != "input_json_delta":
+                        continue
+                    try:
+                        fields = parser.feed(event.delta.partial_json)
+                    except ValueError as e:
+                        # The final message is still parsed in full; only early fields are lost
+                        print(f"Incremental parse failed, waiting for the full reply: {str(e)}")
+                        parser = None
+                        continue
+                    for field, value in fields.items():
+                        yield field, value
+                response = await stream.get_final_message()
         except Exception as e:
             raise Exception(f"Claude analysis failed: {str(e)}")
+        self.usage.record(response.usage, race_id, (time.perf_counter() - start) * 1000)
+        yield "analysis", self._cache_store(cache_key, self.parse_response(response), race_id)
+
+    async def analyze_races(
+        self, requests: Dict[int, RaceAnalysisRequest], concurrency: Optional[int] = None
+    ) -> AsyncIterator[Tuple[int, Union[RaceAnalysisResponse, Exception]]]:
+        """Analyze many races concurrently, yielding (race_id, result) as each finishes.
+
+        At most `concurrency` calls are in flight at once; failures are yielded
+        as the exception instead of aborting the rest of the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.max_concurrency)
+
+        async def run(race_id: int, request: RaceAnalysisRequest):
+            async with semaphore:
+                try:
+                    return race_id, await self.analyze_request_async(request, race_id)
+                except Exception as e:
+                    return race_id, e
+
+        tasks = [asyncio.create_task(run(race_id, request)) for race_id, request in requests.items()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _cache_lookup(
+        self, request: RaceAnalysisRequest, race_id: Optional[int]
+    ) -> Tuple[Optional[str], Optional[RaceAnalysisResponse]]:
+        if self.cache is None:
+            return None, None
+        cache_key = self.cache.make_key(request, self.model)
+        return cache_key, self.cache.get(cache_key, race_id)
+
+    def _cache_store(
+        self, cache_key: Optional[str], analysis: RaceAnalysisResponse, race_id: Optional[int]
+    ) -> RaceAnalysisResponse:
+        # Unparseable replies come back as "Unknown"; don't pin those in the cache
+        if cache_key is not None and analysis.winner_prediction != "Unknown":
+            self.cache.set(cache_key, analysis, race_id)
+        return analysis
+
+    def parse_response(self, response) -> RaceAnalysisResponse:
+        """Map Claude's reply onto a RaceAnalysisResponse.
+
+        Prefers the forced tool call; JSON in a text reply and then the text
+        heuristics are only fallbacks, counted in `parse_stats`.
+        """
+        for block in response.content:
+            if block.type == "tool_use" and block.name == ANALYSIS_TOOL["name"]:
+                try:
+                    analysis = self.analysis_from_fields(block.input)
+                    self.parse_stats["tool_use"] += 1
+                    return analysis
+                except (TypeError, ValueError) as e:
+                    print(f"\nInvalid {ANALYSIS_TOOL['name']} input: {str(e)}")
+
+        content = "".join(block.text for block in response.content if block.type == "text")
+        print(f"\nClaude's Raw Response: {content}")
+
+        try:
+            analysis = self.analysis_from_fields(extract_json_object(content))
+            self.parse_stats["json_text"] += 1
+            return analysis
+        except (TypeError, ValueError):
+            print("\nCould not extract JSON from Claude's response")
+
+        self.parse_stats["fallback"] += 1
+        winner = "Unknown"
+        confidence = 50.0
+        reasoning = "Could not parse Claude's response"
+
+        # Look for a winner prediction in the text
+        if "winner" in content.lower():
+            winner_match = re.search(r'winner.*?:\s*(\w+)', content, re.IGNORECASE)
+            if winner_match:
+                winner = winner_match.group(1)
+                confidence = 75.0
+                reasoning = f"Extracted winner prediction: {winner}"
+
+        return RaceAnalysisResponse(
+            winner_prediction=winner,
+            confidence_score=confidence,
+            analysis_reasoning=reasoning,
+            risk_assessment="Unknown",
+            suggested_stake=0.05,
+            expected_profit=0.0,
+            odds=0.0
+        )
+
+    @staticmethod
+    def analysis_from_fields(data: Dict[str, Any]) -> RaceAnalysisResponse:
+        """Build a RaceAnalysisResponse from the tool/JSON field names."""
+        winner = data.get("winner")
+        if not winner:
+            raise ValueError("No winner predicted in response")
+        return RaceAnalysisResponse(
+            winner_prediction=winner,
+            confidence_score=data.get("confidence", 75.0),
+            analysis_reasoning=data.get("reasoning", "No reasoning provided"),
+            risk_assessment=data.get("risk", "Unknown"),
+            suggested_stake=data.get("stake", 0.05),
+            expected_profit=data.get("profit", 0.0),
+            odds=data.get("odds", 0.0)
+        )
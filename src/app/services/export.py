@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Callable, Iterator, List, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import Bet, Horse, Race
+
+EXPORT_MODELS = {"races": Race, "horses": Horse, "bets": Bet}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class ExportService:
+    """Stream table rows out as NDJSON, CSV or Arrow IPC in constant memory.
+
+    Rows are read through a server-side cursor (`yield_per`) in batches of
+    `batch_size` and encoded a batch at a time, so nothing grows with the
+    row count. Each export opens its own session from `session_factory`
+    because it outlives the request's session.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], batch_size: int = DEFAULT_BATCH_SIZE):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+
+    def iter_batches(self, model, fields: List[str], filters: Sequence = (), joins: Sequence = ()) -> Iterator[list]:
+        """Yield lists of row tuples, `batch_size` rows at a time, in primary key order."""
+        stmt = select(*[getattr(model, field) for field in fields]).select_from(model)
+        for target, onclause in joins:
+            stmt = stmt.join(target, onclause)
+        stmt = stmt.where(*filters).order_by(model.id).execution_options(yield_per=self.batch_size)
+
+        db = self.session_factory()
+        try:
+            for partition in db.execute(stmt).partitions():
+                yield partition
+        finally:
+            db.close()
+
+    def stream(self, fmt: str, model, fields: List[str], filters: Sequence = (), joins: Sequence = ()) -> Iterator[bytes]:
+        batches = self.iter_batches(model, fields, filters, joins)
+        if fmt == "ndjson":
+            return self._ndjson(batches, fields)
+        if fmt == "csv":
+            return self._csv(batches, fields)
+        if fmt == "arrow":
+            try:
+                import pyarrow as pa
+            except ImportError:
+                raise RuntimeError("Arrow export requires pyarrow (pip install pyarrow)")
+            return self._arrow(batches, pa, model, fields)
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    @staticmethod
+    def _ndjson(batches: Iterator[list], fields: List[str]) -> Iterator[bytes]:
+        for batch in batches:
+            yield "".join(
+                json.dumps(dict(zip(fields, row)), default=_json_default) + "\n" for row in batch
+            ).encode()
+
+    @staticmethod
+    def _csv(batches: Iterator[list], fields: List[str]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for batch in batches:
+            writer.writerows(
+                [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+                for row in batch
+            )
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    @staticmethod
+    def _arrow(batches: Iterator[list], pa, model, fields: List[str]) -> Iterator[bytes]:
+        types = {int: pa.int64(), float: pa.float64(), str: pa.string(), bool: pa.bool_(), datetime: pa.timestamp("us")}
+        schema = pa.schema([
+            (field, types.get(model.__table__.columns[field].type.python_type, pa.string())) for field in fields
+        ])
+        # The IPC writer appends to `sink`; each batch's bytes are handed on and the buffer reset
+        sink = io.BytesIO()
+        writer = pa.ipc.new_stream(sink, schema)
+
+        def drain() -> bytes:
+            data = sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+            return data
+
+        yield drain()
+        for batch in batches:
+            columns = list(zip(*batch))
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=schema.field(i).type) for i, column in enumerate(columns)],
+                schema=schema,
+            ))
+            yield drain()
+        writer.close()
+        yield drain()
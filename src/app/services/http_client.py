@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import backoff
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .rate_limit import SlidingWindowLimiter, provider_limiter
+
+# Provider quota shared by the racing data APIs: 100 requests per minute
+CALLS = 100
+PERIOD = 60
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (pip install httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_session(pool_size: Optional[int] = None) -> requests.Session:
+    """Keep-alive `requests` session for the synchronous API clients."""
+    pool_size = pool_size or int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@dataclass
+class Validators:
+    """ETag/Last-Modified of the last response, sent back as If-None-Match/If-Modified-Since."""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    @classmethod
+    def from_response(cls, response) -> "Validators":
+        """Works for both `requests` and `httpx` responses."""
+        return cls(response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+
+@dataclass
+class FetchResult:
+    """A conditional GET's outcome; `data` is None when the server answered 304 Not Modified."""
+    data: Any
+    validators: Validators = field(default_factory=Validators)
+
+    @property
+    def not_modified(self) -> bool:
+        return self.data is None
+
+
+def conditional_result(
+    response, validators: Optional[Validators], parse: Callable[[Any], Any] = lambda data: data
+) -> FetchResult:
+    """FetchResult from a response to a request sent with `validators.headers()`."""
+    if response.status_code == 304:
+        return FetchResult(None, validators or Validators())
+    response.raise_for_status()
+    return FetchResult(parse(response.json()), Validators.from_response(response))
+
+
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return True
+
+
+class AsyncAPIClient:
+    """Async JSON API client: one pooled httpx client, bounded concurrency and a call-rate limit.
+
+    Create one per process (or use it as an async context manager) so
+    connections and TLS sessions are reused across calls. Clients given the
+    same `provider` share one quota with each other and with that provider's
+    sync client; without it the client gets a quota of its own.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Optional[Dict[str, str]] = None,
+        auth: Optional[tuple] = None,
+        calls: int = CALLS,
+        period: float = PERIOD,
+        max_concurrency: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        http2: Optional[bool] = None,
+        timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        provider: Optional[str] = None,
+    ):
+        self.base_url = base_url
+        self.headers = headers or {}
+        self.auth = auth
+        self.max_concurrency = max_concurrency or int(os.getenv("HTTP_MAX_CONCURRENCY", "10"))
+        self.max_connections = max_connections or int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+        self.http2 = http2_available() if http2 is None else http2
+        self.timeout = timeout
+        self.transport = transport
+        self.rate_limiter = provider_limiter(provider, calls, period) if provider else SlidingWindowLimiter(calls, period)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                auth=self.auth,
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET `path` and decode JSON; retries transport errors, 429 and 5xx with backoff."""
+        async with self.semaphore:
+            return await self._get_json(path, params)
+
+    @backoff.on_exception(backoff.expo, httpx.HTTPError, max_tries=3, giveup=lambda e: not _retryable(e))
+    async def _get_json(self, path: str, params: Optional[Dict[str, Any]]) -> Any:
+        # Each retry counts against the quota too
+        await self.rate_limiter.acquire()
+        response = await self.client.get(path, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_horse_form(self, horse_id: str) -> Optional[Dict]:
+        """Get form history for a specific horse."""
+        try:
+            return await self.get_json(f"/horses/{horse_id}/form")
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            print(f"Error getting horse form: {str(e)}")
+            return None
+
+    async def get_horse_forms(self, horse_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """Fetch form for many horses in parallel, keyed by id (None where a fetch failed)."""
+        unique_ids = list(dict.fromkeys(horse_ids))
+        forms = await asyncio.gather(*(self.get_horse_form(horse_id) for horse_id in unique_ids))
+        return dict(zip(unique_ids, forms))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
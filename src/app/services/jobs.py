@@ -0,0 +1,311 @@
+import asyncio
+import inspect
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying"  # failed, waiting to run again
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+REDIS_PREFIX = "jobs"
+
+
+@dataclass
+class Job:
+    """One run of a stage, from submission to its result or last error."""
+    stage: str
+    params: Dict[str, Any]
+    dedup_key: str
+    max_attempts: int
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    attempts: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value))
+
+    @classmethod
+    def from_json(cls, raw) -> "Job":
+        data = json.loads(raw)
+        for name in ("created_at", "started_at", "finished_at"):
+            if data.get(name):
+                data[name] = datetime.fromisoformat(data[name])
+        return cls(**data)
+
+
+@dataclass
+class Stage:
+    """A kind of job: its handler and how many may run at once and how often it's retried."""
+    name: str
+    handler: Callable[..., Any]  # called with the job's params; sync handlers run in a thread
+    concurrency: int = 1
+    max_attempts: int = 3
+    retry_delay: float = 30.0  # seconds before the first retry, doubled for each after
+
+
+class JobStore:
+    """Jobs by id plus the dedup keys of unfinished ones.
+
+    Kept in process, the last `max_jobs` by submission order, with an
+    optional Redis tier that makes jobs and dedup keys visible to every
+    worker: a job submitted to one is listed by all of them, and a
+    duplicate submitted to another returns the original.
+    """
+
+    def __init__(self, max_jobs: int = 1000, ttl_seconds: float = 7 * 86400, redis_client=None):
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis_client
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[str, str] = {}  # dedup key -> id of its unfinished job
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "JobStore":
+        """Build a store from JOB_HISTORY, adding Redis when REDIS_URL is set."""
+        redis_client = None
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url:
+            import redis
+            redis_client = redis.Redis.from_url(redis_url)
+        return cls(max_jobs=int(os.getenv("JOB_HISTORY", "1000")), redis_client=redis_client)
+
+    def claim(self, job: Job) -> Optional[Job]:
+        """Take `job`'s dedup key and store it, or return the unfinished job already holding the key."""
+        with self._lock:
+            holder = self._active.get(job.dedup_key)
+            if holder is not None and holder in self._jobs:
+                return self._jobs[holder]
+            if self.redis is not None:
+                try:
+                    # Expires in case the worker running it dies before releasing it
+                    if not self.redis.set(self._key("dedup", job.dedup_key), job.id, nx=True, ex=int(self.ttl_seconds)):
+                        holder = self.redis.get(self._key("dedup", job.dedup_key))
+                        existing = self._redis_get(holder.decode() if isinstance(holder, bytes) else holder) if holder else None
+                        if existing is not None and existing.status not in FINISHED:
+                            return existing
+                        self.redis.set(self._key("dedup", job.dedup_key), job.id, ex=int(self.ttl_seconds))
+                except Exception as e:
+                    print(f"Job store Redis dedup failed: {str(e)}")
+            self._active[job.dedup_key] = job.id
+        self.save(job)
+        return None
+
+    def save(self, job: Job):
+        with self._lock:
+            self._jobs[job.id] = job
+            if job.status in FINISHED and self._active.get(job.dedup_key) == job.id:
+                del self._active[job.dedup_key]
+            while len(self._jobs) > self.max_jobs:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status not in FINISHED:
+                    break
+                del self._jobs[oldest.id]
+        if self.redis is not None:
+            try:
+                self.redis.set(self._key("job", job.id), job.to_json(), ex=int(self.ttl_seconds))
+                self.redis.zadd(self._key("recent"), {job.id: job.created_at.timestamp()})
+                self.redis.zremrangebyrank(self._key("recent"), 0, -self.max_jobs - 1)
+                if job.status in FINISHED:
+                    dedup = self._key("dedup", job.dedup_key)
+                    holder = self.redis.get(dedup)
+                    if (holder.decode() if isinstance(holder, bytes) else holder) == job.id:
+                        self.redis.delete(dedup)
+            except Exception as e:
+                print(f"Job store Redis write failed: {str(e)}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self._redis_get(job_id)
+
+    def list(self, stage: Optional[str] = None, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        """Most recently submitted first."""
+        with self._lock:
+            jobs = {job.id: job for job in self._jobs.values()}
+        if self.redis is not None:
+            try:
+                ids = [raw.decode() if isinstance(raw, bytes) else raw
+                       for raw in self.redis.zrevrange(self._key("recent"), 0, self.max_jobs - 1)]
+                missing = [job_id for job_id in ids if job_id not in jobs]
+                if missing:
+                    for raw in self.redis.mget([self._key("job", job_id) for job_id in missing]):
+                        if raw:
+                            job = Job.from_json(raw)
+                            jobs[job.id] = job
+            except Exception as e:
+                print(f"Job store Redis read failed: {str(e)}")
+        matching = [
+            job for job in jobs.values()
+            if (stage is None or job.stage == stage) and (status is None or job.status == status)
+        ]
+        return sorted(matching, key=lambda job: job.created_at, reverse=True)[:limit]
+
+    def _redis_get(self, job_id: str) -> Optional[Job]:
+        if self.redis is None:
+            return None
+        try:
+            raw = self.redis.get(self._key("job", job_id))
+            return Job.from_json(raw) if raw else None
+        except Exception as e:
+            print(f"Job store Redis read failed: {str(e)}")
+            return None
+
+    @staticmethod
+    def _key(kind: str, name: str = "") -> str:
+        return f"{REDIS_PREFIX}:{kind}:{name}" if name else f"{REDIS_PREFIX}:{kind}"
+
+
+class JobScheduler:
+    """Runs stage jobs as asyncio tasks on the app's event loop.
+
+    submit() returns a Job handle straight away. A job whose dedup key is
+    held by an unfinished job returns that job instead of running twice.
+    Each stage runs at most `concurrency` jobs at a time, the rest waiting
+    as `queued`. A failed job is retried after `retry_delay`, doubled each
+    time, until it has made `max_attempts` attempts. submit() may be called
+    from any thread, so a stage's handler can queue the next stage.
+    """
+
+    def __init__(self, store: Optional[JobStore] = None):
+        self.store = store or JobStore.from_env()
+        self.stages: Dict[str, Stage] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def stage(
+        self,
+        name: str,
+        handler: Callable[..., Any],
+        concurrency: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+    ) -> Stage:
+        """Register a stage; JOB_<NAME>_CONCURRENCY and JOB_MAX_ATTEMPTS/JOB_RETRY_SECONDS override the defaults."""
+        self.stages[name] = Stage(
+            name,
+            handler,
+            concurrency=int(os.getenv(f"JOB_{name.upper()}_CONCURRENCY", concurrency or 1)),
+            max_attempts=max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+            retry_delay=retry_delay if retry_delay is not None else float(os.getenv("JOB_RETRY_SECONDS", "30")),
+        )
+        return self.stages[name]
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and not self._loop.is_closed()
+
+    def start(self):
+        """Start taking jobs on the running event loop; call from the app's lifespan."""
+        self._loop = asyncio.get_running_loop()
+        self._semaphores = {name: asyncio.Semaphore(stage.concurrency) for name, stage in self.stages.items()}
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Cancel every job still queued or running here and wait up to `timeout` seconds for them."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        self._loop = None
+
+    def submit(self, stage: str, params: Optional[Dict[str, Any]] = None, dedup_key: Optional[str] = None) -> Job:
+        """Queue a `stage` job; by default jobs with the same stage and params are duplicates."""
+        if stage not in self.stages:
+            raise ValueError(f"Unknown job stage: {stage}")
+        if not self.running:
+            raise RuntimeError("Job scheduler is not running")
+        params = params or {}
+        job = Job(
+            stage=stage,
+            params=params,
+            dedup_key=dedup_key or f"{stage}:{json.dumps(params, sort_keys=True, default=str)}",
+            max_attempts=self.stages[stage].max_attempts,
+        )
+        existing = self.store.claim(job)
+        if existing is not None:
+            return existing
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._spawn(job)
+        else:
+            self._loop.call_soon_threadsafe(self._spawn, job)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a job queued or running in this process; returns it, or None if it isn't one."""
+        task = self._tasks.get(job_id)
+        if task is None:
+            return None
+        task.cancel()
+        await asyncio.wait([task], timeout=5)
+        return self.store.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.store.get(job_id)
+
+    def list(self, stage: Optional[str] = None, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        return self.store.list(stage, status, limit)
+
+    def _spawn(self, job: Job):
+        task = asyncio.create_task(self._run(job), name=f"job-{job.stage}-{job.id}")
+        task.add_done_callback(lambda _: self._cancelled_before_start(job))
+        self._tasks[job.id] = task
+
+    def _cancelled_before_start(self, job: Job):
+        """A task cancelled before its first step never runs _run's cleanup."""
+        if job.status not in FINISHED:
+            job.status, job.finished_at = CANCELLED, datetime.utcnow()
+            self.store.save(job)
+            self._tasks.pop(job.id, None)
+
+    async def _run(self, job: Job):
+        stage = self.stages[job.stage]
+        try:
+            async with self._semaphores[job.stage]:
+                while True:
+                    job.status, job.started_at = RUNNING, datetime.utcnow()
+                    job.attempts += 1
+                    self.store.save(job)
+                    try:
+                        if inspect.iscoroutinefunction(stage.handler):
+                            job.result = await stage.handler(**job.params)
+                        else:
+                            job.result = await asyncio.to_thread(stage.handler, **job.params)
+                        job.status, job.error = SUCCEEDED, None
+                        break
+                    except Exception as e:
+                        job.error = f"{type(e).__name__}: {str(e)}"
+                        if job.attempts >= job.max_attempts:
+                            job.status = FAILED
+                            print(f"Job {job.stage} {job.id} failed after {job.attempts} attempts: {job.error}")
+                            break
+                        job.status = RETRYING
+                        self.store.save(job)
+                    await asyncio.sleep(stage.retry_delay * 2 ** (job.attempts - 1))
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        finally:
+            job.finished_at = datetime.utcnow()
+            self.store.save(job)
+            self._tasks.pop(job.id, None)
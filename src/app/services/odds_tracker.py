@@ -0,0 +1,321 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, selectinload
+
+from ..models import OddsTick, Race
+from .push import PushHub
+from .race_card_refresh import card_key, snapshot_cards
+from .racing_post_api import RacingPostAPI
+
+# (horse_id, race_id, odds, epoch seconds) waiting to be written to odds_ticks
+Tick = Tuple[int, int, float, float]
+
+
+class OddsStore:
+    """Recent odds per runner in fixed-size NumPy rings, plus the ticks not yet flushed.
+
+    Runner r's last `capacity` ticks live in row r of `times` (epoch seconds)
+    and `prices`, written round-robin from `heads[r]`. Memory is fixed per
+    runner, and the latest price or the price at an earlier moment (a binary
+    search of at most log2(capacity) steps) costs the same however long the
+    runner has been tracked. Every tick is also queued in `pending` until
+    drain(); past `max_pending` the oldest are dropped and counted.
+    """
+
+    def __init__(self, capacity: int = 256, runners: int = 1024, max_pending: int = 1_000_000):
+        self.capacity = capacity
+        self.times = np.zeros((runners, capacity))
+        self.prices = np.zeros((runners, capacity))
+        self.heads = np.zeros(runners, dtype=np.int64)
+        self.counts = np.zeros(runners, dtype=np.int64)
+        self.rows: Dict[int, int] = {}
+        self.horse_ids: List[int] = []  # row -> horse_id
+        self.races: Dict[int, int] = {}  # horse_id -> race_id
+        self.pending: Deque[Tick] = deque(maxlen=max_pending)
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def record(self, horse_id: int, race_id: int, price: float, at: Optional[float] = None):
+        """Add a tick; one arriving out of order is stamped with the runner's latest time."""
+        at = time.time() if at is None else at
+        with self.lock:
+            row = self.rows.get(horse_id)
+            if row is None:
+                row = self._add_runner(horse_id, race_id)
+            head = self.heads[row]
+            if self.counts[row]:
+                at = max(at, self.times[row, head - 1])
+            self.times[row, head] = at
+            self.prices[row, head] = price
+            self.heads[row] = (head + 1) % self.capacity
+            if self.counts[row] < self.capacity:
+                self.counts[row] += 1
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append((horse_id, race_id, price, at))
+
+    def _add_runner(self, horse_id: int, race_id: int) -> int:
+        row = len(self.horse_ids)
+        if row == len(self.heads):
+            grow = len(self.heads)
+            self.times = np.vstack([self.times, np.zeros((grow, self.capacity))])
+            self.prices = np.vstack([self.prices, np.zeros((grow, self.capacity))])
+            self.heads = np.concatenate([self.heads, np.zeros(grow, dtype=np.int64)])
+            self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+        self.rows[horse_id] = row
+        self.horse_ids.append(horse_id)
+        self.races[horse_id] = race_id
+        return row
+
+    def drain(self) -> List[Tick]:
+        """Take every pending tick for flushing."""
+        with self.lock:
+            ticks = list(self.pending)
+            self.pending.clear()
+        return ticks
+
+    def requeue(self, ticks: List[Tick]):
+        """Put back ticks a failed flush took, ahead of any queued since; the oldest go if there's no room."""
+        with self.lock:
+            room = self.pending.maxlen - len(self.pending)
+            kept = ticks[len(ticks) - room:] if room < len(ticks) else ticks
+            self.dropped += len(ticks) - len(kept)
+            self.pending.extendleft(reversed(kept))
+
+    def evict_idle(self, before: float) -> int:
+        """Forget runners with no tick since `before`, compacting the rings; returns how many went."""
+        with self.lock:
+            n = len(self.horse_ids)
+            if not n:
+                return 0
+            latest = self.times[np.arange(n), (self.heads[:n] - 1) % self.capacity]
+            keep = np.flatnonzero(latest >= before)
+            if len(keep) == n:
+                return 0
+            for array in (self.times, self.prices, self.heads, self.counts):
+                array[:len(keep)] = array[keep]
+            self.heads[len(keep):n] = 0
+            self.counts[len(keep):n] = 0
+            self.horse_ids = [self.horse_ids[row] for row in keep]
+            self.rows = {horse_id: row for row, horse_id in enumerate(self.horse_ids)}
+            self.races = {horse_id: self.races[horse_id] for horse_id in self.horse_ids}
+            return n - len(keep)
+
+    def _tick(self, row: int, index: int) -> Tuple[float, float]:
+        """The `index`-th oldest tick kept for `row`."""
+        slot = (self.heads[row] - self.counts[row] + index) % self.capacity
+        return float(self.times[row, slot]), float(self.prices[row, slot])
+
+    def latest(self, horse_id: int) -> Optional[Tuple[float, float]]:
+        with self.lock:
+            row = self.rows.get(horse_id)
+            return None if row is None else self._tick(row, self.counts[row] - 1)
+
+    def price_at(self, horse_id: int, at: float) -> Optional[Tuple[float, float]]:
+        """The last tick at or before `at`, or None if the ring starts after it."""
+        with self.lock:
+            row = self.rows.get(horse_id)
+            if row is None:
+                return None
+            return self._search(row, at)
+
+    def _search(self, row: int, at: float) -> Optional[Tuple[float, float]]:
+        lo, hi = 0, int(self.counts[row])
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._tick(row, mid)[0] <= at:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self._tick(row, lo - 1) if lo else None
+
+    def drift(self, horse_id: int, minutes: float, now: Optional[float] = None) -> Optional[Dict]:
+        """How far the latest price has moved against the price `minutes` ago, in percent.
+
+        When the ring doesn't reach back that far the oldest tick kept stands
+        in and `complete` is False. None for a runner without ticks.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            row = self.rows.get(horse_id)
+            if row is None:
+                return None
+            _, price = self._tick(row, self.counts[row] - 1)
+            start = self._search(row, now - minutes * 60)
+            complete = start is not None
+            since, previous = start if complete else self._tick(row, 0)
+            race_id = self.races[horse_id]
+        return {
+            "horse_id": horse_id,
+            "race_id": race_id,
+            "odds": price,
+            "previous_odds": previous,
+            "change_pct": (price - previous) / previous * 100.0 if previous else 0.0,
+            "since": datetime.utcfromtimestamp(since),
+            "complete": complete,
+        }
+
+    def runners(self, race_id: int) -> List[int]:
+        with self.lock:
+            return [horse_id for horse_id, race in self.races.items() if race == race_id]
+
+
+def off_datetime(race: Race) -> Optional[datetime]:
+    """The race's off as a naive local datetime, from race_date's day and the "HH:MM" off_time."""
+    try:
+        hours, minutes = (int(part) for part in (race.off_time or "").split(":"))
+    except ValueError:
+        return None
+    return datetime.combine(race.race_date.date(), datetime.min.time()) + timedelta(hours=hours, minutes=minutes)
+
+
+class OddsTracker:
+    """Live odds for runners in races near the off, kept in memory and flushed to `odds_ticks`.
+
+    Every `poll_interval` seconds the races due off within `window_minutes`
+    (or off in the last few minutes) have their odds read from the day's
+    card, fetched once per poll through `RacingPostAPI.fetch_race_cards`.
+    Races carry no provider id, so like race card refreshes they are matched
+    by track and off time, and runners by name. Each price is recorded in
+    the OddsStore and copied to `horses.odds` when it moved. Pending ticks are
+    written every `flush_interval` seconds in multi-row INSERTs of
+    `flush_batch` rows. Drift queries read only the store. With a `push`
+    hub each race's moved prices are sent to its WebSocket subscribers.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        api: Optional[RacingPostAPI] = None,
+        store: Optional[OddsStore] = None,
+        poll_interval: Optional[float] = None,
+        window_minutes: Optional[float] = None,
+        flush_interval: Optional[float] = None,
+        flush_batch: Optional[int] = None,
+        push: Optional[PushHub] = None,
+    ):
+        self.session_factory = session_factory
+        self.push = push
+        self.api = api or RacingPostAPI()
+        self.store = store or OddsStore(capacity=int(os.getenv("ODDS_RING_SIZE", "256")))
+        self.poll_interval = poll_interval or float(os.getenv("ODDS_POLL_SECONDS", "30"))
+        self.window_minutes = window_minutes or float(os.getenv("ODDS_POLL_WINDOW_MINUTES", "30"))
+        self.flush_interval = flush_interval or float(os.getenv("ODDS_FLUSH_SECONDS", "1"))
+        self.flush_batch = flush_batch or int(os.getenv("ODDS_FLUSH_BATCH", "5000"))
+        self.cancel_threshold = float(os.getenv("ODDS_DRIFT_CANCEL_PCT", "20"))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def races_near_off(self, db: Session, now: Optional[datetime] = None) -> List[Race]:
+        """Today's races off between 5 minutes ago and `window_minutes` from `now` (local time)."""
+        now = now or datetime.now()
+        today = datetime.combine(now.date(), datetime.min.time())
+        races = db.scalars(
+            select(Race)
+            .options(selectinload(Race.horses))
+            .where(Race.race_date >= today, Race.race_date < today + timedelta(days=1))
+        ).all()
+        earliest, latest = now - timedelta(minutes=5), now + timedelta(minutes=self.window_minutes)
+        return [race for race in races if (off := off_datetime(race)) is not None and earliest <= off <= latest]
+
+    def poll_once(self, db: Session, now: Optional[datetime] = None) -> int:
+        """Fetch and record the odds of every race near the off; returns the ticks recorded."""
+        recorded = 0
+        moves = []
+        cards = {}  # race day -> that day's card, fetched once per poll and only if a race is near the off
+        for race in self.races_near_off(db, now):
+            day = race.race_date.date()
+            if day not in cards:
+                cards[day] = snapshot_cards(self.api.fetch_race_cards(day).data or [])
+            card = cards[day].get(card_key(race.track, race.off_time))
+            if card is None:
+                continue
+            horses = {horse.name: horse for horse in race.horses}
+            moved = {}
+            for name, runner in card["runners"].items():
+                horse, price = horses.get(name), runner.get("odds")
+                if horse is None or not price:
+                    continue
+                price = float(price)
+                self.store.record(horse.id, race.id, price)
+                recorded += 1
+                if horse.odds != price:
+                    horse.odds = moved[horse.id] = price
+            if moved:
+                moves.append((race.id, race.race_date, race.track, moved))
+        db.commit()
+        if self.push is not None:
+            for race_id, race_date, track, moved in moves:
+                # Keyed by race so a slow client's queued moves collapse into one message
+                self.push.publish("odds", race_id, race_date, track, key=("odds", race_id), odds=moved)
+        return recorded
+
+    def flush(self, db: Session) -> int:
+        """Write pending ticks to odds_ticks; on failure they go back on the queue."""
+        ticks = self.store.drain()
+        if not ticks:
+            return 0
+        try:
+            for i in range(0, len(ticks), self.flush_batch):
+                db.execute(insert(OddsTick), [
+                    {"horse_id": horse_id, "race_id": race_id, "odds": odds, "recorded_at": datetime.utcfromtimestamp(at)}
+                    for horse_id, race_id, odds, at in ticks[i:i + self.flush_batch]
+                ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.store.requeue(ticks)
+            raise
+        return len(ticks)
+
+    def drift(self, horse_id: int, minutes: float) -> Optional[Dict]:
+        drift = self.store.drift(horse_id, minutes)
+        if drift is not None:
+            # Odds lengthening past the threshold: the PRD's cancel signal
+            drift["cancel"] = drift["change_pct"] >= self.cancel_threshold
+        return drift
+
+    def race_drift(self, race_id: int, minutes: float) -> List[Dict]:
+        return [self.drift(horse_id, minutes) for horse_id in self.store.runners(race_id)]
+
+    def start(self):
+        """Poll and flush in a background thread until `stop()`."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="odds-tracker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        # Whatever was recorded since the last flush
+        self._safely(self.flush, "flush")
+
+    def _safely(self, step: Callable[[Session], object], name: str):
+        db = self.session_factory()
+        try:
+            step(db)
+        except Exception as e:
+            print(f"Odds tracker {name} error: {str(e)}")
+        finally:
+            db.close()
+
+    def _run(self):
+        next_poll = 0.0
+        while not self._stop.is_set():
+            if time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + self.poll_interval
+                self._safely(self.poll_once, "poll")
+                # Runners off more than a day ago
+                self.store.evict_idle(time.time() - 86400)
+            self._safely(self.flush, "flush")
+            self._stop.wait(self.flush_interval)
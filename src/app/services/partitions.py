@@ -0,0 +1,183 @@
+import hashlib
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from ..models import Bet, Horse, OddsTick, Race, RaceAnalysis, RaceCardChange, RaceCardSnapshot
+
+# Partitioned history tables and their partition key (see alembic revisions 0005 and 0008)
+PARTITIONED_TABLES = {"horses": Horse.race_date, "bets": Bet.placed_at, "odds_ticks": OddsTick.recorded_at}
+
+PARTITION_NAME = re.compile(r"^(?P<table>\w+)_p(?P<month>\d{6})$")
+
+# pg_try_advisory_xact_lock key so only one worker runs maintenance at a time
+ADVISORY_LOCK_KEY = int(hashlib.sha1(b"partition-maintenance").hexdigest()[:15], 16)
+
+
+def month_start(value: datetime, months: int = 0) -> datetime:
+    """First day of the month `months` after the one containing `value`."""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def create_partition_sql(table: str, month: datetime) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{month_start(month, 1):%Y-%m-%d}')"
+    )
+
+
+class PartitionManager:
+    """Creates upcoming monthly partitions and drops expired ones.
+
+    On Postgres `horses`, `bets` and `odds_ticks` are range-partitioned by
+    month. Partitions are created `months_ahead` months in advance, and with
+    `retention_months` set, whole partitions older than that are dropped
+    instead of deleting their rows one by one. Elsewhere there is nothing to
+    create and retention falls back to plain DELETEs.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        months_ahead: Optional[int] = None,
+        retention_months: Optional[int] = None,
+        interval: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.months_ahead = months_ahead if months_ahead is not None else int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+        # Unset keeps history forever
+        retention = os.getenv("PARTITION_RETENTION_MONTHS")
+        self.retention_months = retention_months if retention_months is not None else (int(retention) if retention else None)
+        self.interval = interval or float(os.getenv("PARTITION_MAINTENANCE_SECONDS", "86400"))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def is_partitioned(db: Session) -> bool:
+        return db.get_bind().dialect.name == "postgresql"
+
+    @staticmethod
+    def partitions(db: Session, table: str) -> Dict[datetime, str]:
+        """Monthly partitions of `table` by first day of the month (Postgres only)."""
+        names = db.execute(text(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class parent ON parent.oid = pg_inherits.inhparent"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE parent.relname = :table"
+        ), {"table": table}).scalars()
+        months = {}
+        for name in names:
+            match = PARTITION_NAME.match(name)
+            if match and match["table"] == table:
+                months[datetime.strptime(match["month"], "%Y%m")] = name
+        return months
+
+    def ensure_partitions(self, db: Session, now: Optional[datetime] = None) -> List[str]:
+        """Create any missing partition from this month to `months_ahead` months on; the caller commits."""
+        if not self.is_partitioned(db):
+            return []
+        current = month_start(now or datetime.utcnow())
+        created = []
+        for table, key in PARTITIONED_TABLES.items():
+            existing = self.partitions(db, table)
+            for month in (month_start(current, n) for n in range(self.months_ahead + 1)):
+                if month not in existing:
+                    self._create_partition(db, table, key, month)
+                    created.append(partition_name(table, month))
+        return created
+
+    def _create_partition(self, db: Session, table: str, key, month: datetime):
+        default = f"{table}_default"
+        bounds = {"start": month, "end": month_start(month, 1)}
+        in_range = f"{key.name} >= :start AND {key.name} < :end"
+        stray = db.execute(text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1"), bounds).first()
+        if stray is None:
+            db.execute(text(create_partition_sql(table, month)))
+            return
+        # Rows that landed in DEFAULT would clash with the new partition's bounds:
+        # detach DEFAULT, create the partition, move the rows across, reattach
+        db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+        db.execute(text(create_partition_sql(table, month)))
+        db.execute(text(f"INSERT INTO {table} SELECT * FROM {default} WHERE {in_range}"), bounds)
+        db.execute(text(f"DELETE FROM {default} WHERE {in_range}"), bounds)
+        db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+
+    def drop_before(self, db: Session, cutoff: datetime) -> Dict[str, int]:
+        """Remove history before the month containing `cutoff`.
+
+        Whole partitions are dropped on Postgres; the races left without
+        runners are then deleted with their analyses and any stray bets and odds
+        ticks, and those days' race card snapshots and changes with them.
+        Returns the number of partitions dropped and races deleted; the caller commits.
+        """
+        boundary = month_start(cutoff)
+        dropped = 0
+        for table, key in PARTITIONED_TABLES.items():
+            if self.is_partitioned(db):
+                for month, name in sorted(self.partitions(db, table).items()):
+                    if month_start(month, 1) <= boundary:
+                        db.execute(text(f"DROP TABLE {name}"))
+                        dropped += 1
+            # Stragglers in DEFAULT on Postgres; everything on other dialects
+            db.execute(delete(key.class_).where(key < boundary))
+
+        old_races = select(Race.id).where(Race.race_date < boundary)
+        db.execute(delete(Bet).where(Bet.race_id.in_(old_races)))
+        db.execute(delete(OddsTick).where(OddsTick.race_id.in_(old_races)))
+        db.execute(delete(Horse).where(Horse.race_id.in_(old_races)))
+        db.execute(delete(RaceAnalysis).where(RaceAnalysis.race_id.in_(old_races)))
+        db.execute(delete(RaceCardSnapshot).where(RaceCardSnapshot.race_date < boundary))
+        db.execute(delete(RaceCardChange).where(RaceCardChange.race_date < boundary))
+        races = db.execute(delete(Race).where(Race.race_date < boundary)).rowcount
+        return {"partitions_dropped": dropped, "races_deleted": races}
+
+    def run_once(self, now: Optional[datetime] = None) -> Dict:
+        """Create upcoming partitions and apply retention in one transaction.
+
+        Returns {} without doing anything while another worker holds the lock.
+        """
+        now = now or datetime.utcnow()
+        db = self.session_factory()
+        try:
+            if self.is_partitioned(db) and not db.scalar(select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_KEY))):
+                return {}
+            result = {"created": self.ensure_partitions(db, now)}
+            if self.retention_months:
+                result.update(self.drop_before(db, month_start(now, -self.retention_months)))
+            db.commit()
+            return result
+        finally:
+            db.close()
+
+    def start(self):
+        """Run maintenance now and then every `interval` seconds in a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="partition-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                result = self.run_once()
+                if result.get("created") or result.get("partitions_dropped") or result.get("races_deleted"):
+                    print(f"Partition maintenance: {result}")
+            except Exception as e:
+                print(f"Partition maintenance error: {str(e)}")
+            self._stop.wait(self.interval)
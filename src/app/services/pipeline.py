@@ -0,0 +1,192 @@
+import asyncio
+import os
+from datetime import date as date_type, datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from ..models import Race
+from .bulk_ingest import as_race_datetime
+from .claude_service import ClaudeService, RaceAnalysisResponse
+from .jobs import Job, JobScheduler
+from .odds_tracker import OddsTracker, off_datetime
+from .race_card_refresh import RaceCardRefresher
+
+STAGES = ("ingest", "analyse", "odds", "settle")
+
+
+class DailyPipeline:
+    """The PRD's daily workflow as JobScheduler stages: ingest → analyse → odds → settle.
+
+    Each stage is a job of its own. Run with `pipeline=True`, it queues the
+    next stage for the same day when it succeeds, so a failed analysis is
+    retried without scraping the cards again. `settle` is only registered
+    when a settlement function is given. The odds stage polls today's races
+    until the last one is off, so leave ODDS_TRACKER off when using it.
+    With DAILY_PIPELINE_AT ("HH:MM", local time) set, start() also queues
+    the whole pipeline for the day at that time.
+    """
+
+    def __init__(
+        self,
+        scheduler: JobScheduler,
+        session_factory: Callable[[], Session],
+        refresher: RaceCardRefresher,
+        sources: Dict[str, Any],
+        claude_service: ClaudeService,
+        save_analysis: Callable[[Session, int, RaceAnalysisResponse], Any],
+        odds_tracker: OddsTracker,
+        settle: Optional[Callable[..., Any]] = None,
+    ):
+        self.scheduler = scheduler
+        self.session_factory = session_factory
+        self.refresher = refresher
+        self.sources = sources
+        self.claude_service = claude_service
+        self.save_analysis = save_analysis
+        self.odds_tracker = odds_tracker
+        self.daily_at = os.getenv("DAILY_PIPELINE_AT")
+        self.daily_source = os.getenv("DAILY_PIPELINE_SOURCE", "racing_post")
+        self._daily: Optional[asyncio.Task] = None
+
+        # Scraping and the odds feed are rate limited upstream; analyses already run concurrently inside a job
+        scheduler.stage("ingest", self.ingest, concurrency=1)
+        scheduler.stage("analyse", self.analyse, concurrency=2)
+        scheduler.stage("odds", self.monitor_odds, concurrency=1, max_attempts=1)
+        if settle is not None:
+            scheduler.stage("settle", settle, concurrency=1)
+
+    def run(self, race_date: date_type, source: str = "racing_post") -> Job:
+        """Queue the whole pipeline for a day; returns the ingest job."""
+        return self.scheduler.submit("ingest", {"date": race_date.isoformat(), "source": source, "pipeline": True})
+
+    def _next(self, stage: str, race_date: str):
+        following = STAGES[STAGES.index(stage) + 1]
+        if following in self.scheduler.stages:
+            self.scheduler.submit(following, {"date": race_date, "pipeline": True})
+
+    def ingest(self, date: str, source: str = "racing_post", full: bool = False, pipeline: bool = False) -> Dict:
+        """Refresh a day's race cards, the work GET /race-cards does."""
+        if source not in self.sources:
+            raise ValueError(f"Unknown race card source: {source}")
+        db = self.session_factory()
+        try:
+            refresh = self.refresher.refresh(db, date_type.fromisoformat(date), source, self.sources[source].fetch_race_cards, full=full)
+        finally:
+            db.close()
+        if refresh.status == "empty":
+            # Usually a failed scrape; raising gets it retried
+            raise RuntimeError(f"No race cards for {date} from {source}")
+        if pipeline:
+            self._next("ingest", date)
+        return refresh.model_dump(mode="json")
+
+    async def analyse(self, date: Optional[str] = None, race_id: Optional[int] = None, pipeline: bool = False) -> Dict:
+        """Analyse one race, or every race with runners on a day, and store the analyses.
+
+        Raises when nothing could be analysed, so the job is retried; races
+        that failed alongside ones that didn't are listed in the result.
+        Unchanged cards come from the analysis cache on a retry.
+        """
+        requests = await asyncio.to_thread(self._requests, date, race_id)
+        analysed, failed = [], {}
+        async for analysed_id, result in self.claude_service.analyze_races(requests):
+            if isinstance(result, Exception):
+                failed[analysed_id] = str(result)
+                continue
+            try:
+                await asyncio.to_thread(self._save, analysed_id, result)
+                analysed.append(analysed_id)
+            except Exception as e:
+                failed[analysed_id] = f"Failed to save analysis: {str(e)}"
+        if failed and not analysed:
+            raise RuntimeError(f"No race analysed: {failed}")
+        if pipeline and date:
+            self._next("analyse", date)
+        return {"analysed": sorted(analysed), "failed": failed}
+
+    def _requests(self, date: Optional[str], race_id: Optional[int]) -> Dict:
+        db = self.session_factory()
+        try:
+            stmt = select(Race).options(selectinload(Race.horses))
+            if race_id is not None:
+                stmt = stmt.where(Race.id == race_id)
+            else:
+                day = as_race_datetime(date_type.fromisoformat(date))
+                stmt = stmt.where(Race.race_date >= day, Race.race_date < day + timedelta(days=1))
+            races = db.scalars(stmt).all()
+            if race_id is not None and not races:
+                raise ValueError(f"Race {race_id} not found")
+            return {race.id: self.claude_service.format_race_data(race, race.horses) for race in races if race.horses}
+        finally:
+            db.close()
+
+    def _save(self, race_id: int, analysis: RaceAnalysisResponse):
+        db = self.session_factory()
+        try:
+            self.save_analysis(db, race_id, analysis)
+        finally:
+            db.close()
+
+    async def monitor_odds(self, date: str, pipeline: bool = False) -> Dict:
+        """Poll odds for races near the off until five minutes after the day's last race.
+
+        Only today can be monitored; any other day finishes straight away.
+        """
+        polls, errors = 0, 0
+        day = date_type.fromisoformat(date)
+        last_off = await asyncio.to_thread(self._last_off, day) if day == date_type.today() else None
+        while last_off is not None and datetime.now() <= last_off + timedelta(minutes=5):
+            try:
+                await asyncio.to_thread(self._with_session, self.odds_tracker.poll_once)
+                await asyncio.to_thread(self._with_session, self.odds_tracker.flush)
+                polls += 1
+            except Exception as e:
+                # One failed poll shouldn't end a day's monitoring
+                errors += 1
+                print(f"Odds monitor error: {str(e)}")
+            await asyncio.sleep(self.odds_tracker.poll_interval)
+        if pipeline:
+            self._next("odds", date)
+        return {"polls": polls, "errors": errors, "last_off": last_off}
+
+    def _last_off(self, day: date_type) -> Optional[datetime]:
+        db = self.session_factory()
+        try:
+            races = db.scalars(select(Race).where(Race.race_date >= as_race_datetime(day),
+                                                  Race.race_date < as_race_datetime(day) + timedelta(days=1))).all()
+            offs = [off for off in (off_datetime(race) for race in races) if off is not None]
+            return max(offs) if offs else None
+        finally:
+            db.close()
+
+    def _with_session(self, step: Callable[[Session], Any]):
+        db = self.session_factory()
+        try:
+            return step(db)
+        finally:
+            db.close()
+
+    def start(self):
+        """Queue the pipeline every day at DAILY_PIPELINE_AT; call from the app's lifespan."""
+        if self.daily_at and (self._daily is None or self._daily.done()):
+            hours, minutes = (int(part) for part in self.daily_at.split(":"))
+            self._daily = asyncio.create_task(self._run_daily(hours, minutes))
+
+    async def stop(self):
+        if self._daily is not None:
+            self._daily.cancel()
+            await asyncio.gather(self._daily, return_exceptions=True)
+
+    async def _run_daily(self, hours: int, minutes: int):
+        while True:
+            now = datetime.now()
+            due = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
+            if due <= now:
+                due += timedelta(days=1)
+            await asyncio.sleep((due - now).total_seconds())
+            try:
+                self.run(due.date(), self.daily_source)
+            except Exception as e:
+                print(f"Daily pipeline error: {str(e)}")
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import os
+from collections import OrderedDict, defaultdict
+from datetime import date as date_type, datetime
+from itertools import count
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+# ("race_id", 12), ("date", "2042-06-01") or ("track", "ascot")
+Topic = Tuple[str, Any]
+
+TOPIC_KINDS = ("date", "track", "race_id")
+
+
+def parse_topics(date: Iterable = (), track: Iterable = (), race_id: Iterable = ()) -> Set[Topic]:
+    """Topics from subscription values; raises ValueError on a bad date or race id."""
+    topics = {("date", date_type.fromisoformat(str(value)).isoformat()) for value in date}
+    topics |= {("track", str(value).strip().lower()) for value in track}
+    topics |= {("race_id", int(value)) for value in race_id}
+    return topics
+
+
+def json_default(value):
+    return value.isoformat() if isinstance(value, (date_type, datetime)) else str(value)
+
+
+def as_list(value) -> List:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class Message:
+    """One update, serialised once however many subscribers it goes to.
+
+    Messages with the same `key` supersede each other in a subscriber's
+    queue: dict fields are merged and everything else takes the newer value.
+    """
+
+    def __init__(self, payload: Dict, topics: Set[Topic], key: Optional[Hashable] = None):
+        self.payload = payload
+        self.topics = topics
+        self.key = key
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = json.dumps(self.payload, separators=(",", ":"), default=json_default)
+        return self._text
+
+    def merge(self, newer: "Message") -> "Message":
+        payload = dict(self.payload)
+        for field, value in newer.payload.items():
+            previous = payload.get(field)
+            payload[field] = {**previous, **value} if isinstance(previous, dict) and isinstance(value, dict) else value
+        return Message(payload, newer.topics, newer.key)
+
+
+class Subscriber:
+    """A connection's topics and its bounded queue of messages not yet sent.
+
+    When the queue is full the client has fallen too far behind for deltas
+    to be worth sending: the queue is emptied and the next thing it receives
+    is a `resync` message counting what was dropped, after which it should
+    re-read state over HTTP (e.g. /race-cards/changes).
+    """
+
+    _ids = count(1)
+
+    def __init__(self, max_queue: int):
+        self.id = next(self._ids)
+        self.max_queue = max_queue
+        self.topics: Set[Topic] = set()
+        self.queue: "OrderedDict[Hashable, Message]" = OrderedDict()
+        self.dropped = 0
+        self.ready = asyncio.Event()
+        self.sender: Optional[asyncio.Task] = None
+        self.sending_since: Optional[float] = None  # loop time the send in flight started
+        self.slow = False
+
+    def offer(self, message: Message, merges: Optional[Dict[Message, Message]] = None) -> str:
+        """Queue `message`; returns "queued", "coalesced" or "dropped".
+
+        `merges` maps queued messages to their merge with `message`, so
+        subscribers holding the same queued message share one merged copy
+        (and its encoding) instead of each building their own.
+        """
+        key = message.key if message.key is not None else object()
+        outcome = "queued"
+        if key in self.queue:
+            previous = self.queue[key]
+            merged = merges.get(previous) if merges is not None else None
+            if merged is None:
+                merged = previous.merge(message)
+                if merges is not None:
+                    merges[previous] = merged
+            self.queue[key] = merged
+            outcome = "coalesced"
+        elif len(self.queue) >= self.max_queue:
+            self.dropped += len(self.queue) + 1
+            self.queue.clear()
+            outcome = "dropped"
+        else:
+            self.queue[key] = message
+        self.ready.set()
+        return outcome
+
+    def take(self) -> List[str]:
+        """Everything queued, as text to send, oldest first."""
+        texts = []
+        if self.dropped:
+            texts.append(json.dumps({"type": "resync", "dropped": self.dropped}))
+            self.dropped = 0
+        texts.extend(message.text for message in self.queue.values())
+        self.queue.clear()
+        self.ready.clear()
+        return texts
+
+
+class PushHub:
+    """Fans race card changes, odds moves and new analyses out to WebSocket clients.
+
+    Clients subscribe to dates, tracks and race ids; a message reaches each
+    subscriber whose topics match its race's id, date or track once. Each
+    message is encoded once and queued per subscriber, and every connection
+    has its own sender task, so a slow client only ever holds up itself:
+    its queue is bounded at `max_queue` (odds for the same race coalesce
+    while queued), and a client still stuck on a send `send_timeout`
+    seconds old when its next message arrives is disconnected.
+
+    publish() may be called from any thread; delivery happens on the event
+    loop serving the connections. The hub is per process.
+    """
+
+    def __init__(self, max_queue: Optional[int] = None, send_timeout: Optional[float] = None):
+        self.max_queue = max_queue or int(os.getenv("WS_QUEUE_SIZE", "256"))
+        self.send_timeout = send_timeout or float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "10"))
+        self.subscribers: Dict[int, Subscriber] = {}
+        self.index: Dict[Topic, Set[int]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats: Dict[str, int] = {
+            "published": 0,
+            "delivered": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "slow_disconnects": 0,
+        }
+
+    def publish(self, kind: str, race_id: int, race_date, track: Optional[str], key: Optional[Hashable] = None, **fields):
+        """Send a `kind` message about a race to its subscribers; a no-op while nobody is connected."""
+        if not self.subscribers or self._loop is None:
+            return
+        day = (race_date.date() if isinstance(race_date, datetime) else race_date).isoformat() if race_date else None
+        topics = {("race_id", race_id)}
+        if day:
+            topics.add(("date", day))
+        if track:
+            topics.add(("track", track.lower()))
+        message = Message({"type": kind, "race_id": race_id, "date": day, "track": track, **fields}, topics, key)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._fanout(message)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._fanout, message)
+        except RuntimeError:
+            pass  # the loop has shut down
+
+    def _fanout(self, message: Message):
+        self.stats["published"] += 1
+        ids = set()
+        for topic in message.topics:
+            ids |= self.index.get(topic, set())
+        merges = {}
+        now = self._loop.time()
+        for subscriber_id in ids:
+            subscriber = self.subscribers.get(subscriber_id)
+            if subscriber is None or subscriber.slow:
+                continue
+            if subscriber.sending_since is not None and now - subscriber.sending_since > self.send_timeout:
+                # Checked here rather than with a timer per send, which costs a task and a timer handle each
+                subscriber.slow = True
+                subscriber.sender.cancel()
+                continue
+            outcome = subscriber.offer(message, merges)
+            self.stats["delivered" if outcome == "queued" else outcome] += 1
+
+    def subscribe(self, subscriber: Subscriber, topics: Set[Topic]):
+        subscriber.topics |= topics
+        for topic in topics:
+            self.index[topic].add(subscriber.id)
+
+    def unsubscribe(self, subscriber: Subscriber, topics: Set[Topic]):
+        subscriber.topics -= topics
+        for topic in topics:
+            ids = self.index.get(topic)
+            if ids is not None:
+                ids.discard(subscriber.id)
+                if not ids:
+                    del self.index[topic]
+
+    def subscription(self, subscriber: Subscriber) -> Dict:
+        topics = {kind: sorted(value for topic_kind, value in subscriber.topics if topic_kind == kind) for kind in TOPIC_KINDS}
+        return {"type": "subscribed", **topics}
+
+    def reply(self, subscriber: Subscriber, payload: Dict):
+        """Queue a message for this subscriber only."""
+        subscriber.offer(Message(payload, set()))
+
+    async def serve(self, websocket: WebSocket, topics: Set[Topic]):
+        """Run an accepted connection until it closes or falls too far behind.
+
+        Clients change their topics by sending
+        {"action": "subscribe" | "unsubscribe", "date": ..., "track": ..., "race_id": ...},
+        each a value or a list, and get their current topics back.
+        """
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(self.max_queue)
+        self.subscribers[subscriber.id] = subscriber
+        self.subscribe(subscriber, topics)
+        self.reply(subscriber, self.subscription(subscriber))
+        sender = subscriber.sender = asyncio.create_task(self._send(websocket, subscriber))
+        receiver = asyncio.create_task(self._receive(websocket, subscriber))
+        try:
+            await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (sender, receiver):
+                task.cancel()
+            await asyncio.gather(sender, receiver, return_exceptions=True)
+            self.unsubscribe(subscriber, set(subscriber.topics))
+            del self.subscribers[subscriber.id]
+        if subscriber.slow:
+            self.stats["slow_disconnects"] += 1
+            try:
+                await websocket.close(code=1013)  # try again later
+            except Exception:
+                pass
+
+    async def _send(self, websocket: WebSocket, subscriber: Subscriber):
+        loop = asyncio.get_running_loop()
+        while True:
+            await subscriber.ready.wait()
+            subscriber.sending_since = loop.time()
+            for text in subscriber.take():
+                await websocket.send_text(text)
+            subscriber.sending_since = None
+
+    async def _receive(self, websocket: WebSocket, subscriber: Subscriber):
+        while True:
+            try:
+                request = await websocket.receive_json()
+            except WebSocketDisconnect:
+                return
+            except ValueError:
+                self.reply(subscriber, {"type": "error", "detail": "Messages must be JSON"})
+                continue
+            action = request.get("action") if isinstance(request, dict) else None
+            if action not in ("subscribe", "unsubscribe"):
+                self.reply(subscriber, {"type": "error", "detail": 'action must be "subscribe" or "unsubscribe"'})
+                continue
+            try:
+                topics = parse_topics(*(as_list(request.get(kind)) for kind in TOPIC_KINDS))
+            except (TypeError, ValueError) as e:
+                self.reply(subscriber, {"type": "error", "detail": f"Invalid topic: {str(e)}"})
+                continue
+            (self.subscribe if action == "subscribe" else self.unsubscribe)(subscriber, topics)
+            self.reply(subscriber, self.subscription(subscriber))
+
+    def metrics(self) -> Dict:
+        return {
+            **self.stats,
+            "subscribers": len(self.subscribers),
+            "topics": len(self.index),
+            "queued": sum(len(subscriber.queue) for subscriber in self.subscribers.values()),
+        }
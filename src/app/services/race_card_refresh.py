@@ -0,0 +1,229 @@
+import hashlib
+import json
+from collections import defaultdict
+from datetime import date as date_type, datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from ..models import Horse, Race, RaceCardChange, RaceCardSnapshot
+from ..schemas import IngestReport, RaceCardRefresh
+from .bulk_ingest import BulkIngestService, as_race_datetime
+from .http_client import FetchResult, Validators
+from .push import PushHub
+
+# Runner columns compared between snapshots; odds changes get their own change type
+RUNNER_FIELDS = ("jockey", "trainer", "odds")
+
+ADVISORY_LOCK_KEY = int(hashlib.sha1(b"race-card-refresh").hexdigest()[:15], 16)
+
+Fetch = Callable[[date_type, Optional[Validators]], FetchResult]
+
+
+def card_key(track: str, off_time: Optional[str]) -> str:
+    return f"{track}|{off_time}"
+
+
+def snapshot_cards(race_cards: Any) -> Dict[str, Dict]:
+    """Normalise a source's cards to {"track|off_time": {track, off_time, race_type, runners: {name: fields}}}.
+
+    Takes the scraper's and RacingAPI's `race_track`/`race_time`/`horses` cards
+    as well as `track`/`off_time`/`runners` ones, bare or under "racecards"/"races".
+    """
+    if isinstance(race_cards, dict):
+        race_cards = race_cards.get("racecards") or race_cards.get("races") or []
+    snapshot = {}
+    for card in race_cards:
+        track = card.get("race_track") or card.get("track") or card.get("course")
+        off_time = card.get("race_time") or card.get("off_time")
+        runners = {
+            horse["name"]: {field: horse.get(field) for field in RUNNER_FIELDS}
+            for horse in card.get("horses") or card.get("runners") or []
+        }
+        snapshot[card_key(track, off_time)] = {
+            "track": track, "off_time": off_time, "race_type": card.get("race_type"), "runners": runners,
+        }
+    return snapshot
+
+
+def content_hash(snapshot: Dict[str, Dict]) -> str:
+    return hashlib.sha256(json.dumps(snapshot, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def diff_cards(old: Dict[str, Dict], new: Dict[str, Dict]) -> List[Dict]:
+    """Structural differences between two snapshots, as race_card_changes rows without ids.
+
+    A new race is one race_added change, not one per runner; a runner missing
+    from its race's new card is runner_scratched.
+    """
+    changes = []
+
+    def change(change_type: str, race: Dict, horse_name=None, field=None, old_value=None, new_value=None):
+        changes.append({
+            "change_type": change_type, "track": race["track"], "off_time": race["off_time"],
+            "horse_name": horse_name, "field": field, "old_value": old_value, "new_value": new_value,
+        })
+
+    for key, race in new.items():
+        before = old.get(key)
+        if before is None:
+            change("race_added", race)
+            continue
+        if before["race_type"] != race["race_type"]:
+            change("race_changed", race, field="race_type", old_value=before["race_type"], new_value=race["race_type"])
+        for name, runner in race["runners"].items():
+            previous = before["runners"].get(name)
+            if previous is None:
+                change("runner_added", race, name)
+                continue
+            for field in RUNNER_FIELDS:
+                if previous.get(field) != runner[field]:
+                    change_type = "odds_changed" if field == "odds" else "runner_changed"
+                    change(change_type, race, name, field, previous.get(field), runner[field])
+        for name in sorted(before["runners"].keys() - race["runners"].keys()):
+            change("runner_scratched", race, name)
+    for key in sorted(old.keys() - new.keys()):
+        change("race_removed", old[key])
+    return changes
+
+
+def ingest_card(race: Dict) -> Dict:
+    """A snapshot race back in the card shape BulkIngestService takes."""
+    return {
+        "race_track": race["track"],
+        "race_time": race["off_time"],
+        "race_type": race["race_type"],
+        "horses": [{"name": name, **runner} for name, runner in race["runners"].items()],
+    }
+
+
+class RaceCardRefresher:
+    """Refreshes a day's race cards by writing only what changed since the last fetch.
+
+    The last cards fetched per (source, day) are kept in `race_card_snapshots`
+    with the response's ETag/Last-Modified. A refresh asks the source with
+    those validators first. On a 304 or an identical payload it touches
+    nothing but the snapshot; otherwise it diffs the new cards against the
+    snapshot, re-ingests only the races that changed, marks scratched
+    runners and appends each difference to `race_card_changes`, which
+    clients read through /race-cards/changes. With a `push` hub each race's
+    changes are also sent to its WebSocket subscribers once committed.
+    """
+
+    def __init__(self, ingest: Optional[BulkIngestService] = None, push: Optional[PushHub] = None):
+        self.ingest = ingest or BulkIngestService()
+        self.push = push
+
+    def refresh(self, db: Session, race_date: date_type, source: str, fetch: Fetch, full: bool = False) -> RaceCardRefresh:
+        """Fetch `race_date` from `source` and apply the delta; `full` re-fetches and re-ingests every race."""
+        # One refresh at a time keeps change ids in commit order, so `since` cursors never skip a change
+        if db.get_bind().dialect.name == "postgresql" and not db.scalar(
+            select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_KEY))
+        ):
+            return RaceCardRefresh(status="skipped")
+
+        day = as_race_datetime(race_date)
+        snapshot = db.scalar(
+            select(RaceCardSnapshot).where(RaceCardSnapshot.source == source, RaceCardSnapshot.race_date == day)
+        )
+        validators = Validators(snapshot.etag, snapshot.last_modified) if snapshot is not None and not full else None
+        result = fetch(race_date, validators)
+        now = datetime.utcnow()
+
+        if result.not_modified:
+            snapshot.checked_at = now
+            db.commit()
+            return RaceCardRefresh(status="not_modified", ingest=self._unchanged(snapshot.cards))
+
+        cards = snapshot_cards(result.data)
+        if not cards:
+            # A failed scrape comes back empty; treating that as every race removed would scratch the day
+            db.rollback()
+            return RaceCardRefresh(status="empty")
+
+        digest = content_hash(cards)
+        if snapshot is not None and not full and snapshot.content_hash == digest:
+            snapshot.etag, snapshot.last_modified = result.validators.etag, result.validators.last_modified
+            snapshot.checked_at = now
+            db.commit()
+            return RaceCardRefresh(status="unchanged", ingest=self._unchanged(cards))
+
+        changes = diff_cards(snapshot.cards if snapshot is not None else {}, cards)
+        touched = set(cards) if full else {
+            card_key(change["track"], change["off_time"]) for change in changes if change["change_type"] != "race_removed"
+        }
+        report = self.ingest.ingest_race_cards(db, race_date, [ingest_card(cards[key]) for key in touched], commit=False)
+        untouched = self._unchanged({key: race for key, race in cards.items() if key not in touched})
+        report.races.unchanged += untouched.races.unchanged
+        report.horses.unchanged += untouched.horses.unchanged
+
+        race_ids = {
+            card_key(track, off_time): race_id
+            for race_id, track, off_time in db.execute(
+                select(Race.id, Race.track, Race.off_time).where(Race.race_date == day)
+            )
+        }
+        self._set_scratched(db, day, race_ids, changes, "runner_scratched", now)
+        self._set_scratched(db, day, race_ids, changes, "runner_added", None)
+        if changes:
+            db.execute(insert(RaceCardChange), [
+                {**change, "source": source, "race_date": day, "created_at": now,
+                 "race_id": race_ids.get(card_key(change["track"], change["off_time"]))}
+                for change in changes
+            ])
+
+        if snapshot is None:
+            snapshot = RaceCardSnapshot(source=source, race_date=day)
+            db.add(snapshot)
+        snapshot.cards, snapshot.content_hash = cards, digest
+        snapshot.etag, snapshot.last_modified = result.validators.etag, result.validators.last_modified
+        snapshot.checked_at = now
+        db.commit()
+        if self.push is not None:
+            self._publish(day, race_ids, changes)
+        return RaceCardRefresh(status="changed", changes=len(changes), ingest=report)
+
+    def _publish(self, day: datetime, race_ids: Dict[str, int], changes: List[Dict]):
+        """One race_card message per race, its changes without the fields the message already carries."""
+        by_race = defaultdict(list)
+        for change in changes:
+            by_race[card_key(change["track"], change["off_time"])].append(change)
+        for key, race_changes in by_race.items():
+            track, off_time = race_changes[0]["track"], race_changes[0]["off_time"]
+            self.push.publish("race_card", race_ids.get(key), day, track, off_time=off_time, changes=[
+                {field: value for field, value in change.items() if value is not None and field not in ("track", "off_time")}
+                for change in race_changes
+            ])
+
+    @staticmethod
+    def _unchanged(races: Dict[str, Dict]) -> IngestReport:
+        report = IngestReport()
+        report.races.unchanged = len(races)
+        report.horses.unchanged = sum(len(race["runners"]) for race in races.values())
+        return report
+
+    @staticmethod
+    def _set_scratched(db: Session, day: datetime, race_ids: Dict[str, int], changes: List[Dict], change_type: str,
+                       scratched_at: Optional[datetime]):
+        """Mark (or, with None, unmark) the runners named by `change_type` changes as scratched."""
+        runners = [
+            (race_ids[card_key(change["track"], change["off_time"])], change["horse_name"])
+            for change in changes
+            if change["change_type"] == change_type and card_key(change["track"], change["off_time"]) in race_ids
+        ]
+        if runners:
+            db.execute(
+                update(Horse)
+                .where(Horse.race_date == day, tuple_(Horse.race_id, Horse.name).in_(runners))
+                .values(scratched_at=scratched_at, updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+
+    @staticmethod
+    def changes(db: Session, since: int = 0, race_date: Optional[date_type] = None, limit: int = 500) -> List[RaceCardChange]:
+        """Changes recorded after the change id `since`, oldest first."""
+        stmt = select(RaceCardChange).where(RaceCardChange.id > since)
+        if race_date is not None:
+            stmt = stmt.where(RaceCardChange.race_date == as_race_datetime(race_date))
+        return db.scalars(stmt.order_by(RaceCardChange.id).limit(limit)).all()
@@ -0,0 +1,155 @@
+import importlib.util
+import os
+from typing import Dict, List, Optional, Type
+
+from bs4 import BeautifulSoup
+
+RACE_CARD_CLASS = "rp-racecard__race-card"
+HORSE_CLASS = "rp-racecard__horse"
+
+# Field divs inside a race card / runner, keyed by CSS class
+RACE_FIELDS = {
+    "rp-racecard__race-time": "race_time",
+    "rp-racecard__race-track": "race_track",
+    "rp-racecard__race-info": "race_info",
+}
+HORSE_FIELDS = {
+    "rp-racecard__horse-name": "name",
+    "rp-racecard__jockey": "jockey",
+    "rp-racecard__trainer": "trainer",
+    "rp-racecard__odds": "odds",
+}
+
+
+class RaceCardParser:
+    """Turns a Racing Post racecards page into a list of race dicts.
+
+    Every backend returns the same shape:
+    {"race_time", "race_track", "race_type", "horses": [{"name", "jockey", "trainer", "odds"}]}
+    """
+
+    name = "base"
+
+    def parse(self, html: str) -> List[Dict]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _build_race(fields: Dict[str, str], horses: List[Dict]) -> Optional[Dict]:
+        if not all(key in fields for key in RACE_FIELDS.values()):
+            return None
+        return {
+            "race_time": fields["race_time"],
+            "race_track": fields["race_track"],
+            "race_type": fields["race_info"].split(" ")[0],
+            "horses": horses,
+        }
+
+    @staticmethod
+    def _build_horse(fields: Dict[str, str]) -> Optional[Dict]:
+        if not all(key in fields for key in HORSE_FIELDS.values()):
+            return None
+        try:
+            odds = float(fields["odds"]) if fields["odds"] else None
+        except ValueError:
+            return None
+        return {
+            "name": fields["name"],
+            "jockey": fields["jockey"],
+            "trainer": fields["trainer"],
+            "odds": odds,
+        }
+
+
+class BeautifulSoupParser(RaceCardParser):
+    """Reference parser: BeautifulSoup tree with a `find` per field."""
+
+    name = "bs4"
+
+    def parse(self, html: str) -> List[Dict]:
+        soup = BeautifulSoup(html, "html.parser")
+        race_cards = []
+        for race_card in soup.find_all("div", class_=RACE_CARD_CLASS):
+            race_data = self._parse_race_card(race_card)
+            if race_data:
+                race_cards.append(race_data)
+        return race_cards
+
+    def _parse_race_card(self, race_card: BeautifulSoup) -> Optional[Dict]:
+        """Parse a single race card element."""
+        horses = []
+        for horse in race_card.find_all("div", class_=HORSE_CLASS):
+            horse_data = self._build_horse(self._find_fields(horse, HORSE_FIELDS))
+            if horse_data:
+                horses.append(horse_data)
+        return self._build_race(self._find_fields(race_card, RACE_FIELDS), horses)
+
+    @staticmethod
+    def _find_fields(element: BeautifulSoup, fields: Dict[str, str]) -> Dict[str, str]:
+        found = {}
+        for css_class, key in fields.items():
+            field = element.find("div", class_=css_class)
+            if field is not None:
+                found[key] = field.text.strip()
+        return found
+
+
+class LxmlParser(RaceCardParser):
+    """Single-pass parser over the lxml (libxml2) tree.
+
+    Walks the document once with start/end events, tracking the current race
+    card and runner, instead of re-searching each subtree per field.
+    """
+
+    name = "lxml"
+
+    def parse(self, html: str) -> List[Dict]:
+        from lxml import etree, html as lxml_html
+
+        race_cards = []
+        race_fields = horse_fields = None
+        horses: List[Dict] = []
+        open_race = open_horse = None
+
+        root = lxml_html.fromstring(html)
+        for event, element in etree.iterwalk(root, events=("start", "end"), tag="div"):
+            classes = element.get("class")
+            if not classes:
+                continue
+            for css_class in classes.split():
+                if event == "start":
+                    if css_class == RACE_CARD_CLASS and open_race is None:
+                        open_race, race_fields, horses = element, {}, []
+                    elif css_class == HORSE_CLASS and open_race is not None and open_horse is None:
+                        open_horse, horse_fields = element, {}
+                    continue
+
+                if element is open_horse and css_class == HORSE_CLASS:
+                    horse_data = self._build_horse(horse_fields)
+                    if horse_data:
+                        horses.append(horse_data)
+                    open_horse = None
+                elif element is open_race and css_class == RACE_CARD_CLASS:
+                    race_data = self._build_race(race_fields, horses)
+                    if race_data:
+                        race_cards.append(race_data)
+                    open_race = None
+                elif open_horse is not None and css_class in HORSE_FIELDS:
+                    horse_fields.setdefault(HORSE_FIELDS[css_class], element.text_content().strip())
+                elif open_race is not None and css_class in RACE_FIELDS:
+                    race_fields.setdefault(RACE_FIELDS[css_class], element.text_content().strip())
+        return race_cards
+
+
+PARSERS: Dict[str, Type[RaceCardParser]] = {
+    BeautifulSoupParser.name: BeautifulSoupParser,
+    LxmlParser.name: LxmlParser,
+}
+
+
+def get_parser(name: Optional[str] = None) -> RaceCardParser:
+    """Return a parser backend by name, defaulting to RACECARD_PARSER, then lxml if installed."""
+    default = LxmlParser.name if importlib.util.find_spec("lxml") else BeautifulSoupParser.name
+    name = name or os.getenv("RACECARD_PARSER", default)
+    if name not in PARSERS:
+        raise ValueError(f"Unknown race card parser '{name}'. Choose from: {', '.join(PARSERS)}")
+    return PARSERS[name]()
@@ -1,12 +1,19 @@
+import json
+import httpx
 import requests
 from datetime import datetime
 from typing import List, Dict, Optional
 import os
 from dotenv import load_dotenv
 from pydantic import BaseModel
+from .http_client import CALLS, PERIOD, AsyncAPIClient, FetchResult, Validators, conditional_result, create_session
+from .rate_limit import provider_limiter
 
 load_dotenv()
 
+# Quota name shared by the sync and async clients in this process
+PROVIDER = "racing_api"
+
 class Race(BaseModel):
     race_id: str
     race_time: str
@@ -21,33 +28,40 @@ class RacingAPI:
             os.getenv("RACING_API_USERNAME"),
             os.getenv("RACING_API_PASSWORD")
         )
+        self.session = create_session()
+        self.rate_limiter = provider_limiter(PROVIDER, CALLS, PERIOD)
         
     def get_race_cards(self, date: datetime.date) -> List[Race]:
         """Get race cards for a specific date."""
         try:
-            # Format date for API
-            date_str = date.strftime("%Y-%m-%d")
-            
-            # Make API request
-            url = f"{self.base_url}/racecards/{date_str}"
-            response = requests.get(url, auth=self.auth)
-            
-            # Check response
-            response.raise_for_status()
-            data = response.json()
-            
-            # Parse and return races
-            return [Race(**race) for race in data.get("races", [])]
-            
+            return [Race(**race) for race in self.fetch_race_cards(date).data]
         except requests.exceptions.RequestException as e:
             print(f"Error getting race cards: {str(e)}")
             return []
 
+    def fetch_race_cards(self, date: datetime.date, validators: Optional[Validators] = None) -> FetchResult:
+        """Conditional GET of a day's race cards as dicts; `data` is None if unchanged since `validators`."""
+        url = f"{self.base_url}/racecards/{date.strftime('%Y-%m-%d')}"
+        self.rate_limiter.acquire_sync()
+        response = self.session.get(url, auth=self.auth, headers=validators.headers() if validators else None)
+        return conditional_result(
+            response, validators, lambda data: [Race(**race).model_dump() for race in data.get("races", [])]
+        )
+
+    def fetch_results(self, date: datetime.date) -> List[Dict]:
+        """A day's results: one dict per race with its runners' finishing positions."""
+        url = f"{self.base_url}/results/{date.strftime('%Y-%m-%d')}"
+        self.rate_limiter.acquire_sync()
+        response = self.session.get(url, auth=self.auth)
+        response.raise_for_status()
+        return response.json().get("results", [])
+
     def get_race_details(self, race_id: str) -> Optional[Dict]:
         """Get detailed information about a specific race."""
         try:
             url = f"{self.base_url}/races/{race_id}"
-            response = requests.get(url, auth=self.auth)
+            self.rate_limiter.acquire_sync()
+            response = self.session.get(url, auth=self.auth)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -58,9 +72,40 @@ class RacingAPI:
         """Get form history for a specific horse."""
         try:
             url = f"{self.base_url}/horses/{horse_id}/form"
-            response = requests.get(url, auth=self.auth)
+            self.rate_limiter.acquire_sync()
+            response = self.session.get(url, auth=self.auth)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             print(f"Error getting horse form: {str(e)}")
             return None
+
+
+class AsyncRacingAPI(AsyncAPIClient):
+    """Async RacingAPI client sharing one connection pool; see AsyncAPIClient."""
+
+    def __init__(self, base_url: Optional[str] = None, **kwargs):
+        username = os.getenv("RACING_API_USERNAME")
+        super().__init__(
+            base_url=base_url or os.getenv("RACING_API_BASE_URL", ""),
+            auth=(username, os.getenv("RACING_API_PASSWORD", "")) if username else None,
+            provider=PROVIDER,
+            **kwargs,
+        )
+
+    async def get_race_cards(self, date: datetime.date) -> List[Race]:
+        """Get race cards for a specific date."""
+        try:
+            data = await self.get_json(f"/racecards/{date.strftime('%Y-%m-%d')}")
+            return [Race(**race) for race in data.get("races", [])]
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            print(f"Error getting race cards: {str(e)}")
+            return []
+
+    async def get_race_details(self, race_id: str) -> Optional[Dict]:
+        """Get detailed information about a specific race."""
+        try:
+            return await self.get_json(f"/races/{race_id}")
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            print(f"Error getting race details: {str(e)}")
+            return None
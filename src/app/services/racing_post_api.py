@@ -1,20 +1,21 @@
+import json
+import httpx
 import requests
 from datetime import datetime
 from typing import List, Dict, Optional
 import os
 from dotenv import load_dotenv
-from ratelimit import limits, sleep_and_retry
 import backoff
+from .http_client import CALLS, PERIOD, AsyncAPIClient, FetchResult, Validators, conditional_result, create_session
+from .rate_limit import provider_limiter
 
 load_dotenv()
 
 # Racing Post API configuration
 RACING_POST_API_BASE = "https://api.racingpost.com"
 RACING_POST_API_KEY = os.getenv("RACING_POST_API_KEY")
-
-# Rate limiting: 100 requests per minute
-CALLS = 100
-PERIOD = 60
+# Quota name shared by the sync and async clients in this process
+PROVIDER = "racing_post"
 
 class RacingPostAPI:
     def __init__(self):
@@ -23,39 +24,50 @@ class RacingPostAPI:
             "X-API-Key": RACING_POST_API_KEY,
             "Content-Type": "application/json"
         }
-        
-    @sleep_and_retry
-    @limits(calls=CALLS, period=PERIOD)
-    @backoff.on_exception(backoff.expo,
-                         (requests.exceptions.RequestException),
-                         max_tries=3)
+        self.session = create_session()
+        self.rate_limiter = provider_limiter(PROVIDER, CALLS, PERIOD)
+
+    def _get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None) -> requests.Response:
+        """Rate-limited GET; every request, retries included, counts against the quota."""
+        self.rate_limiter.acquire_sync()
+        return self.session.get(url, headers={**self.headers, **(headers or {})}, params=params)
+
     def get_race_cards(self, date: datetime.date) -> List[Dict]:
         """Get race cards for a specific date."""
         try:
-            url = f"{self.base_url}/racecards"
-            params = {
-                "date": date.isoformat(),
-                "include_horses": "true"
-            }
-            
-            response = requests.get(
-                url,
-                headers=self.headers,
-                params=params
-            )
-            
-            response.raise_for_status()
-            return response.json()
-            
+            return self.fetch_race_cards(date).data
         except requests.exceptions.RequestException as e:
             print(f"Error getting race cards: {str(e)}")
             raise
 
+    @backoff.on_exception(backoff.expo,
+                         (requests.exceptions.RequestException),
+                         max_tries=3)
+    def fetch_race_cards(self, date: datetime.date, validators: Optional[Validators] = None) -> FetchResult:
+        """Conditional GET of a day's race cards; `data` is None if unchanged since `validators`."""
+        url = f"{self.base_url}/racecards"
+        params = {
+            "date": date.isoformat(),
+            "include_horses": "true"
+        }
+        response = self._get(url, params=params, headers=validators.headers() if validators else None)
+        return conditional_result(response, validators)
+
+    @backoff.on_exception(backoff.expo,
+                         (requests.exceptions.RequestException),
+                         max_tries=3)
+    def fetch_results(self, date: datetime.date) -> List[Dict]:
+        """A day's results: one dict per race with its runners' finishing positions."""
+        response = self._get(f"{self.base_url}/results", params={"date": date.isoformat()})
+        response.raise_for_status()
+        data = response.json()
+        return data.get("results", []) if isinstance(data, dict) else data
+
     def get_race_details(self, race_id: str) -> Optional[Dict]:
         """Get detailed information about a specific race."""
         try:
             url = f"{self.base_url}/races/{race_id}"
-            response = requests.get(url, headers=self.headers)
+            response = self._get(url)
             response.raise_for_status()
             return response.json()
             
@@ -67,10 +79,38 @@ class RacingPostAPI:
         """Get form history for a specific horse."""
         try:
             url = f"{self.base_url}/horses/{horse_id}/form"
-            response = requests.get(url, headers=self.headers)
+            response = self._get(url)
             response.raise_for_status()
             return response.json()
             
         except requests.exceptions.RequestException as e:
             print(f"Error getting horse form: {str(e)}")
             return None
+
+
+class AsyncRacingPostAPI(AsyncAPIClient):
+    """Async Racing Post client; fans out within the same 100 calls/minute quota."""
+
+    def __init__(self, base_url: Optional[str] = None, **kwargs):
+        super().__init__(
+            base_url=base_url or RACING_POST_API_BASE,
+            headers={"X-API-Key": RACING_POST_API_KEY or "", "Content-Type": "application/json"},
+            provider=PROVIDER,
+            **kwargs,
+        )
+
+    async def get_race_cards(self, date: datetime.date) -> List[Dict]:
+        """Get race cards for a specific date."""
+        try:
+            return await self.get_json("/racecards", params={"date": date.isoformat(), "include_horses": "true"})
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            print(f"Error getting race cards: {str(e)}")
+            raise
+
+    async def get_race_details(self, race_id: str) -> Optional[Dict]:
+        """Get detailed information about a specific race."""
+        try:
+            return await self.get_json(f"/races/{race_id}")
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            print(f"Error getting race details: {str(e)}")
+            return None
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class AsyncTokenBucket:
+    """Token-bucket rate limiter for asyncio code.
+
+    Holds up to `capacity` tokens and refills at `rate_per_minute`; each
+    `acquire()` takes one token, sleeping until one is available.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[int] = None):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1, int(rate_per_minute))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+                self._refill()
+            self._tokens -= 1
+
+
+class SlidingWindowLimiter:
+    """At most `calls` acquisitions in any rolling `period` seconds.
+
+    Stricter than a token bucket for provider quotas such as "100 calls per
+    60s": a full burst is never followed by an immediate refill. Each caller
+    reserves the next free slot under a thread lock and then sleeps until it,
+    so one instance can be shared by sync clients, threads and event loops.
+    """
+
+    def __init__(self, calls: int, period: float):
+        if calls <= 0 or period <= 0:
+            raise ValueError("calls and period must be positive")
+        self.calls = calls
+        self.period = period
+        self._slots: "deque[float]" = deque()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Book the next free slot; returns how many seconds to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            while self._slots and self._slots[0] <= now - self.period:
+                self._slots.popleft()
+            slot = max(now, self._slots[-1]) if self._slots else now
+            if len(self._slots) >= self.calls:
+                slot = max(slot, self._slots[-self.calls] + self.period)
+            self._slots.append(slot)
+            return slot - now
+
+    async def acquire(self):
+        await asyncio.sleep(self.reserve())
+
+    def acquire_sync(self):
+        time.sleep(self.reserve())
+
+
+_PROVIDER_LIMITERS: Dict[str, SlidingWindowLimiter] = {}
+_PROVIDER_LIMITERS_LOCK = threading.Lock()
+
+
+def provider_limiter(provider: str, calls: int, period: float) -> SlidingWindowLimiter:
+    """The process-wide limiter for `provider`'s quota, shared by all of its clients.
+
+    The first caller's `calls`/`period` define the quota.
+    """
+    with _PROVIDER_LIMITERS_LOCK:
+        limiter = _PROVIDER_LIMITERS.get(provider)
+        if limiter is None:
+            limiter = _PROVIDER_LIMITERS[provider] = SlidingWindowLimiter(calls, period)
+        return limiter
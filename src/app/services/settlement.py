@@ -0,0 +1,382 @@
+import hashlib
+import json
+import os
+import re
+from datetime import date as date_type, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import case, func, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..models import Bankroll, Bet, Horse, Race
+from ..schemas import ResultsSettlement
+from .bulk_ingest import as_race_datetime
+from .push import PushHub
+from .race_card_refresh import card_key
+
+# Bet types settled here, by the codes the payout arrays use
+BET_TYPES = ("WIN", "PLACE", "EACH_WAY")
+WIN, PLACE, EACH_WAY = range(len(BET_TYPES))
+LOST, WON, VOID = "LOST", "WON", "VOID"
+PENDING = "PENDING"
+
+# Feed positions meaning the runner didn't take part
+NON_RUNNERS = {"NR", "NON-RUNNER", "NON RUNNER", "WITHDRAWN"}
+
+ADVISORY_LOCK_KEY = int(hashlib.sha1(b"bet-settlement").hexdigest()[:15], 16)
+
+
+def parse_position(value: Any) -> Tuple[Optional[int], bool]:
+    """(finishing position, non-runner) from a feed's position: 1, "2", "3=" (dead heat), "PU", "NR", ..."""
+    if value is None or isinstance(value, bool):
+        return None, False
+    if isinstance(value, (int, float)):
+        return (int(value) if value > 0 else None), False
+    text = str(value).strip().upper()
+    if text in NON_RUNNERS:
+        return None, True
+    match = re.match(r"\d+", text)
+    return (int(match.group()) if match and int(match.group()) > 0 else None), False
+
+
+def normalise_results(results: Any) -> Dict[str, Dict]:
+    """A source's results as {"track|off_time": {track, off_time, positions: {name: position}, non_runners: [names]}}.
+
+    Takes `race_track`/`race_time`/`horses` and `track`/`off_time`/`runners`
+    races like the race card sources, bare or under "results"/"races". A
+    runner's position is `position` or `finish_position`; unplaced runners
+    (pulled up, fell, ...) get None, and `"NR"` or `non_runner: true` marks
+    a non-runner.
+    """
+    if isinstance(results, dict):
+        results = results.get("results") or results.get("races") or []
+    normalised = {}
+    for race in results:
+        track = race.get("race_track") or race.get("track") or race.get("course")
+        off_time = race.get("race_time") or race.get("off_time")
+        positions, non_runners = {}, []
+        for runner in race.get("runners") or race.get("horses") or []:
+            position, non_runner = parse_position(runner.get("position", runner.get("finish_position")))
+            if non_runner or runner.get("non_runner"):
+                non_runners.append(runner["name"])
+            else:
+                positions[runner["name"]] = position
+        normalised[card_key(track, off_time)] = {
+            "track": track, "off_time": off_time, "positions": positions, "non_runners": non_runners,
+        }
+    return normalised
+
+
+def place_terms(runners: int, handicap: bool = False) -> Tuple[int, float]:
+    """(places paid, fraction of the win odds) for PLACE bets and each-way place parts, by field size.
+
+    UK terms: no place betting under five runners, two places at 1/4 for five
+    to seven, three at 1/5 for eight or more; handicaps pay three at 1/4 with
+    twelve to fifteen runners and four at 1/4 with sixteen or more.
+    """
+    if runners < 5:
+        return 0, 0.0
+    if runners < 8:
+        return 2, 0.25
+    if handicap and runners >= 16:
+        return 4, 0.25
+    if handicap and runners >= 12:
+        return 3, 0.25
+    return 3, 0.2
+
+
+def paid_shares(positions: np.ndarray, places: int) -> np.ndarray:
+    """Share of a stake paid on each runner when `places` places pay, NaN positions being unplaced.
+
+    Dead heats split the places they share: two horses dead-heating for the
+    last paid place are each paid half.
+    """
+    shares = np.zeros(len(positions))
+    finished = ~np.isnan(positions)
+    for position in np.unique(positions[finished & (positions <= places)]):
+        tied = positions == position
+        shares[tied] = min(tied.sum(), places - position + 1) / tied.sum()
+    return shares
+
+
+def payout_coefficients(
+    bet_type: np.ndarray,
+    win_share: np.ndarray,
+    place_share: np.ndarray,
+    fraction: np.ndarray,
+    void: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(a, b) for every bet at once, its return being stake * (a * odds + b).
+
+    A WIN bet returns stake * odds on the winner. A PLACE bet returns
+    stake * (1 + (odds - 1) * fraction) on a placed horse. An EACH_WAY
+    stake is the whole outlay, half on each part. Void bets return the
+    stake (a=0, b=1) and dead heats scale each part by its share.
+    """
+    place_a = place_share * fraction
+    place_b = place_share * (1.0 - fraction)
+    a = np.select([bet_type == WIN, bet_type == PLACE, bet_type == EACH_WAY],
+                  [win_share, place_a, (win_share + place_a) / 2.0], 0.0)
+    b = np.select([bet_type == PLACE, bet_type == EACH_WAY], [place_b, place_b / 2.0], 0.0)
+    return np.where(void, 0.0, a), np.where(void, 1.0, b)
+
+
+def by_runner(runner_ids: List[int], values: List[List[Any]], else_: Any):
+    """CASE picking values[bet type code][runner] for a bet; `else_` for other runners."""
+    if not runner_ids:
+        return literal(else_)
+    return case(*(
+        (Bet.bet_type == name, case(dict(zip(runner_ids, values[code])), value=Bet.horse_id, else_=else_))
+        for code, name in enumerate(BET_TYPES)
+    ), else_=else_)
+
+
+class FixtureResults:
+    """Results from local JSON files, <directory>/<YYYY-MM-DD>.json, shaped like a results feed."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def fetch_results(self, date: date_type) -> List[Dict]:
+        path = self.directory / f"{date.isoformat()}.json"
+        if not path.exists():
+            return []
+        data = json.loads(path.read_text())
+        return data.get("results", []) if isinstance(data, dict) else data
+
+
+class SettlementService:
+    """Records a day's race results and settles its pending bets against them.
+
+    Results come from a source's fetch_results(date): the racing API clients
+    or, with RESULTS_FIXTURE_DIR, local JSON files. Finishing positions go on
+    `horses`, non-runners are marked scratched and the race's `result_at` is
+    set. Every pending WIN, PLACE and EACH_WAY bet on a resulted race is then
+    settled in the same transaction: payouts are computed for all of them
+    at once with numpy, each race's bets are written by one UPDATE whose
+    CASEs carry the per-runner payout coefficients, and the latest bankroll
+    row, locked first, takes the day's profit with its peak and max_drawdown
+    updated along the way, race by race in off-time order. Bets on runners
+    not on the race's card are void.
+    """
+
+    def __init__(self, session_factory, sources: Dict[str, Any], push: Optional[PushHub] = None):
+        self.session_factory = session_factory
+        self.sources = sources
+        self.push = push
+        self.default_source = os.getenv("RESULTS_SOURCE", "racing_post_api")
+
+    def run(self, date: str, source: Optional[str] = None, pipeline: bool = False) -> Dict:
+        """Fetch a day's results from `source` and settle; the pipeline's settle stage."""
+        source = source or self.default_source
+        if source not in self.sources:
+            raise ValueError(f"Unknown results source: {source}")
+        race_date = date_type.fromisoformat(date)
+        results = self.sources[source].fetch_results(race_date)
+        if not results:
+            # Results not in yet, or a failed fetch; raising gets it retried
+            raise RuntimeError(f"No results for {date} from {source}")
+        db = self.session_factory()
+        try:
+            return self.settle(db, race_date, results).model_dump()
+        finally:
+            db.close()
+
+    def settle(self, db: Session, race_date: date_type, results: Any = None) -> ResultsSettlement:
+        """Record `results` (a source's raw results) if given, then settle the day's resulted races."""
+        # Two settlements of one day would each pay out the same pending bets
+        if db.get_bind().dialect.name == "postgresql" and not db.scalar(
+            select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_KEY))
+        ):
+            return ResultsSettlement(status="skipped")
+
+        day = as_race_datetime(race_date)
+        now = datetime.utcnow()
+        report = ResultsSettlement(status="settled")
+        normalised, recorded = {}, {}
+        if results is not None:
+            normalised = normalise_results(results)
+            recorded = self._record(db, day, normalised, now)
+            report.races_resulted = sum(race_id is not None for race_id in recorded.values())
+            report.unmatched = sorted(key for key, race_id in recorded.items() if race_id is None)
+
+        # Locked until commit; populate_existing so a row this session already holds is re-read under the lock
+        bankroll = db.scalar(
+            select(Bankroll).order_by(Bankroll.id.desc()).limit(1).with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        races = db.execute(
+            select(Race.id, Race.race_type)
+            .where(Race.race_date >= day, Race.race_date < day + timedelta(days=1), Race.result_at.is_not(None))
+            .order_by(Race.race_date, Race.off_time, Race.id)
+        ).all()
+        if races:
+            self._settle_races(db, day, races, bankroll, report, now)
+        if bankroll is not None and bankroll.current_amount is not None:
+            report.bankroll, report.max_drawdown = round(bankroll.current_amount, 2), bankroll.max_drawdown
+        db.commit()
+
+        if self.push is not None:
+            for key, race_id in recorded.items():
+                if race_id is not None:
+                    race = normalised[key]
+                    self.push.publish("result", race_id, day, race["track"], off_time=race["off_time"],
+                                      positions=race["positions"], non_runners=race["non_runners"])
+        return report
+
+    def _record(self, db: Session, day: datetime, results: Dict[str, Dict], now: datetime) -> Dict[str, Optional[int]]:
+        """Write positions and non-runners for every result matching a race; returns race ids by result key."""
+        race_ids = {
+            card_key(track, off_time): race_id
+            for race_id, track, off_time in db.execute(
+                select(Race.id, Race.track, Race.off_time)
+                .where(Race.race_date >= day, Race.race_date < day + timedelta(days=1))
+            )
+        }
+        recorded = {}
+        for key, race in results.items():
+            race_id = recorded[key] = race_ids.get(key)
+            if race_id is None:
+                continue
+            placed = {name: position for name, position in race["positions"].items() if position is not None}
+            db.execute(
+                update(Horse)
+                .where(Horse.race_date >= day, Horse.race_date < day + timedelta(days=1), Horse.race_id == race_id)
+                .values(
+                    finish_position=case(placed, value=Horse.name, else_=None) if placed else None,
+                    scratched_at=case(
+                        (Horse.name.in_(race["non_runners"]), func.coalesce(Horse.scratched_at, now)),
+                        else_=Horse.scratched_at,
+                    ),
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+        matched = [race_id for race_id in recorded.values() if race_id is not None]
+        if matched:
+            db.execute(
+                update(Race).where(Race.id.in_(matched)).values(result_at=now, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        return recorded
+
+    def _settle_races(self, db: Session, day: datetime, races: List, bankroll: Optional[Bankroll],
+                      report: ResultsSettlement, now: datetime):
+        race_ids = [race_id for race_id, _ in races]
+        race_index = {race_id: n for n, race_id in enumerate(race_ids)}
+
+        # Runners: the share of a stake each one's win and place parts pay, and its race's place fraction
+        runners = db.execute(
+            select(Horse.id, Horse.race_id, Horse.finish_position, Horse.scratched_at.is_not(None))
+            .where(Horse.race_date >= day, Horse.race_date < day + timedelta(days=1), Horse.race_id.in_(race_ids))
+            .order_by(Horse.race_id, Horse.id)
+        ).all()
+        horse_ids = np.array([row[0] for row in runners], dtype=np.int64)
+        horse_race = np.array([race_index[row[1]] for row in runners], dtype=np.int64)
+        position = np.array([np.nan if row[2] is None else row[2] for row in runners], dtype=np.float64)
+        scratched = np.array([bool(row[3]) for row in runners], dtype=bool)
+        position[scratched] = np.nan
+        win_share = np.zeros(len(runners))
+        place_share = np.zeros(len(runners))
+        fraction = np.zeros(len(runners))
+        for n, (_, race_type) in enumerate(races):
+            in_race = horse_race == n
+            places, race_fraction = place_terms(int((in_race & ~scratched).sum()), "handicap" in (race_type or "").lower())
+            win_share[in_race] = paid_shares(position[in_race], 1)
+            place_share[in_race] = paid_shares(position[in_race], places)
+            fraction[in_race] = race_fraction
+
+        # Straight into one float array: a Core result skips the ORM's row handling, which dominates at 100k bets
+        rows = db.connection().execute(
+            select(
+                Bet.race_id,
+                func.coalesce(Bet.horse_id, -1),
+                case(*((Bet.bet_type == name, code) for code, name in enumerate(BET_TYPES))),
+                func.coalesce(Bet.stake, 0.0),
+                func.coalesce(Bet.odds, 1.0),
+            ).where(
+                Bet.race_id.in_(race_ids),
+                or_(Bet.result.is_(None), Bet.result == PENDING),
+                Bet.bet_type.in_(BET_TYPES),
+            )
+        ).all()
+        if not rows:
+            return
+        # By column: numpy probes Row objects for array interfaces one lookup at a time
+        bets = np.array(list(zip(*rows)), dtype=np.float64)
+        race_order = np.argsort(race_ids)
+        bet_race = race_order[np.searchsorted(np.asarray(race_ids), bets[0].astype(np.int64), sorter=race_order)]
+        bet_horse, bet_type = bets[1].astype(np.int64), bets[2].astype(np.int64)
+        stake, odds = bets[3], bets[4]
+
+        # Each bet's runner; one not on its race's card is void
+        if len(horse_ids):
+            order = np.argsort(horse_ids)
+            slot = order[np.minimum(np.searchsorted(horse_ids, bet_horse, sorter=order), len(order) - 1)]
+            void = (horse_ids[slot] != bet_horse) | (horse_race[slot] != bet_race) | scratched[slot]
+            a, b = payout_coefficients(bet_type, win_share[slot], place_share[slot], fraction[slot], void)
+        else:
+            void = np.ones(len(rows), dtype=bool)
+            a, b = np.zeros(len(rows)), np.ones(len(rows))
+        returns = stake * (a * odds + b)
+        won = ~void & (a + b > 0)
+
+        # One UPDATE per race, settling its bets with the same coefficients per (runner, bet type)
+        expected = np.bincount(bet_race, minlength=len(races))
+        for n, race_id in enumerate(race_ids):
+            if not expected[n]:
+                continue
+            in_race = np.flatnonzero(horse_race == n)
+            a_by_type, b_by_type, outcome_by_type = [], [], []
+            for code in range(len(BET_TYPES)):
+                race_a, race_b = payout_coefficients(np.full(len(in_race), code), win_share[in_race],
+                                                     place_share[in_race], fraction[in_race], scratched[in_race])
+                a_by_type.append(race_a.tolist())
+                b_by_type.append(race_b.tolist())
+                outcome_by_type.append(np.where(scratched[in_race], VOID, np.where(race_a + race_b > 0, WON, LOST)).tolist())
+            runner_ids = horse_ids[in_race].tolist()
+            settled = db.execute(
+                update(Bet)
+                .where(
+                    Bet.race_id == race_id,
+                    or_(Bet.result.is_(None), Bet.result == PENDING),
+                    Bet.bet_type.in_(BET_TYPES),
+                )
+                .values(
+                    result=by_runner(runner_ids, outcome_by_type, VOID),
+                    profit=Bet.stake * (
+                        by_runner(runner_ids, a_by_type, 0.0) * func.coalesce(Bet.odds, 1.0)
+                        + by_runner(runner_ids, b_by_type, 1.0)
+                    ) - Bet.stake,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if settled != expected[n]:
+                db.rollback()
+                raise RuntimeError(f"Pending bets on race {race_id} changed while settling: {settled} != {expected[n]}")
+
+        profit = returns - stake
+        race_profit = np.bincount(bet_race, weights=profit, minlength=len(races))
+        report.races_settled = int((expected > 0).sum())
+        report.bets_settled = len(rows)
+        report.won, report.void = int(won.sum()), int(void.sum())
+        report.lost = report.bets_settled - report.won - report.void
+        report.staked = round(float(stake.sum()), 2)
+        report.returns = round(float(returns.sum()), 2)
+        report.profit = round(float(profit.sum()), 2)
+
+        if bankroll is not None:
+            # The bankroll after each race in off-time order, for the peak and the deepest fall from it
+            start = bankroll.current_amount or 0.0
+            balances = start + np.concatenate(([0.0], np.cumsum(race_profit)))
+            peak = max(bankroll.peak_amount or 0.0, bankroll.initial_amount or 0.0, start)
+            peaks = np.maximum.accumulate(np.concatenate(([peak], balances[1:])))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                drawdowns = np.where(peaks > 0, (peaks - balances) / peaks * 100.0, 0.0)
+            bankroll.current_amount = float(balances[-1])
+            bankroll.peak_amount = float(peaks[-1])
+            bankroll.max_drawdown = max(bankroll.max_drawdown or 0.0, round(float(drawdowns.max()), 4))
+            bankroll.updated_at = now
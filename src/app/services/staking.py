@@ -0,0 +1,224 @@
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session, selectinload
+
+from ..models import Bankroll, Bet, Race, RiskParameter
+from .bulk_ingest import as_race_datetime
+
+# Bankroll assumed while no `bankroll` row exists
+DEFAULT_BANKROLL = 1000.0
+DEFAULT_KELLY_FRACTION = 0.25
+
+# Why a candidate's stake is below its fractional Kelly stake, as bit flags
+NO_EDGE = 1
+BELOW_CONFIDENCE = 2
+MAX_STAKE = 4
+CORRELATION = 8
+TURNOVER_LIMIT = 16
+STOP_LOSS = 32
+LIMIT_NAMES = {
+    NO_EDGE: "no_edge",
+    BELOW_CONFIDENCE: "below_confidence",
+    MAX_STAKE: "max_stake",
+    CORRELATION: "correlation",
+    TURNOVER_LIMIT: "turnover_limit",
+    STOP_LOSS: "stop_loss",
+}
+
+
+def limit_names(flags: int) -> List[str]:
+    return [name for flag, name in LIMIT_NAMES.items() if flags & flag]
+
+
+@dataclass
+class RiskLimits:
+    """Staking limits, all in percent: `RiskParameter` columns with the PRD defaults.
+
+    confidence_threshold  - minimum win probability to bet at all
+    max_stake_percentage  - most of the bankroll on any one bet
+    correlation_threshold - most of the bankroll on one race; its runners share one outcome
+    stop_loss_daily/weekly - stop betting once this much of the bankroll is lost today / this week
+    """
+    confidence_threshold: float = 30.0
+    max_stake_percentage: float = 5.0
+    correlation_threshold: float = 10.0
+    stop_loss_daily: Optional[float] = None
+    stop_loss_weekly: Optional[float] = None
+
+    @classmethod
+    def from_model(cls, row: Optional[RiskParameter]) -> "RiskLimits":
+        limits = cls()
+        if row is not None:
+            for field in ("confidence_threshold", "max_stake_percentage", "correlation_threshold",
+                          "stop_loss_daily", "stop_loss_weekly"):
+                if getattr(row, field) is not None:
+                    setattr(limits, field, getattr(row, field))
+        return limits
+
+
+def kelly_fractions(probability: np.ndarray, odds: np.ndarray) -> np.ndarray:
+    """Full Kelly fraction (p*odds - 1)/(odds - 1) for decimal odds, 0 without an edge or valid inputs."""
+    valid = (odds > 1.0) & (probability > 0.0) & (probability < 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kelly = (probability * odds - 1.0) / (odds - 1.0)
+    return np.where(valid, np.clip(kelly, 0.0, None), 0.0)
+
+
+def stake_plan(
+    probability: Sequence[float],
+    odds: Sequence[float],
+    group: Sequence[int],
+    bankroll: float,
+    limits: RiskLimits,
+    kelly_fraction: float = DEFAULT_KELLY_FRACTION,
+    turnover_budget: float = np.inf,
+    loss_budget: float = np.inf,
+) -> Dict[str, np.ndarray]:
+    """Size every candidate bet at once.
+
+    Each bet gets `kelly_fraction` of its Kelly stake, capped per bet, then
+    each `group` (race) is scaled down to the correlation cap, then the whole
+    plan is scaled to fit the remaining turnover and stop-loss budgets (the
+    most the plan could lose if every bet lost). Stakes are rounded down to
+    whole pence. Returns arrays aligned with the inputs, `limits` holding the
+    flags of every constraint that cut a stake.
+    """
+    probability = np.asarray(probability, dtype=np.float64)
+    odds = np.asarray(odds, dtype=np.float64)
+    flags = np.zeros(probability.shape, dtype=np.int64)
+
+    kelly = kelly_fractions(probability, odds)
+    flags[kelly <= 0.0] |= NO_EDGE
+    below = probability * 100.0 < limits.confidence_threshold
+    flags[below & (kelly > 0.0)] |= BELOW_CONFIDENCE
+    fraction = np.where(below, 0.0, kelly * kelly_fraction)
+
+    max_stake = limits.max_stake_percentage / 100.0
+    flags[fraction > max_stake] |= MAX_STAKE
+    fraction = np.minimum(fraction, max_stake)
+
+    _, group_index = np.unique(np.asarray(group), return_inverse=True)
+    group_totals = np.bincount(group_index, weights=fraction)
+    group_cap = limits.correlation_threshold / 100.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(group_totals > group_cap, group_cap / group_totals, 1.0)[group_index]
+    flags[(scale < 1.0) & (fraction > 0.0)] |= CORRELATION
+    stakes = fraction * scale * bankroll
+
+    total = stakes.sum()
+    budget = max(min(turnover_budget, loss_budget), 0.0)
+    if total > budget:
+        flags[stakes > 0.0] |= STOP_LOSS if loss_budget <= turnover_budget else TURNOVER_LIMIT
+        stakes *= budget / total
+    stakes = np.floor(stakes * 100.0 + 1e-9) / 100.0
+
+    return {
+        "kelly": kelly,
+        "stake": stakes,
+        "expected_profit": stakes * (probability * odds - 1.0),
+        "limits": flags,
+    }
+
+
+def current_bankroll(db: Session) -> float:
+    """The latest bankroll's current amount, or DEFAULT_BANKROLL before one is set up."""
+    amount = db.scalar(select(Bankroll.current_amount).order_by(Bankroll.id.desc()).limit(1))
+    return amount if amount is not None else float(os.getenv("DEFAULT_BANKROLL", DEFAULT_BANKROLL))
+
+
+class StakingService:
+    """Builds staking plans for whole race cards from the stored risk settings.
+
+    Limits come from the latest `risk_parameters` row, the bankroll and its
+    daily/weekly turnover limits from the latest `bankroll` row, and what was
+    already staked and lost today and this week from `bets`.
+    """
+
+    def __init__(self, kelly_fraction: Optional[float] = None):
+        self.kelly_fraction = kelly_fraction or float(os.getenv("STAKING_KELLY_FRACTION", DEFAULT_KELLY_FRACTION))
+
+    @staticmethod
+    def exposure(db: Session, now: datetime) -> Dict[str, float]:
+        """Stake and settled P&L of bets placed today and since Monday, in one query."""
+        day_start = datetime.combine(now.date(), time.min)
+        week_start = day_start - timedelta(days=now.weekday())
+        today = Bet.placed_at >= day_start
+        row = db.execute(
+            select(
+                func.coalesce(func.sum(case((today, Bet.stake))), 0.0),
+                func.coalesce(func.sum(Bet.stake), 0.0),
+                func.coalesce(func.sum(case((today, Bet.profit))), 0.0),
+                func.coalesce(func.sum(Bet.profit), 0.0),
+            ).where(Bet.placed_at >= week_start, Bet.placed_at <= now)
+        ).one()
+        return dict(zip(("staked_today", "staked_week", "pnl_today", "pnl_week"), row))
+
+    @staticmethod
+    def candidates_for_date(db: Session, race_date: date) -> List[Dict]:
+        """One candidate per analysed race on `race_date`: the predicted winner at its current odds."""
+        day_start = as_race_datetime(race_date)
+        races = db.scalars(
+            select(Race)
+            .options(selectinload(Race.horses), selectinload(Race.analysis))
+            .where(Race.race_date >= day_start, Race.race_date < day_start + timedelta(days=1))
+        ).all()
+        candidates = []
+        for race in races:
+            if race.analysis is None or race.analysis.confidence_score is None:
+                continue
+            for horse in race.horses:
+                if horse.name == race.analysis.winner_prediction and horse.odds:
+                    candidates.append({
+                        "race_id": race.id, "horse_id": horse.id, "odds": horse.odds,
+                        "probability": race.analysis.confidence_score / 100.0,
+                    })
+        return candidates
+
+    def plan(self, db: Session, candidates: List[Dict], now: Optional[datetime] = None,
+             kelly_fraction: Optional[float] = None) -> Dict:
+        now = now or datetime.utcnow()
+        kelly_fraction = kelly_fraction or self.kelly_fraction
+        limits = RiskLimits.from_model(db.scalar(select(RiskParameter).order_by(RiskParameter.id.desc()).limit(1)))
+        bankroll_row = db.scalar(select(Bankroll).order_by(Bankroll.id.desc()).limit(1))
+        bankroll = current_bankroll(db)
+        exposure = self.exposure(db, now)
+
+        turnover_budget = np.inf
+        if bankroll_row is not None and bankroll_row.daily_limit is not None:
+            turnover_budget = min(turnover_budget, bankroll_row.daily_limit - exposure["staked_today"])
+        if bankroll_row is not None and bankroll_row.weekly_limit is not None:
+            turnover_budget = min(turnover_budget, bankroll_row.weekly_limit - exposure["staked_week"])
+        # A stop-loss budget is what may still be lost: the limit plus today's (or this week's) P&L
+        loss_budget = np.inf
+        if limits.stop_loss_daily is not None:
+            loss_budget = min(loss_budget, limits.stop_loss_daily / 100.0 * bankroll + exposure["pnl_today"])
+        if limits.stop_loss_weekly is not None:
+            loss_budget = min(loss_budget, limits.stop_loss_weekly / 100.0 * bankroll + exposure["pnl_week"])
+
+        result = stake_plan(
+            [candidate["probability"] for candidate in candidates],
+            [candidate["odds"] for candidate in candidates],
+            [candidate["race_id"] for candidate in candidates],
+            bankroll, limits, kelly_fraction, turnover_budget, loss_budget,
+        )
+        bets = [
+            {**candidate, "kelly": float(kelly), "stake": float(stake),
+             "expected_profit": round(float(profit), 2), "limits": limit_names(int(flags))}
+            for candidate, kelly, stake, profit, flags in zip(
+                candidates, result["kelly"], result["stake"], result["expected_profit"], result["limits"]
+            )
+        ]
+        return {
+            "bankroll": bankroll,
+            "kelly_fraction": kelly_fraction,
+            "total_stake": round(float(result["stake"].sum()), 2),
+            "expected_profit": round(float(result["expected_profit"].sum()), 2),
+            "halted": loss_budget <= 0.0,
+            "exposure": exposure,
+            "bets": bets,
+        }
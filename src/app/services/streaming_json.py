@@ -0,0 +1,140 @@
+import json
+from typing import Any, Dict, Optional
+
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONParser:
+    """Parse a streamed JSON object field by field as its text arrives.
+
+    `feed()` takes the next chunk (e.g. an `input_json_delta.partial_json`)
+    and returns the top-level fields whose values completed in that chunk,
+    so `winner` and `confidence` are usable while `reasoning` is still being
+    generated. Nested values are returned whole once they close.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"  # start, key, colon, value, comma
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        # value scanning state, kept between chunks
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        self._buffer += chunk
+        completed: Dict[str, Any] = {}
+        while self._pos < len(self._buffer) and not self.complete:
+            if not self._step(completed):
+                break
+        return completed
+
+    def _step(self, completed: Dict[str, Any]) -> bool:
+        """Advance one token; returns False when more input is needed."""
+        char = self._buffer[self._pos]
+        if self._state != "value" and char in _WHITESPACE:
+            self._pos += 1
+            return True
+
+        if self._state == "start":
+            if char != "{":
+                raise ValueError(f"Expected '{{' at offset {self._pos}, got {char!r}")
+            self._pos += 1
+            self._state = "key"
+        elif self._state == "key":
+            if char == "}":
+                self._pos += 1
+                self.complete = True
+                return True
+            end = self._string_end(self._pos)
+            if end is None:
+                return False
+            self._key = json.loads(self._buffer[self._pos:end])
+            self._pos = end
+            self._state = "colon"
+        elif self._state == "colon":
+            if char != ":":
+                raise ValueError(f"Expected ':' at offset {self._pos}, got {char!r}")
+            self._pos += 1
+            self._state = "value"
+            self._value_start = None
+        elif self._state == "value":
+            return self._scan_value(completed)
+        elif self._state == "comma":
+            self._pos += 1
+            if char == "}":
+                self.complete = True
+            elif char == ",":
+                self._state = "key"
+            else:
+                raise ValueError(f"Expected ',' or '}}' at offset {self._pos - 1}, got {char!r}")
+        return True
+
+    def _scan_value(self, completed: Dict[str, Any]) -> bool:
+        if self._value_start is None:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos == len(self._buffer):
+                return False
+            self._value_start = self._pos
+            self._depth = 0
+            self._in_string = False
+            self._escaped = False
+
+        first = self._buffer[self._value_start]
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 0:
+                        self._pos += 1
+                        return self._finish_value(completed, self._pos)
+            elif char == '"':
+                if self._pos > self._value_start and self._depth == 0:
+                    raise ValueError(f"Unexpected '\"' at offset {self._pos}")
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._pos += 1
+                    return self._finish_value(completed, self._pos)
+            elif self._depth == 0 and first not in "\"{[" and (char in ",}" or char in _WHITESPACE):
+                # Scalars (numbers, true/false/null) end at the next delimiter
+                return self._finish_value(completed, self._pos)
+            self._pos += 1
+        return False
+
+    def _finish_value(self, completed: Dict[str, Any], end: int) -> bool:
+        value = json.loads(self._buffer[self._value_start:end])
+        self.fields[self._key] = value
+        completed[self._key] = value
+        self._state = "comma"
+        self._value_start = None
+        return True
+
+    def _string_end(self, start: int) -> Optional[int]:
+        """Index just past the string starting at `start`, or None if it hasn't closed yet."""
+        if self._buffer[start] != '"':
+            raise ValueError(f"Expected '\"' at offset {start}, got {self._buffer[start]!r}")
+        escaped = False
+        for i in range(start + 1, len(self._buffer)):
+            char = self._buffer[i]
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                return i + 1
+        return None
@@ -0,0 +1,105 @@
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+# USD per million tokens (Claude 3.5 Sonnet, the default CLAUDE_MODEL). Cache writes cost
+# 1.25x input, cache reads 0.1x.
+INPUT_PRICE = 3.00
+CACHE_WRITE_PRICE = 3.75
+CACHE_READ_PRICE = 0.30
+OUTPUT_PRICE = 15.00
+
+
+class TokenUsage(BaseModel):
+    race_id: Optional[int] = None
+    source: str = "messages"
+    input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    output_tokens: int = 0
+    latency_ms: Optional[float] = None
+    recorded_at: datetime
+
+    @property
+    def prompt_tokens(self) -> int:
+        """Every prompt token sent, whether billed fresh, written to or read from the cache."""
+        return self.input_tokens + self.cache_creation_input_tokens + self.cache_read_input_tokens
+
+    @property
+    def cost_usd(self) -> float:
+        return (
+            self.input_tokens * INPUT_PRICE
+            + self.cache_creation_input_tokens * CACHE_WRITE_PRICE
+            + self.cache_read_input_tokens * CACHE_READ_PRICE
+            + self.output_tokens * OUTPUT_PRICE
+        ) / 1_000_000
+
+
+class TokenLedger:
+    """Per-race token accounting for Claude calls.
+
+    Keeps the last `max_records` calls in memory so a whole day's card can be
+    summarised: fresh input, cache writes, cache reads, output and latency.
+    """
+
+    def __init__(self, max_records: int = 5000):
+        self._records: "deque[TokenUsage]" = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        usage: Any,
+        race_id: Optional[int] = None,
+        latency_ms: Optional[float] = None,
+        source: str = "messages",
+    ) -> Optional[TokenUsage]:
+        """Record the `usage` block of an API reply; replies without one are skipped."""
+        if usage is None:
+            return None
+        entry = TokenUsage(
+            race_id=race_id,
+            source=source,
+            input_tokens=getattr(usage, "input_tokens", 0) or 0,
+            cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", 0) or 0,
+            output_tokens=getattr(usage, "output_tokens", 0) or 0,
+            latency_ms=latency_ms,
+            recorded_at=datetime.utcnow(),
+        )
+        with self._lock:
+            self._records.append(entry)
+        return entry
+
+    def records(self) -> List[TokenUsage]:
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def report(self) -> Dict[str, Any]:
+        """Totals plus one row per call, for the usage endpoint and report script."""
+        records = self.records()
+        totals = {
+            "calls": len(records),
+            "input_tokens": sum(r.input_tokens for r in records),
+            "cache_creation_input_tokens": sum(r.cache_creation_input_tokens for r in records),
+            "cache_read_input_tokens": sum(r.cache_read_input_tokens for r in records),
+            "output_tokens": sum(r.output_tokens for r in records),
+            "cost_usd": round(sum(r.cost_usd for r in records), 6),
+        }
+        prompt_tokens = sum(r.prompt_tokens for r in records)
+        latencies = [r.latency_ms for r in records if r.latency_ms is not None]
+        totals["cache_read_ratio"] = totals["cache_read_input_tokens"] / prompt_tokens if prompt_tokens else 0.0
+        totals["avg_latency_ms"] = sum(latencies) / len(latencies) if latencies else None
+        return {
+            "totals": totals,
+            "races": [
+                {**r.model_dump(), "prompt_tokens": r.prompt_tokens, "cost_usd": round(r.cost_usd, 6)}
+                for r in records
+            ],
+        }
@@ -0,0 +1,256 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+
+# Point the app at a throwaway SQLite database before anything imports src.app.database
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(tempfile.mkdtemp()) / 'test.db'}")
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    """Build the test schema the way deployments do, with `alembic upgrade head`."""
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, "head")
+
+
+class FakeAnthropicServer:
+    """Local stand-in for the Anthropic Messages API.
+
+    Replies to POST /v1/messages with a canned analysis after `delay` seconds
+    and records how many requests were in flight at once. Requests that offer
+    tools get a tool_use reply (streamed as SSE when asked) unless `text_reply`
+    is set, which forces a plain text reply. Message batches are
+    reported `in_progress` for `batch_polls_until_ended` retrievals, then ended.
+    """
+
+    def __init__(self, delay: float = 0.0, winner: str = "Golden Eagle"):
+        self.delay = delay
+        self.winner = winner
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_for = set()
+        self.text_reply = None
+        self.batches = {}
+        self.cached_prompts = set()
+        self.batch_polls_until_ended = 1
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def analysis(self, body: dict) -> dict:
+        return {
+            "winner": self.winner,
+            "confidence": 72.5,
+            "risk": "MEDIUM",
+            "stake": 0.04,
+            "odds": 3.5,
+            "profit": 5.0,
+            "reasoning": "Strong recent form",
+        }
+
+    def analysis_text(self, body: dict) -> str:
+        return self.text_reply if self.text_reply is not None else json.dumps(self.analysis(body))
+
+    def content(self, body: dict) -> dict:
+        if body.get("tools") and self.text_reply is None:
+            tool = body["tools"][0]["name"]
+            return {"type": "tool_use", "id": f"toolu_{len(self.requests)}", "name": tool, "input": self.analysis(body)}
+        return {"type": "text", "text": self.analysis_text(body)}
+
+    def message(self, body: dict) -> dict:
+        content = self.content(body)
+        return {
+            "id": f"msg_{len(self.requests)}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "content": [content],
+            "stop_reason": "tool_use" if content["type"] == "tool_use" else "end_turn",
+            "stop_sequence": None,
+            "usage": self.usage(body),
+        }
+
+    def stream_events(self, body: dict, chunk_size: int = 8):
+        """The message as Messages API server-sent events, JSON split into small deltas."""
+        message = self.message(body)
+        content = message["content"][0]
+        if content["type"] == "tool_use":
+            text, delta_type, key = json.dumps(content["input"]), "input_json_delta", "partial_json"
+            start = {**content, "input": {}}
+        else:
+            text, delta_type, key = content["text"], "text_delta", "text"
+            start = {**content, "text": ""}
+        yield "message_start", {"type": "message_start", "message": {**message, "content": [], "stop_reason": None}}
+        yield "content_block_start", {"type": "content_block_start", "index": 0, "content_block": start}
+        for i in range(0, len(text), chunk_size):
+            delta = {"type": delta_type, key: text[i:i + chunk_size]}
+            yield "content_block_delta", {"type": "content_block_delta", "index": 0, "delta": delta}
+        yield "content_block_stop", {"type": "content_block_stop", "index": 0}
+        yield "message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+            "usage": {"output_tokens": message["usage"]["output_tokens"]},
+        }
+        yield "message_stop", {"type": "message_stop"}
+
+    def usage(self, body: dict) -> dict:
+        """Rough usage (4 characters a token) with prompt caching modelled on the real API.
+
+        The cacheable prefix is the tools plus the system blocks up to the one
+        marked cache_control; like the API, prefixes shorter than
+        CACHE_MIN_PREFIX_TOKENS are billed as plain input and never cached.
+        """
+        from src.app.services.claude_service import CACHE_MIN_PREFIX_TOKENS
+
+        usage = {"input_tokens": len(json.dumps(body.get("messages", []))) // 4, "output_tokens": 60}
+        system = body.get("system") if isinstance(body.get("system"), list) else []
+        prefix = json.dumps(body.get("tools", []))
+        prefix_tokens = len(prefix) // 4
+        cached_prefix, cached_tokens = "", 0
+        for block in system:
+            prefix += block["text"]
+            prefix_tokens += len(block["text"]) // 4
+            if "cache_control" in block:
+                cached_prefix, cached_tokens = prefix, prefix_tokens
+        usage["input_tokens"] += prefix_tokens - cached_tokens
+        if cached_tokens < CACHE_MIN_PREFIX_TOKENS:
+            usage["input_tokens"] += cached_tokens
+            return usage
+        with self._lock:
+            cached = cached_prefix in self.cached_prompts
+            self.cached_prompts.add(cached_prefix)
+        usage["cache_read_input_tokens" if cached else "cache_creation_input_tokens"] = cached_tokens
+        return usage
+
+    def batch(self, batch_id: str) -> dict:
+        entry = self.batches[batch_id]
+        ended = entry["polls"] > self.batch_polls_until_ended
+        count = len(entry["requests"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count if ended else 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": "2030-01-01T00:00:00Z",
+            "expires_at": "2030-01-02T00:00:00Z",
+            "ended_at": "2030-01-01T01:00:00Z" if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": f"{self.base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def batch_results(self, batch_id: str) -> str:
+        lines = []
+        for request in self.batches[batch_id]["requests"]:
+            params = request["params"]
+            if any(marker in json.dumps(params.get("messages", [])) for marker in self.fail_for):
+                result = {"type": "errored", "error": {"type": "error", "error": {"type": "invalid_request_error", "message": "rejected"}}}
+            else:
+                result = {"type": "succeeded", "message": self.message(params)}
+            lines.append(json.dumps({"custom_id": request["custom_id"], "result": result}))
+        return "\n".join(lines) + "\n"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if parts[:3] != ["v1", "messages", "batches"] or len(parts) < 4 or parts[3] not in fake.batches:
+                    self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": "not found"}})
+                elif parts[4:] == ["results"]:
+                    data = fake.batch_results(parts[3]).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/binary")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                else:
+                    with fake._lock:
+                        fake.batches[parts[3]]["polls"] += 1
+                    self._send(200, fake.batch(parts[3]))
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path.split("?")[0].rstrip("/") == "/v1/messages/batches":
+                    with fake._lock:
+                        batch_id = f"msgbatch_{uuid.uuid4().hex}"
+                        fake.batches[batch_id] = {"requests": body.get("requests", []), "polls": 0}
+                    self._send(200, fake.batch(batch_id))
+                    return
+                with fake._lock:
+                    fake.requests.append(body)
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                try:
+                    time.sleep(fake.delay)
+                    prompt = json.dumps(body.get("messages", []))
+                    if any(marker in prompt for marker in fake.fail_for):
+                        self._send(400, {"type": "error", "error": {"type": "invalid_request_error", "message": "rejected"}})
+                    elif body.get("stream"):
+                        self._send_events(fake.stream_events(body))
+                    else:
+                        self._send(200, fake.message(body))
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+
+            def _send_events(self, events):
+                data = "".join(f"event: {event}\ndata: {json.dumps(payload)}\n\n" for event, payload in events).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send(self, status: int, payload: dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def fake_anthropic():
+    server = FakeAnthropicServer().start()
+    yield server
+    server.stop()
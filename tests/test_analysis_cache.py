@@ -0,0 +1,125 @@
+import fnmatch
+
+from src.app.services.analysis_cache import AnalysisCache, make_cache_key
+from src.app.services.claude_service import ClaudeService, RaceAnalysisRequest, RaceAnalysisResponse
+
+REQUEST = RaceAnalysisRequest(
+    race={"track": "Ayr", "distance": 1600},
+    horses=[{"name": "Golden Eagle", "odds": 3.5}, {"name": "Silver Streak", "odds": 2.5}],
+)
+ANALYSIS = RaceAnalysisResponse(
+    winner_prediction="Golden Eagle",
+    confidence_score=70.0,
+    analysis_reasoning="Form",
+    risk_assessment="LOW",
+    suggested_stake=0.05,
+    expected_profit=2.0,
+    odds=3.5,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Just enough of the redis-py API for the cache's Redis tier."""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+
+    def smembers(self, key):
+        return self.sets.get(key, set())
+
+    def expire(self, key, ttl):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.sets.pop(key, None)
+
+
+def test_key_ignores_runner_order_but_not_odds():
+    reordered = RaceAnalysisRequest(race=REQUEST.race, horses=list(reversed(REQUEST.horses)))
+    drifted = RaceAnalysisRequest(race=REQUEST.race, horses=[{"name": "Golden Eagle", "odds": 5.0}, REQUEST.horses[1]])
+
+    assert make_cache_key(reordered, "model-a") == make_cache_key(REQUEST, "model-a")
+    assert make_cache_key(drifted, "model-a") != make_cache_key(REQUEST, "model-a")
+    assert make_cache_key(REQUEST, "model-b") != make_cache_key(REQUEST, "model-a")
+
+
+def test_lru_evicts_least_recently_used():
+    cache = AnalysisCache(max_entries=2)
+    cache.set("a", ANALYSIS)
+    cache.set("b", ANALYSIS)
+    cache.get("a")
+    cache.set("c", ANALYSIS)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == ANALYSIS
+    assert cache.stats["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = AnalysisCache(ttl_seconds=60, clock=clock)
+    cache.set("a", ANALYSIS)
+
+    clock.now = 59
+    assert cache.get("a") == ANALYSIS
+    clock.now = 61
+    assert cache.get("a") is None
+    assert cache.stats["expirations"] == 1
+
+
+def test_invalidate_race_drops_both_tiers():
+    redis = FakeRedis()
+    cache = AnalysisCache(redis_client=redis)
+    cache.set("a", ANALYSIS, race_id=7)
+    cache.set("b", ANALYSIS, race_id=8)
+
+    cache.invalidate_race(7)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == ANALYSIS
+    assert not fnmatch.filter(redis.values, "*:a")
+
+
+def test_redis_tier_is_shared_between_processes():
+    redis = FakeRedis()
+    AnalysisCache(redis_client=redis).set("a", ANALYSIS, race_id=7)
+    other_worker = AnalysisCache(redis_client=redis)
+
+    assert other_worker.get("a", race_id=7) == ANALYSIS
+    assert other_worker.stats["redis_hits"] == 1
+
+
+def test_claude_service_serves_repeat_analyses_from_cache(fake_anthropic):
+    cache = AnalysisCache()
+    service = ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url, cache=cache)
+
+    first = service.analyze_request(REQUEST, race_id=1)
+    second = service.analyze_request(REQUEST, race_id=1)
+
+    assert first == second
+    assert len(fake_anthropic.requests) == 1
+    assert cache.snapshot()["hits"] == 1
+
+    cache.invalidate_race(1)
+    service.analyze_request(REQUEST, race_id=1)
+    assert len(fake_anthropic.requests) == 2
@@ -0,0 +1,88 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main, models
+from src.app.database import SessionLocal
+
+client = TestClient(main.app)
+
+RANGE = {"date_from": "2039-04-01", "date_to": "2039-05-31"}
+
+
+@pytest.fixture(scope="module")
+def settled_bets():
+    """Two Aintree days in April and one Perth day in May, 2039."""
+    db = SessionLocal()
+    bets = []
+    for day, track, jockey, results in (
+        (datetime(2039, 4, 3, 14, 0), "Analytics Aintree", "R. Walsh", [("WON", 10.0, 25.0), ("LOST", 10.0, -10.0)]),
+        (datetime(2039, 4, 4, 14, 0), "Analytics Aintree", "R. Walsh", [("LOST", 20.0, -20.0), ("PENDING", 5.0, None)]),
+        (datetime(2039, 5, 9, 14, 0), "Analytics Perth", "H. Cobden", [("WON", 10.0, 15.0)]),
+    ):
+        race = models.Race(race_date=day, track=track, off_time="14:00", race_type="Chase", distance=3200)
+        race.horses = [models.Horse(name=f"{track} {day:%d}", jockey=jockey, trainer="W. Mullins", odds=3.5)]
+        db.add(race)
+        db.flush()
+        for result, stake, profit in results:
+            bets.append(models.Bet(
+                race_id=race.id, horse_id=race.horses[0].id, stake=stake, odds=3.5, bet_type="WIN",
+                placed_at=day.replace(hour=12), result=result, profit=profit,
+            ))
+    db.add_all(bets)
+    db.commit()
+    ids = [bet.id for bet in bets]
+    db.close()
+    assert client.post("/analytics/refresh").status_code == 200
+    return ids
+
+
+def test_summary_reads_the_rollups(settled_bets):
+    summary = client.get("/analytics/summary", params=RANGE).json()
+
+    assert summary == {
+        "bets": 5, "settled": 4, "wins": 2, "staked": 55.0, "profit": 10.0,
+        "strike_rate": 0.5, "roi": 10.0 / 50.0,
+    }
+
+
+def test_pnl_by_day_and_month(settled_bets):
+    daily = client.get("/analytics/pnl", params={**RANGE, "period": "day"}).json()
+    monthly = client.get("/analytics/pnl", params={**RANGE, "period": "month"}).json()
+
+    assert [(row["period"], row["profit"]) for row in daily] == [
+        ("2039-04-03", 15.0), ("2039-04-04", -20.0), ("2039-05-09", 15.0),
+    ]
+    assert [(row["period"], row["bets"], row["profit"]) for row in monthly] == [
+        ("2039-04-01", 4, -5.0), ("2039-05-01", 1, 15.0),
+    ]
+    assert client.get("/analytics/pnl", params={"period": "year"}).status_code == 422
+
+
+def test_breakdowns_by_track_and_jockey(settled_bets):
+    tracks = client.get("/analytics/track", params=RANGE).json()
+    jockeys = client.get("/analytics/jockey", params=RANGE).json()
+
+    assert [(row["key"], row["profit"], row["strike_rate"]) for row in tracks] == [
+        ("Analytics Perth", 15.0, 1.0), ("Analytics Aintree", -5.0, 1 / 3),
+    ]
+    assert [row["key"] for row in jockeys] == ["H. Cobden", "R. Walsh"]
+    assert client.get("/analytics/colour").status_code == 404
+
+
+def test_settling_a_bet_refreshes_only_its_day(settled_bets, monkeypatch):
+    # Everything here was written seconds ago; without this the lag would rescan all three days
+    monkeypatch.setattr(main.analytics_service, "watermark_lag", timedelta(0))
+    db = SessionLocal()
+    pending = db.get(models.Bet, settled_bets[3])
+    pending.result, pending.profit = "WON", 12.5
+    db.commit()
+    db.close()
+
+    refreshed = client.post("/analytics/refresh").json()
+
+    assert refreshed == {"days": 1, "skipped": False}
+    april = client.get("/analytics/pnl", params={**RANGE, "period": "month"}).json()[0]
+    assert (april["settled"], april["wins"], april["profit"]) == (4, 2, 7.5)
+    assert client.get("/analytics/summary", params={"date_from": date(2039, 4, 4)}).json()["settled"] == 3
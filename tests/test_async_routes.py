@@ -0,0 +1,40 @@
+from fastapi.testclient import TestClient
+
+from src.app import database, main
+
+RACE = {
+    "race_date": "2037-06-01T14:00:00", "track": "Async Downs", "off_time": "14:00",
+    "distance": 1600, "race_type": "Flat",
+}
+
+
+def test_race_and_horse_crud_through_the_async_session():
+    with TestClient(main.app) as client:
+        race = client.post("/races", json=RACE).json()
+        horse = client.post("/horses", json={"race_id": race["id"], "name": "Awaiter", "odds": 4.0}).json()
+
+        assert client.put(f"/races/{race['id']}", json={"distance": 2000}).json()["distance"] == 2000
+        assert client.get(f"/horses/{horse['id']}").json()["name"] == "Awaiter"
+        assert client.put(f"/horses/{horse['id']}", json={"odds": 5.5}).json()["odds"] == 5.5
+        assert client.post("/horses", json={"race_id": 999999, "name": "Orphan"}).status_code == 404
+
+        # Deleting the race cascades to its runners
+        assert client.delete(f"/races/{race['id']}").status_code == 204
+        assert client.get(f"/horses/{horse['id']}").status_code == 404
+        assert client.delete(f"/races/{race['id']}").status_code == 404
+
+
+def test_async_url_uses_async_drivers(monkeypatch):
+    monkeypatch.delenv("ASYNC_DATABASE_URL", raising=False)
+    for sync_url, async_url in [
+        ("postgresql://u:p@db:5432/racing", "postgresql+asyncpg://u:p@db:5432/racing"),
+        ("postgresql+psycopg2://u:p@db/racing", "postgresql+asyncpg://u:p@db/racing"),
+        ("sqlite:///./test.db", "sqlite+aiosqlite:///./test.db"),
+    ]:
+        monkeypatch.setenv("DATABASE_URL", sync_url)
+        database.get_database_url.cache_clear()
+        database.get_async_database_url.cache_clear()
+        assert database.get_async_database_url() == async_url
+
+    database.get_database_url.cache_clear()
+    database.get_async_database_url.cache_clear()
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.services.claude_service import ClaudeService, RaceAnalysisRequest, RaceAnalysisResponse
+from src.app.services.rate_limit import AsyncTokenBucket
+
+
+def make_requests(count: int) -> dict:
+    return {
+        race_id: RaceAnalysisRequest(
+            race={"track": f"Track {race_id}", "distance": 1600},
+            horses=[{"name": "Golden Eagle", "odds": 3.5}, {"name": "Silver Streak", "odds": 2.5}],
+        )
+        for race_id in range(1, count + 1)
+    }
+
+
+async def collect(service: ClaudeService, requests: dict, concurrency: int) -> dict:
+    return {race_id: result async for race_id, result in service.analyze_races(requests, concurrency)}
+
+
+def test_analyze_races_runs_concurrently_up_to_the_limit(fake_anthropic):
+    fake_anthropic.delay = 0.1
+    service = ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url, requests_per_minute=6000)
+
+    results = asyncio.run(collect(service, make_requests(9), concurrency=3))
+
+    assert sorted(results) == list(range(1, 10))
+    assert all(isinstance(result, RaceAnalysisResponse) for result in results.values())
+    assert results[1].winner_prediction == "Golden Eagle"
+    assert 1 < fake_anthropic.max_in_flight <= 3
+
+
+def test_failed_race_does_not_abort_the_batch(fake_anthropic):
+    fake_anthropic.fail_for = {"Track 2"}
+    service = ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url, requests_per_minute=6000)
+
+    results = asyncio.run(collect(service, make_requests(3), concurrency=2))
+
+    assert isinstance(results[2], Exception)
+    assert isinstance(results[1], RaceAnalysisResponse)
+    assert isinstance(results[3], RaceAnalysisResponse)
+
+
+def test_token_bucket_spaces_out_requests():
+    async def take(count: int) -> float:
+        bucket = AsyncTokenBucket(rate_per_minute=600, capacity=1)
+        start = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(take(4)) >= 0.28
+
+
+def test_analyze_batch_endpoint_streams_and_persists(fake_anthropic, monkeypatch):
+    monkeypatch.setattr(
+        main, "claude_service",
+        ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url, requests_per_minute=6000),
+    )
+    db = SessionLocal()
+    races = [
+        models.Race(race_date=datetime(2031, 5, 4, 14, 0), track="Ayr", off_time="14:00", race_type="Flat", distance=1600),
+        models.Race(race_date=datetime(2031, 5, 4, 15, 0), track="Ayr", off_time="15:00", race_type="Flat", distance=2000),
+    ]
+    for race in races:
+        race.horses = [models.Horse(name="Golden Eagle", odds=3.5), models.Horse(name="Silver Streak", odds=2.5)]
+    db.add_all(races)
+    db.commit()
+    race_ids = sorted(race.id for race in races)
+
+    response = TestClient(main.app).post("/races/analyze-batch", json={"race_date": "2031-05-04", "concurrency": 2})
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["race_id"] for line in lines) == race_ids
+    assert all(line["status"] == "ok" for line in lines)
+    stored = db.query(models.RaceAnalysis).filter(models.RaceAnalysis.race_id.in_(race_ids)).all()
+    assert sorted(analysis.winner_prediction for analysis in stored) == ["Golden Eagle", "Golden Eagle"]
+    db.close()
+
+
+def test_analyze_batch_requires_a_selection():
+    response = TestClient(main.app).post("/races/analyze-batch", json={})
+
+    assert response.status_code == 422
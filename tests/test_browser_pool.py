@@ -0,0 +1,137 @@
+import threading
+import urllib.request
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+
+from src.app.services.browser_pool import BrowserPool
+from src.app.services.racing_post_service import RacingPostService
+
+FIXTURES = Path(__file__).parent / "fixtures" / "racecards"
+
+
+class StubDriver:
+    """Minimal stand-in for a Selenium driver that fetches pages over plain HTTP."""
+
+    def __init__(self):
+        self.page_source = ""
+        self.alive = True
+        self.quit_called = False
+
+    def get(self, url):
+        with urllib.request.urlopen(url) as response:
+            self.page_source = response.read().decode()
+
+    def find_element(self, by, value):
+        if value not in self.page_source:
+            raise NoSuchElementException(value)
+        return object()
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("browser crashed")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+class RacecardHandler(BaseHTTPRequestHandler):
+    """Serves the saved racecard page at /racecards."""
+
+    def do_GET(self):
+        if self.path != "/racecards":
+            self.send_error(404)
+            return
+        body = (FIXTURES / "ayr_ascot.html").read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_site():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RacecardHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_race_cards_are_scraped_through_a_warm_pooled_driver(stub_site):
+    pool = BrowserPool(max_size=1, driver_factory=StubDriver)
+    service = RacingPostService(base_url=stub_site, browser_pool=pool)
+
+    first = service.get_race_cards(date.today())
+    second = service.get_race_cards(date.today())
+
+    assert [race["race_track"] for race in first] == ["Ayr", "Ascot"]
+    assert second == first
+    assert pool.stats["created"] == 1
+    assert pool.stats["checkouts"] == 2
+    assert pool.idle == 1
+
+
+def test_driver_is_recycled_after_max_pages():
+    pool = BrowserPool(max_size=1, max_pages_per_driver=2, driver_factory=StubDriver)
+
+    drivers = []
+    for _ in range(3):
+        with pool.driver() as driver:
+            drivers.append(driver)
+
+    assert drivers[0] is drivers[1]
+    assert drivers[2] is not drivers[0]
+    assert drivers[0].quit_called
+    assert pool.stats["recycled"] == 1
+
+
+def test_unhealthy_driver_is_replaced_on_checkout():
+    pool = BrowserPool(max_size=1, driver_factory=StubDriver)
+    with pool.driver() as driver:
+        driver.alive = False
+
+    with pool.driver() as replacement:
+        assert replacement is not driver
+
+    assert driver.quit_called
+    assert pool.stats["unhealthy"] == 1
+    assert pool.size == 1
+
+
+def test_checkout_times_out_when_pool_is_exhausted():
+    pool = BrowserPool(max_size=1, checkout_timeout=0.2, driver_factory=StubDriver)
+    held = pool.checkout()
+
+    with pytest.raises(TimeoutError):
+        pool.checkout()
+
+    pool.checkin(held)
+    pool.close()
+    assert held.driver.quit_called
+
+
+def test_closed_pool_refuses_checkouts_and_app_shutdown_closes_it(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app import main
+
+    pool = BrowserPool(max_size=1, driver_factory=StubDriver)
+    with pool.driver() as driver:
+        pass
+    monkeypatch.setattr(main.racing_post_service, "browser_pool", pool)
+    monkeypatch.setenv("ANALYSIS_BATCH_WORKER", "false")
+
+    with TestClient(main.app):
+        assert pool.idle == 1
+
+    assert driver.quit_called
+    with pytest.raises(RuntimeError):
+        pool.checkout()
@@ -0,0 +1,60 @@
+import json
+
+from src.app.services.claude_service import (
+    ANALYSIS_TOOL, ANALYST_INSTRUCTIONS, CACHE_MIN_PREFIX_TOKENS, ClaudeService, RaceAnalysisRequest, encode_race_card,
+)
+
+REQUEST = RaceAnalysisRequest(
+    race={"date": "2031-05-04T14:00:00", "track": "Ayr", "distance": 1600, "class_rating": None},
+    horses=[
+        {"name": "Golden Eagle", "jockey": "J Smith", "odds": 3.5, "weight": None, "wins": 2},
+        {"name": "Silver Streak", "jockey": None, "odds": 2.5, "weight": None, "wins": 0},
+    ],
+)
+
+
+def test_compact_encoding_is_tabular_and_drops_empty_columns():
+    encoded = encode_race_card(REQUEST)
+
+    assert encoded.splitlines() == [
+        "race: date=2031-05-04T14:00:00;track=Ayr;distance=1600",
+        "runners:",
+        "name|jockey|odds|wins",
+        "Golden Eagle|J Smith|3.5|2",
+        "Silver Streak||2.5|0",
+    ]
+
+
+def test_compact_prompt_moves_instructions_into_a_cached_system_block():
+    compact = ClaudeService(api_key="test-key", compact_prompts=True).build_message_params(REQUEST)
+    legacy = ClaudeService(api_key="test-key", compact_prompts=False).build_message_params(REQUEST)
+
+    assert compact["system"] == [
+        {"type": "text", "text": ANALYST_INSTRUCTIONS, "cache_control": {"type": "ephemeral"}}
+    ]
+    assert "system" not in legacy
+    assert len(compact["messages"][0]["content"]) < len(legacy["messages"][0]["content"]) / 2
+
+
+def test_cached_prefix_is_long_enough_to_be_cached():
+    # ~4 characters a token for English prose; JSON schema tokenises denser, so this undercounts
+    estimated_tokens = (len(json.dumps(ANALYSIS_TOOL)) + len(ANALYST_INSTRUCTIONS)) / 4
+    assert estimated_tokens > CACHE_MIN_PREFIX_TOKENS * 1.15
+    assert "claude-3-sonnet" not in ClaudeService(api_key="test-key").model
+
+
+def test_usage_ledger_accounts_cache_writes_then_reads(fake_anthropic):
+    service = ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url)
+
+    first = service.analyze_request(REQUEST, race_id=1)
+    service.analyze_request(REQUEST, race_id=2)
+
+    assert first.winner_prediction == "Golden Eagle"
+    report = service.usage.report()
+    written, read = report["races"]
+    assert (written["race_id"], read["race_id"]) == (1, 2)
+    assert written["cache_creation_input_tokens"] > 0 and written["cache_read_input_tokens"] == 0
+    assert read["cache_read_input_tokens"] == written["cache_creation_input_tokens"]
+    assert report["totals"]["calls"] == 2
+    assert report["totals"]["output_tokens"] == 120
+    assert 0 < report["totals"]["cache_read_ratio"] < 1
@@ -0,0 +1,100 @@
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+
+from src.app import database, main
+from src.app.db_pool import InstrumentedQueuePool, instrument_engine, pool_settings_from_env
+
+
+def make_engine(**kwargs):
+    url = f"sqlite:///{Path(tempfile.mkdtemp()) / 'pool.db'}"
+    return create_engine(url, poolclass=InstrumentedQueuePool, **kwargs)
+
+
+def test_pool_settings_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "Never")
+
+    settings = pool_settings_from_env()
+
+    assert settings["pool_size"] == 20
+    assert settings["max_overflow"] == 0
+    assert settings["pre_ping"] == "never"
+    monkeypatch.setenv("DB_POOL_PRE_PING", "sometimes")
+    with pytest.raises(ValueError):
+        pool_settings_from_env()
+
+
+def test_metrics_track_saturation_overflow_and_timeouts():
+    engine = make_engine(pool_size=1, max_overflow=1, pool_timeout=0.2)
+    metrics = instrument_engine(engine)
+
+    first, second = engine.connect(), engine.connect()
+    assert metrics.snapshot()["overflow"] == 1
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    # A waiter blocks until a connection is checked back in
+    waited = []
+    waiter = threading.Thread(target=lambda: waited.append(engine.connect()))
+    waiter.start()
+    time.sleep(0.05)
+    first.close()
+    waiter.join()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["checked_out"] == 2
+    assert snapshot["max_checked_out"] == 2
+    assert snapshot["checkouts"] == 3
+    assert snapshot["timeouts"] == 1
+    assert snapshot["wait_seconds_max"] >= 0.04
+    assert sum(snapshot["wait_histogram"].values()) == 3
+    waited[0].close()
+    second.close()
+    engine.dispose()
+
+
+def test_idle_pre_ping_only_checks_stale_connections():
+    engine = make_engine(pool_size=1)
+    metrics = instrument_engine(engine, pre_ping="idle", pre_ping_idle_seconds=0.05)
+
+    for pause in (0, 0, 0.1):
+        time.sleep(pause)
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    snapshot = metrics.snapshot()
+    assert snapshot["pre_pings"] == 1
+    assert snapshot["pre_ping_failures"] == 0
+    assert snapshot["connects"] == 1
+    engine.dispose()
+
+
+def test_engines_are_built_lazily_and_rebuilt_after_dispose():
+    asyncio.run(database.dispose_engines())
+    assert TestClient(main.app).get("/metrics/db-pool").json() == {}
+
+    first = database.get_engine()
+    assert database.get_engine() is first
+    database.SessionLocal().close()
+    asyncio.run(database.dispose_engines())
+
+    assert database.get_engine() is not first
+
+
+def test_pool_metrics_endpoint():
+    database.SessionLocal().close()
+    database.get_async_engine()
+
+    body = TestClient(main.app).get("/metrics/db-pool").json()
+
+    assert body["sync"]["pool"] == "InstrumentedQueuePool"
+    assert "wait_histogram" in body["sync"]
+    assert body["async"]["pool"] == "NullPool"
@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.services.export import ExportService
+
+client = TestClient(main.app)
+
+
+@pytest.fixture(scope="module")
+def export_races():
+    db = SessionLocal()
+    races = [
+        models.Race(race_date=datetime(2035, 4, 1, 14 + i), track="Export Park", off_time=f"{14 + i}:00",
+                    race_type="Flat", distance=1200 + i)
+        for i in range(3)
+    ]
+    for race in races:
+        race.horses = [models.Horse(name=f"Exporter {race.off_time} {n}", odds=2.0 + n) for n in range(2)]
+    db.add_all(races)
+    db.commit()
+    ids = [race.id for race in races]
+    db.close()
+    return ids
+
+
+def test_races_export_as_ndjson(export_races):
+    response = client.get("/export/races", params={"track": "Export Park", "fields": "id,race_date,distance"})
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [
+        {"id": race_id, "race_date": f"2035-04-01T{14 + i}:00:00", "distance": 1200 + i}
+        for i, race_id in enumerate(export_races)
+    ]
+
+
+def test_horses_export_as_csv_filtered_by_race(export_races):
+    response = client.get("/export/horses", params={"format": "csv", "track": "Export Park", "fields": "race_id,name,odds"})
+
+    assert 'filename="horses.csv"' in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["race_id", "name", "odds"]
+    assert len(rows) == 7
+    assert rows[1] == [str(export_races[0]), "Exporter 14:00 0", "2.0"]
+
+
+def test_races_export_as_arrow(export_races):
+    pa = pytest.importorskip("pyarrow")
+
+    response = client.get("/export/races", params={"format": "arrow", "track": "Export Park"})
+
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("id").to_pylist() == export_races
+    assert table.schema.field("race_date").type == pa.timestamp("us")
+
+
+def test_unknown_export_is_rejected():
+    assert client.get("/export/secrets").status_code == 404
+    assert client.get("/export/races", params={"format": "xml"}).status_code == 422
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.mark.skipif(not Path("/proc/self/statm").exists(), reason="needs /proc to read RSS")
+def test_exporting_a_million_rows_keeps_rss_flat():
+    engine = create_engine(f"sqlite:///{Path(tempfile.mkdtemp()) / 'export.db'}")
+    models.Base.metadata.create_all(bind=engine, tables=[models.Bet.__table__])
+    connection = engine.raw_connection()
+    connection.executemany(
+        "INSERT INTO bets (race_id, horse_id, stake, odds, bet_type, result, profit, placed_at) "
+        "VALUES (?, ?, 10.0, 3.5, 'WIN', 'LOST', -10.0, '2035-04-01 14:00:00')",
+        ((i // 10, i) for i in range(1_000_000)),
+    )
+    connection.commit()
+    connection.close()
+
+    service = ExportService(sessionmaker(bind=engine), batch_size=5000)
+    fields = [column.key for column in models.Bet.__table__.columns]
+    chunks = service.stream("ndjson", models.Bet, fields)
+
+    rows = exported = 0
+    baseline = peak = None
+    for i, chunk in enumerate(chunks):
+        rows += chunk.count(b"\n")
+        exported += len(chunk)
+        if i == 10:
+            baseline = peak = rss_bytes()
+        elif baseline is not None:
+            peak = max(peak, rss_bytes())
+    engine.dispose()
+
+    assert rows == 1_000_000
+    # ~200MB of NDJSON went out while resident memory stayed within a few batches
+    assert exported > 150 * 2**20
+    assert peak - baseline < 30 * 2**20
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from src.app.services.http_client import AsyncAPIClient
+from src.app.services.racing_api import AsyncRacingAPI, RacingAPI
+from src.app.services.racing_post_api import AsyncRacingPostAPI, RacingPostAPI
+from src.app.services.rate_limit import SlidingWindowLimiter
+
+
+class FormTransport(httpx.AsyncBaseTransport):
+    """Serves /horses/{id}/form after `delay` seconds, tracking concurrency."""
+
+    def __init__(self, delay: float = 0.0, fail=(), malformed=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.malformed = set(malformed)
+        self.paths = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.paths.append(request.url.path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        horse_id = request.url.path.split("/")[2]
+        if horse_id in self.fail:
+            return httpx.Response(404, json={"detail": "not found"})
+        if horse_id in self.malformed:
+            return httpx.Response(200, content=b"<html>maintenance</html>")
+        return httpx.Response(200, json={"horse_id": horse_id, "runs": []})
+
+
+def test_get_horse_forms_fans_out_within_the_concurrency_bound():
+    transport = FormTransport(delay=0.05, fail={"h3"})
+
+    async def fetch():
+        async with AsyncAPIClient("http://racing.test", max_concurrency=4, transport=transport) as api:
+            return await api.get_horse_forms(["h1", "h2", "h3", "h1"] + [f"x{i}" for i in range(8)])
+
+    start = time.monotonic()
+    forms = asyncio.run(fetch())
+    elapsed = time.monotonic() - start
+
+    assert forms["h1"] == {"horse_id": "h1", "runs": []}
+    assert forms["h3"] is None
+    assert len(forms) == 11
+    assert transport.paths.count("/horses/h1/form") == 1
+    assert transport.max_in_flight == 4
+    assert elapsed < 11 * 0.05
+
+
+def test_a_malformed_body_maps_to_none_without_failing_the_batch():
+    transport = FormTransport(malformed={"h2"})
+
+    async def fetch():
+        async with AsyncAPIClient("http://racing.test", transport=transport) as api:
+            return await api.get_horse_forms(["h1", "h2", "h3"])
+
+    forms = asyncio.run(fetch())
+
+    assert forms == {"h1": {"horse_id": "h1", "runs": []}, "h2": None, "h3": {"horse_id": "h3", "runs": []}}
+
+
+def test_sliding_window_never_exceeds_calls_per_period():
+    async def take(count: int) -> list:
+        limiter = SlidingWindowLimiter(calls=5, period=0.2)
+        stamps = []
+        for _ in range(count):
+            await limiter.acquire()
+            stamps.append(time.monotonic())
+        return stamps
+
+    stamps = asyncio.run(take(12))
+
+    assert stamps[-1] - stamps[0] >= 0.4
+    for i in range(len(stamps) - 5):
+        assert stamps[i + 5] - stamps[i] >= 0.2 - 1e-3
+
+
+def test_server_errors_are_retried_but_client_errors_are_not():
+    attempts = {"/races/flaky": 0, "/races/missing": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts[request.url.path] += 1
+        if request.url.path == "/races/flaky" and attempts["/races/flaky"] < 2:
+            return httpx.Response(503)
+        if request.url.path == "/races/missing":
+            return httpx.Response(404)
+        return httpx.Response(200, json={"race_id": "flaky"})
+
+    async def fetch():
+        async with AsyncRacingPostAPI(base_url="http://racing.test", transport=httpx.MockTransport(handler)) as api:
+            return await api.get_race_details("flaky"), await api.get_race_details("missing")
+
+    flaky, missing = asyncio.run(fetch())
+
+    assert flaky == {"race_id": "flaky"}
+    assert missing is None
+    assert attempts == {"/races/flaky": 2, "/races/missing": 1}
+
+
+def test_clients_of_one_provider_share_a_single_quota():
+    assert RacingPostAPI().rate_limiter is AsyncRacingPostAPI().rate_limiter
+    assert RacingAPI().rate_limiter is AsyncRacingAPI().rate_limiter
+    assert RacingPostAPI().rate_limiter is not RacingAPI().rate_limiter
+    assert AsyncAPIClient("http://a.test").rate_limiter is not AsyncAPIClient("http://a.test").rate_limiter
+
+
+def test_sliding_window_holds_across_threads_and_event_loops():
+    limiter = SlidingWindowLimiter(calls=5, period=0.2)
+    stamps = []
+
+    def sync_caller():
+        for _ in range(6):
+            limiter.acquire_sync()
+            stamps.append(time.monotonic())
+
+    async def async_caller():
+        for _ in range(6):
+            await limiter.acquire()
+            stamps.append(time.monotonic())
+
+    threads = [threading.Thread(target=sync_caller), threading.Thread(target=asyncio.run, args=(async_caller(),))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stamps.sort()
+    assert len(stamps) == 12
+    for i in range(len(stamps) - 5):
+        assert stamps[i + 5] - stamps[i] >= 0.2 - 0.02  # wake-up jitter between threads
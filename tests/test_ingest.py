@@ -0,0 +1,102 @@
+import copy
+import json
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app import models
+from src.app.services.bulk_ingest import BulkIngestService
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autoflush=False)()
+
+
+RACE_CARDS = [
+    {
+        "race_time": "13:30",
+        "race_track": "Ayr",
+        "race_type": "Flat",
+        "horses": [
+            {"name": "Golden Eagle", "jockey": "John Smith", "trainer": "Bob Brown", "odds": 3.5},
+            {"name": "Silver Streak", "jockey": "Mike Johnson", "trainer": "Sarah Green", "odds": 2.5},
+        ],
+    },
+    {
+        "race_time": "14:05",
+        "race_track": "Ascot",
+        "race_type": "Hurdle",
+        "horses": [
+            {"name": "Bronze Bolt", "jockey": "Tom Wilson", "trainer": "David White", "odds": None},
+        ],
+    },
+]
+
+
+def test_bulk_ingest_links_runners_to_their_races():
+    db = make_session()
+
+    report = BulkIngestService().ingest_race_cards(db, date(2025, 6, 20), RACE_CARDS)
+
+    assert report.races.inserted == 2
+    assert report.horses.inserted == 3
+    races = {race.track: race for race in db.query(models.Race).all()}
+    assert sorted(horse.name for horse in races["Ayr"].horses) == ["Golden Eagle", "Silver Streak"]
+    assert [horse.name for horse in races["Ascot"].horses] == ["Bronze Bolt"]
+    assert races["Ascot"].race_date.date() == date(2025, 6, 20)
+
+
+def test_bulk_ingest_with_no_cards_writes_nothing():
+    db = make_session()
+
+    report = BulkIngestService().ingest_race_cards(db, date(2025, 6, 20), [])
+
+    assert report.races.inserted == report.horses.inserted == 0
+    assert db.query(models.Race).count() == 0
+
+
+def test_reingesting_the_same_card_is_a_no_op():
+    db = make_session()
+    service = BulkIngestService()
+    service.ingest_race_cards(db, date(2025, 6, 20), RACE_CARDS)
+
+    report = service.ingest_race_cards(db, date(2025, 6, 20), RACE_CARDS)
+
+    assert report.races.model_dump() == {"inserted": 0, "updated": 0, "unchanged": 2}
+    assert report.horses.model_dump() == {"inserted": 0, "updated": 0, "unchanged": 3}
+    assert db.query(models.Race).count() == 2
+    assert db.query(models.Horse).count() == 3
+
+
+def test_reingest_only_writes_changed_runners():
+    db = make_session()
+    service = BulkIngestService()
+    service.ingest_race_cards(db, date(2025, 6, 20), RACE_CARDS)
+
+    refreshed = copy.deepcopy(RACE_CARDS)
+    refreshed[0]["horses"][0]["odds"] = 4.0
+    refreshed[1]["horses"].append({"name": "Late Entry", "jockey": None, "trainer": None, "odds": 12.0})
+    report = service.ingest_race_cards(db, date(2025, 6, 20), refreshed)
+
+    assert report.races.model_dump() == {"inserted": 0, "updated": 1, "unchanged": 1}
+    assert report.horses.model_dump() == {"inserted": 1, "updated": 1, "unchanged": 2}
+    golden_eagle = db.query(models.Horse).filter_by(name="Golden Eagle").one()
+    assert golden_eagle.odds == 4.0
+
+
+def test_race_cards_route_reports_the_ingest(monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app import main
+
+    monkeypatch.setattr(main.racing_post_service, "get_race_cards", lambda day: copy.deepcopy(RACE_CARDS))
+    client = TestClient(main.app)
+
+    first = client.get("/race-cards", params={"date": "2031-03-14"})
+    second = client.get("/race-cards", params={"date": "2031-03-14"})
+
+    assert len(first.json()) == len(second.json()) == 2
+    assert json.loads(first.headers["X-Ingest-Report"])["horses"]["inserted"] == 3
+    assert json.loads(second.headers["X-Ingest-Report"])["races"] == {"inserted": 0, "updated": 0, "unchanged": 2}
@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.services.claude_service import ClaudeService
+from src.app.services.http_client import FetchResult, Validators
+from src.app.services.jobs import Job, JobScheduler, JobStore
+
+
+class FakeRedis:
+    """Just enough of the redis-py API for the job store's Redis tier."""
+
+    def __init__(self):
+        self.values = {}
+        self.sorted = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+    def zadd(self, key, mapping):
+        self.sorted.setdefault(key, {}).update(mapping)
+
+    def zrevrange(self, key, start, end):
+        members = sorted(self.sorted.get(key, {}).items(), key=lambda item: item[1], reverse=True)
+        return [member for member, _ in members][start:end + 1]
+
+    def zremrangebyrank(self, key, start, end):
+        pass
+
+
+def test_failed_jobs_are_retried_and_duplicates_share_one_run():
+    calls = []
+
+    def flaky(race_date):
+        calls.append(race_date)
+        if len(calls) < 3:
+            raise ConnectionError("scrape failed")
+        return {"date": race_date}
+
+    async def scenario():
+        scheduler = JobScheduler(JobStore())
+        scheduler.stage("ingest", flaky, max_attempts=3, retry_delay=0.01)
+        scheduler.stage("never", lambda: 1 / 0, max_attempts=2, retry_delay=0.01)
+        scheduler.start()
+        job = scheduler.submit("ingest", {"race_date": "2044-04-01"})
+        duplicate = scheduler.submit("ingest", {"race_date": "2044-04-01"})
+        failing = scheduler.submit("never")
+        await asyncio.wait(list(scheduler._tasks.values()))
+        rerun = scheduler.submit("ingest", {"race_date": "2044-04-01"})
+        await scheduler.stop(1)
+        return job, duplicate, failing, rerun
+
+    job, duplicate, failing, rerun = asyncio.run(scenario())
+
+    assert duplicate is job
+    assert (job.status, job.attempts, job.result, job.error) == ("succeeded", 3, {"date": "2044-04-01"}, None)
+    assert (failing.status, failing.attempts, failing.error) == ("failed", 2, "ZeroDivisionError: division by zero")
+    # Once finished the key is free again; this one was cancelled by stop() before it ran
+    assert rerun is not job and rerun.status == "cancelled"
+
+
+def test_stage_concurrency_and_submits_from_worker_threads():
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def ingest(n):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return n
+
+    async def scenario():
+        scheduler = JobScheduler(JobStore())
+        scheduler.stage("ingest", ingest, concurrency=2)
+        scheduler.start()
+        jobs = await asyncio.gather(*(asyncio.to_thread(scheduler.submit, "ingest", {"n": n}) for n in range(6)))
+        await asyncio.sleep(0.01)
+        queued = [job.status for job in jobs].count("queued")
+        while scheduler._tasks:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return jobs, queued
+
+    jobs, queued = asyncio.run(scenario())
+
+    assert peak == 2 and queued == 4
+    assert sorted(job.result for job in jobs) == list(range(6))
+
+
+def test_redis_tier_shares_jobs_and_dedup_keys_between_workers():
+    redis = FakeRedis()
+    worker, other_worker = JobStore(redis_client=redis), JobStore(redis_client=redis)
+    job = Job(stage="ingest", params={"date": "2044-04-02"}, dedup_key="ingest:2044-04-02", max_attempts=3)
+
+    assert worker.claim(job) is None
+    duplicate = other_worker.claim(Job(stage="ingest", params={}, dedup_key="ingest:2044-04-02", max_attempts=3))
+    assert duplicate.id == job.id
+    assert [listed.id for listed in other_worker.list()] == [job.id]
+
+    job.status = "succeeded"
+    worker.save(job)
+    assert other_worker.get(job.id).status == "succeeded"
+    assert other_worker.claim(Job(stage="ingest", params={}, dedup_key="ingest:2044-04-02", max_attempts=3)) is None
+
+
+def wait_for(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed", "cancelled") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+def test_endpoints_return_job_handles_and_the_pipeline_chains_stages(fake_anthropic, monkeypatch):
+    cards = [{
+        "race_time": "15:00", "race_track": "Jobs Newbury", "race_type": "Flat",
+        "horses": [{"name": "Golden Eagle", "jockey": "John Smith", "odds": 3.5}],
+    }]
+
+    class Source:
+        def fetch_race_cards(self, day, validators=None):
+            return FetchResult(cards, Validators())
+
+    class Results:
+        def fetch_results(self, day):
+            return [{"race_track": "Jobs Newbury", "race_time": "15:00", "runners": [{"name": "Golden Eagle", "position": 1}]}]
+
+    monkeypatch.setitem(main.race_card_sources, "racing_api", Source())
+    monkeypatch.setitem(main.results_sources, main.settlement_service.default_source, Results())
+    monkeypatch.setattr(main.daily_pipeline, "claude_service",
+                        ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url))
+    monkeypatch.setenv("ANALYSIS_BATCH_WORKER", "false")
+
+    with TestClient(main.app) as client:
+        accepted = client.get("/race-cards", params={"date": "2044-04-03", "source": "racing_api", "background": True})
+        assert accepted.status_code == 202 and accepted.headers["Location"] == f"/jobs/{accepted.json()['id']}"
+        ingest = wait_for(client, accepted.json()["id"])
+
+        pipeline = client.post("/pipeline/daily", json={"race_date": "2044-04-03", "source": "racing_api"}).json()
+        wait_for(client, pipeline["id"])
+        analyse = client.get("/jobs", params={"stage": "analyse"}).json()[0]
+        analyse = wait_for(client, analyse["id"])
+        odds = wait_for(client, client.get("/jobs", params={"stage": "odds"}).json()[0]["id"])
+        settle = wait_for(client, client.get("/jobs", params={"stage": "settle"}).json()[0]["id"])
+
+        assert client.post("/jobs", json={"stage": "unknown"}).status_code == 400
+        assert client.get("/jobs/missing").status_code == 404
+
+    assert (ingest["stage"], ingest["status"], ingest["result"]["status"]) == ("ingest", "succeeded", "changed")
+    assert analyse["params"] == {"date": "2044-04-03", "pipeline": True} and analyse["status"] == "succeeded"
+    # Not today, so there is nothing to monitor
+    assert (odds["status"], odds["result"]["polls"]) == ("succeeded", 0)
+    assert (settle["params"], settle["status"], settle["result"]["races_resulted"]) == (
+        {"date": "2044-04-03", "pipeline": True}, "succeeded", 1,
+    )
+    db = SessionLocal()
+    race_id = analyse["result"]["analysed"][0]
+    assert db.query(models.RaceAnalysis).filter(models.RaceAnalysis.race_id == race_id).one().winner_prediction == "Golden Eagle"
+    db.close()
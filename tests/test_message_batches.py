@@ -0,0 +1,157 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.services.batch_analysis import COMPLETED, SUBMITTED, SUBMITTING, BatchAnalysisService, WorkerLeaderLock
+from src.app.services.claude_service import ClaudeService
+
+
+def add_races(db, day: datetime, tracks):
+    races = [
+        models.Race(race_date=day.replace(hour=14 + i), track=track, off_time=f"{14 + i}:00", race_type="Flat", distance=1600)
+        for i, track in enumerate(tracks)
+    ]
+    for race in races:
+        race.horses = [models.Horse(name="Golden Eagle", odds=3.5), models.Horse(name="Silver Streak", odds=2.5)]
+    db.add_all(races)
+    db.commit()
+    return sorted(race.id for race in races)
+
+
+def make_service(fake_anthropic) -> BatchAnalysisService:
+    claude = ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url)
+    return BatchAnalysisService(claude, SessionLocal, poll_interval=0.01)
+
+
+def test_batch_is_polled_until_ended_and_results_are_stored(fake_anthropic):
+    fake_anthropic.fail_for = {"Batch Failing"}
+    db = SessionLocal()
+    race_ids = add_races(db, datetime(2032, 1, 10), ["Batch Ayr", "Batch Ascot", "Batch Failing"])
+    service = make_service(fake_anthropic)
+
+    job = service.submit_for_date(db, date(2032, 1, 10))
+
+    assert job.status == SUBMITTED
+    submitted = fake_anthropic.batches[job.batch_id]["requests"]
+    assert {request["custom_id"] for request in submitted} == {f"race-{race_id}" for race_id in race_ids}
+
+    assert service.poll_once() == 0
+    assert service.poll_once() == 1
+
+    db.refresh(job)
+    assert job.status == COMPLETED
+    assert (job.succeeded, job.errored) == (2, 1)
+    stored = db.query(models.RaceAnalysis).filter(models.RaceAnalysis.race_id.in_(race_ids)).all()
+    assert len(stored) == 2
+    assert all(analysis.winner_prediction == "Golden Eagle" for analysis in stored)
+    assert not [body for body in fake_anthropic.requests if "requests" not in body]
+    db.close()
+
+
+def test_resubmitting_a_date_reuses_the_job(fake_anthropic):
+    db = SessionLocal()
+    add_races(db, datetime(2032, 1, 11), ["Batch Kelso"])
+    service = make_service(fake_anthropic)
+
+    first = service.submit_for_date(db, date(2032, 1, 11))
+    second = service.submit_for_date(db, date(2032, 1, 11))
+    forced = service.submit_for_date(db, date(2032, 1, 11), force=True)
+
+    assert second.id == first.id
+    assert forced.id != first.id
+    assert len(fake_anthropic.batches) == 2
+    db.close()
+
+
+def test_restarted_worker_resumes_persisted_jobs(fake_anthropic):
+    db = SessionLocal()
+    race_ids = add_races(db, datetime(2032, 1, 12), ["Batch Perth"])
+    job = make_service(fake_anthropic).submit_for_date(db, date(2032, 1, 12))
+
+    # A fresh service has no in-memory state; everything comes from analysis_batch_jobs
+    restarted = make_service(fake_anthropic)
+    for _ in range(5):
+        if restarted.poll_once():
+            break
+
+    db.refresh(job)
+    assert job.status == COMPLETED
+    assert db.query(models.RaceAnalysis).filter(models.RaceAnalysis.race_id == race_ids[0]).count() == 1
+    db.close()
+
+
+def test_analysis_batch_endpoints(fake_anthropic, monkeypatch):
+    service = make_service(fake_anthropic)
+    monkeypatch.setattr(main, "batch_analysis_service", service)
+    db = SessionLocal()
+    race_ids = add_races(db, datetime(2032, 1, 13), ["Batch Hexham"])
+    db.close()
+    client = TestClient(main.app)
+
+    response = client.post("/analysis-batches", json={"race_date": "2032-01-13"})
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["status"] == SUBMITTED
+    assert body["race_ids"] == race_ids
+    assert client.get(f"/analysis-batches/{body['id']}").json()["batch_id"] == body["batch_id"]
+    assert client.post("/analysis-batches", json={"race_date": "2032-01-14"}).status_code == 404
+
+
+def test_in_flight_submissions_are_not_resumed_twice(fake_anthropic):
+    db = SessionLocal()
+    race_ids = add_races(db, datetime(2032, 1, 15), ["Batch Cartmel"])
+    job = models.AnalysisBatchJob(race_date=datetime(2032, 1, 15), race_ids=json.dumps(race_ids), status=SUBMITTING)
+    db.add(job)
+    db.commit()
+
+    # Still inside the grace period: another process may be mid batches.create
+    assert make_service(fake_anthropic).resume(db) == []
+
+    db.execute(
+        update(models.AnalysisBatchJob).where(models.AnalysisBatchJob.id == job.id)
+        .values(updated_at=datetime.utcnow() - timedelta(hours=1))
+    )
+    db.commit()
+    pollers = [make_service(fake_anthropic) for _ in range(4)]
+    sessions = [SessionLocal() for _ in pollers]
+    with ThreadPoolExecutor(len(pollers)) as pool:
+        resumed = list(pool.map(lambda pair: pair[0].resume(pair[1]), zip(pollers, sessions)))
+
+    assert sum(len(jobs) for jobs in resumed) == 1
+    assert [batch for batch in fake_anthropic.batches.values()
+            if batch["requests"][0]["custom_id"] == f"race-{race_ids[0]}"]
+    db.refresh(job)
+    assert job.status == SUBMITTED
+    for session in sessions:
+        session.close()
+    db.close()
+
+
+def test_finished_batch_is_stored_once(fake_anthropic):
+    db = SessionLocal()
+    add_races(db, datetime(2032, 1, 16), ["Batch Fakenham"])
+    service = make_service(fake_anthropic)
+    fake_anthropic.batch_polls_until_ended = 0
+    job = service.submit_for_date(db, date(2032, 1, 16))
+    other = SessionLocal()
+
+    assert service._store_results(db, job) is True
+    assert service._store_results(other, other.get(models.AnalysisBatchJob, job.id)) is False
+    other.close()
+    db.close()
+
+
+def test_only_one_worker_holds_the_leader_lock():
+    first, second = WorkerLeaderLock(SessionLocal), WorkerLeaderLock(SessionLocal)
+
+    assert first.acquire() is True
+    assert second.acquire() is False
+    first.release()
+    assert second.acquire() is True
+    second.release()
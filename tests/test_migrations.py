@@ -0,0 +1,86 @@
+import tempfile
+from pathlib import Path
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect
+
+from src.app import models
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def migrate(monkeypatch, revision: str):
+    url = f"sqlite:///{Path(tempfile.mkdtemp()) / 'migrations.db'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, revision)
+    return config, create_engine(url)
+
+
+def test_migrations_match_the_models(monkeypatch):
+    _, engine = migrate(monkeypatch, "head")
+
+    with engine.connect() as conn:
+        diff = compare_metadata(MigrationContext.configure(conn), models.Base.metadata)
+
+    assert diff == []
+    engine.dispose()
+
+
+def test_hot_path_indexes_upgrade_and_downgrade(monkeypatch):
+    config, engine = migrate(monkeypatch, "head")
+    bet_indexes = {index["name"] for index in inspect(engine).get_indexes("bets")}
+    assert {"ix_bets_race_id", "ix_bets_horse_id", "ix_bets_placed_at"} <= bet_indexes
+
+    command.downgrade(config, "0001")
+
+    assert "ix_bets_placed_at" not in {index["name"] for index in inspect(engine).get_indexes("bets")}
+    engine.dispose()
+
+
+def test_natural_key_migration_merges_refresh_duplicates(monkeypatch):
+    config, engine = migrate(monkeypatch, "0001")
+    with engine.begin() as conn:
+        # Two refreshes of the same one-race card, plus a bet and an analysis on the first copy
+        for race_id, first_horse in ((1, 1), (2, 3)):
+            conn.exec_driver_sql(
+                "INSERT INTO races (id, race_date, track, race_type) VALUES (?, '2030-05-01 00:00:00', 'Ayr', 'Flat')",
+                (race_id,),
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO horses (id, race_id, name, odds) VALUES (?, ?, 'Golden Eagle', 3.5), (?, ?, 'Silver Streak', 2.5)",
+                (first_horse, race_id, first_horse + 1, race_id),
+            )
+        conn.exec_driver_sql("INSERT INTO races (id, race_date, track, race_type) VALUES (3, '2030-05-01 00:00:00', 'Ayr', 'Hurdle')")
+        conn.exec_driver_sql("INSERT INTO bets (id, race_id, horse_id, stake) VALUES (1, 1, 1, 10.0)")
+        conn.exec_driver_sql("INSERT INTO race_analysis (id, race_id, winner_prediction) VALUES (1, 1, 'Golden Eagle')")
+
+    command.upgrade(config, "head")
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT id FROM races ORDER BY id").scalars().all() == [2, 3]
+        assert conn.exec_driver_sql("SELECT id, race_id FROM horses ORDER BY id").all() == [(3, 2), (4, 2)]
+        assert conn.exec_driver_sql("SELECT race_id, horse_id FROM bets").one() == (2, 3)
+        assert conn.exec_driver_sql("SELECT race_id FROM race_analysis").scalar() == 2
+    engine.dispose()
+
+
+def test_partition_migration_backfills_the_partition_keys(monkeypatch):
+    config, engine = migrate(monkeypatch, "0004")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO races (id, race_date, track, off_time) VALUES (1, '2030-06-01 14:00:00', 'Ayr', '14:00')")
+        conn.exec_driver_sql("INSERT INTO horses (id, race_id, name) VALUES (1, 1, 'Golden Eagle')")
+        conn.exec_driver_sql("INSERT INTO bets (id, race_id, horse_id, stake, created_at) VALUES (1, 1, 1, 10.0, '2030-05-31 09:00:00')")
+
+    command.upgrade(config, "head")
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT race_date FROM horses").scalar() == "2030-06-01 14:00:00"
+        assert conn.exec_driver_sql("SELECT placed_at FROM bets").scalar() == "2030-05-31 09:00:00"
+    assert inspect(engine).get_foreign_keys("bets")[0]["referred_table"] == "races"
+    assert len(inspect(engine).get_foreign_keys("bets")) == 1
+    engine.dispose()
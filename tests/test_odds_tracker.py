@@ -0,0 +1,135 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.services.http_client import FetchResult, Validators
+from src.app.services.odds_tracker import OddsStore, OddsTracker
+
+client = TestClient(main.app)
+
+
+def test_ring_keeps_the_latest_ticks_in_time_order():
+    store = OddsStore(capacity=4, runners=1)
+    for second, price in enumerate([5.0, 5.5, 6.0, 6.5, 7.0, 8.0]):
+        store.record(1, 10, price, at=1000.0 + second)
+
+    assert store.latest(1) == (1005.0, 8.0)
+    assert store.price_at(1, 1003.5) == (1003.0, 6.5)
+    # The first two ticks were overwritten
+    assert store.price_at(1, 1001.5) is None
+    assert len(store.drain()) == 6 and store.drain() == []
+
+
+def test_drift_against_the_window_start():
+    store = OddsStore(capacity=8)
+    for minute, price in enumerate([4.0, 4.0, 5.0, 6.0]):
+        store.record(7, 70, price, at=minute * 60.0)
+
+    drift = store.drift(7, minutes=2, now=180.0)
+    short_history = store.drift(7, minutes=10, now=180.0)
+
+    assert (drift["previous_odds"], drift["odds"], drift["change_pct"], drift["complete"]) == (4.0, 6.0, 50.0, True)
+    assert drift["since"] == datetime(1970, 1, 1, 0, 1)
+    assert (short_history["previous_odds"], short_history["complete"]) == (4.0, False)
+    assert store.drift(8, minutes=2) is None
+
+
+def test_late_ticks_keep_the_ring_ordered_and_idle_runners_are_evicted():
+    store = OddsStore(capacity=4, runners=2)
+    store.record(1, 10, 3.0, at=100.0)
+    store.record(1, 10, 3.2, at=90.0)
+    store.record(2, 10, 9.0, at=50.0)
+    for horse_id in range(3, 6):
+        store.record(horse_id, 11, 2.0, at=200.0)
+
+    assert store.latest(1) == (100.0, 3.2)
+    assert store.evict_idle(before=95.0) == 1
+    assert store.latest(2) is None and store.latest(1) == (100.0, 3.2) and store.latest(5) == (200.0, 2.0)
+    store.record(2, 10, 8.0, at=300.0)
+    assert store.price_at(2, 299.0) is None and store.latest(2) == (300.0, 8.0)
+    assert sorted(store.runners(10)) == [1, 2]
+
+
+class FakeRacingPostAPI:
+    """The provider's card for a day; it knows races by track and off time, never by our ids."""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.asked = []
+
+    def fetch_race_cards(self, day, validators=None):
+        self.asked.append(day)
+        return FetchResult({"racecards": [
+            {"track": "Odds Epsom", "off_time": "14:30",
+             "runners": [{"name": name, "odds": odds} for name, odds in self.prices.items()]},
+            # Same names at another meeting; none of these prices may land on our runners
+            {"track": "Odds Chester", "off_time": "14:30",
+             "runners": [{"name": name, "odds": 50.0} for name in self.prices]},
+        ]}, Validators())
+
+    def get_race_details(self, race_id):
+        raise AssertionError(f"The provider has no race {race_id}")
+
+
+@pytest.fixture
+def race_near_off():
+    db = SessionLocal()
+    race = models.Race(race_date=datetime(2043, 5, 1), track="Odds Epsom", off_time="14:30", race_type="Flat")
+    race.horses = [models.Horse(name="Odds Drifter", odds=3.0), models.Horse(name="Odds Steamer", odds=8.0)]
+    later = models.Race(race_date=datetime(2043, 5, 1), track="Odds Epsom", off_time="16:30", race_type="Flat")
+    db.add_all([race, later])
+    db.commit()
+    ids = race.id, {horse.name: horse.id for horse in race.horses}
+    db.close()
+    return ids
+
+
+def test_poll_records_races_near_the_off_and_flushes_ticks(race_near_off, monkeypatch):
+    race_id, horse_ids = race_near_off
+    api = FakeRacingPostAPI({"Odds Drifter": 3.0, "Odds Steamer": 8.0})
+    tracker = OddsTracker(SessionLocal, api=api, store=OddsStore(capacity=16))
+    tracker.cancel_threshold = 20.0
+    db = SessionLocal()
+
+    assert tracker.poll_once(db, now=datetime(2043, 5, 1, 14, 10)) == 2
+    api.prices = {"Odds Drifter": 4.0, "Odds Steamer": 7.0}
+    tracker.poll_once(db, now=datetime(2043, 5, 1, 14, 11))
+    flushed = tracker.flush(db)
+
+    # One card fetch per poll for the day, not one request per race
+    assert api.asked == [datetime(2043, 5, 1).date()] * 2
+    assert flushed == 4
+    ticks = db.query(models.OddsTick).filter(models.OddsTick.race_id == race_id).order_by(models.OddsTick.id).all()
+    assert [(tick.horse_id, tick.odds) for tick in ticks][-2:] == [(horse_ids["Odds Drifter"], 4.0), (horse_ids["Odds Steamer"], 7.0)]
+    assert db.get(models.Horse, horse_ids["Odds Drifter"]).odds == 4.0
+    db.close()
+
+    monkeypatch.setattr(main, "odds_tracker", tracker)
+    drift = client.get(f"/odds/{horse_ids['Odds Drifter']}/drift", params={"minutes": 5}).json()
+    race = {row["horse_id"]: row for row in client.get(f"/races/{race_id}/odds-drift").json()}
+    assert (drift["previous_odds"], drift["odds"], drift["cancel"]) == (3.0, 4.0, True)
+    assert race[horse_ids["Odds Steamer"]]["cancel"] is False
+    assert client.get("/odds/999999/drift").status_code == 404
+
+
+def test_failed_flush_requeues_its_ticks():
+    class BrokenSession:
+        def execute(self, *args):
+            raise RuntimeError("database is down")
+
+        def rollback(self):
+            pass
+
+    tracker = OddsTracker(SessionLocal, api=FakeRacingPostAPI({}), store=OddsStore(max_pending=3))
+    for n in range(3):
+        tracker.store.record(1, 1, 2.0 + n, at=float(n))
+
+    with pytest.raises(RuntimeError):
+        tracker.flush(BrokenSession())
+    tracker.store.record(1, 1, 9.0, at=10.0)
+
+    assert [tick[2] for tick in tracker.store.drain()] == [3.0, 4.0, 9.0]
+    assert tracker.store.dropped == 1
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.pagination import decode_cursor, encode_cursor
+
+client = TestClient(main.app)
+
+
+@pytest.fixture(scope="module")
+def paged_races():
+    db = SessionLocal()
+    start = datetime(2034, 3, 1, 13, 0)
+    races = []
+    for i in range(7):
+        race = models.Race(
+            race_date=start + timedelta(days=i // 2, hours=i % 2), track="Paging Downs",
+            off_time=f"{13 + i % 2}:00", race_type="Chase" if i % 3 else "Flat", distance=1600,
+        )
+        race.horses = [models.Horse(name=f"Pager {i}-{n}", odds=2.0 + n) for n in range(3)]
+        races.append(race)
+    db.add_all(races)
+    db.commit()
+    ids = [race.id for race in sorted(races, key=lambda race: (race.race_date, race.id))]
+    db.close()
+    return ids
+
+
+def walk(path: str, params: dict) -> list:
+    pages = []
+    while True:
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page["items"])
+        if not page["next_cursor"]:
+            return pages
+        params = {**params, "cursor": page["next_cursor"]}
+
+
+def test_races_walk_every_row_once_in_keyset_order(paged_races):
+    pages = walk("/races", {"track": "Paging Downs", "limit": 3})
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [race["id"] for page in pages for race in page] == paged_races
+
+
+def test_races_filters_and_sparse_fields(paged_races):
+    response = client.get("/races", params={
+        "track": "Paging Downs", "race_type": "Flat", "date_from": "2034-03-02",
+        "date_to": "2034-03-04", "fields": "id,race_type",
+    })
+
+    items = response.json()["items"]
+    assert items == [{"id": paged_races[3], "race_type": "Flat"}, {"id": paged_races[6], "race_type": "Flat"}]
+
+
+def test_horses_page_by_race_filters(paged_races):
+    pages = walk("/horses", {"track": "Paging Downs", "date_to": "2034-03-01", "limit": 4, "fields": "name"})
+
+    names = [horse["name"] for page in pages for horse in page]
+    assert len(names) == 6
+    assert all(set(horse) == {"name"} for page in pages for horse in page)
+
+
+def test_bad_cursor_and_unknown_field_are_rejected():
+    assert client.get("/races", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/races", params={"fields": "id,secret"}).status_code == 400
+    assert client.get("/races", params={"limit": 0}).status_code == 422
+
+
+def test_cursor_round_trips_datetimes():
+    columns = [models.Race.race_date, models.Race.id]
+    token = encode_cursor([datetime(2034, 3, 1, 13, 0), 42])
+
+    assert decode_cursor(token, columns) == [datetime(2034, 3, 1, 13, 0), 42]
+
+
+def test_race_date_cannot_be_cleared(paged_races):
+    response = client.put(f"/races/{paged_races[0]}", json={"race_date": None})
+
+    assert response.status_code == 422
+    pages = walk("/races", {"track": "Paging Downs", "limit": 2})
+    assert [item["id"] for page in pages for item in page] == paged_races
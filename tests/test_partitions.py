@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.services.partitions import PartitionManager, create_partition_sql, month_start
+
+client = TestClient(main.app)
+
+
+def add_race(race_date: datetime, track: str, runners: int = 2, bets: int = 1) -> int:
+    db = SessionLocal()
+    race = models.Race(race_date=race_date, track=track, off_time="14:00", race_type="Flat", distance=1600)
+    race.horses = [models.Horse(name=f"{track} {n}", odds=2.0 + n) for n in range(runners)]
+    race.analysis = models.RaceAnalysis(winner_prediction=f"{track} 0", confidence_score=60.0)
+    db.add(race)
+    db.flush()
+    db.add_all(
+        models.Bet(race_id=race.id, horse_id=race.horses[0].id, stake=5.0, odds=2.0, placed_at=race_date)
+        for _ in range(bets)
+    )
+    db.commit()
+    race_id = race.id
+    db.close()
+    return race_id
+
+
+def test_partitions_span_one_calendar_month():
+    assert month_start(datetime(2031, 12, 17, 9, 30), 1) == datetime(2032, 1, 1)
+    assert month_start(datetime(2031, 1, 5), -13) == datetime(2029, 12, 1)
+    assert create_partition_sql("bets", datetime(2031, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS bets_p203112 PARTITION OF bets "
+        "FOR VALUES FROM ('2031-12-01') TO ('2032-01-01')"
+    )
+
+
+def test_runners_carry_their_race_date():
+    race_id = add_race(datetime(2037, 6, 2, 15, 0), "Partition Park")
+    db = SessionLocal()
+    # Added by id only: the race date is looked up at insert time
+    db.add(models.Horse(race_id=race_id, name="Late Entry"))
+    db.commit()
+    assert {horse.race_date for horse in db.query(models.Horse).filter(models.Horse.race_id == race_id)} == {
+        datetime(2037, 6, 2, 15, 0)
+    }
+    db.close()
+
+    response = client.put(f"/races/{race_id}", json={"race_date": "2037-07-09T15:00:00"})
+
+    assert response.status_code == 200
+    db = SessionLocal()
+    assert {horse.race_date for horse in db.query(models.Horse).filter(models.Horse.race_id == race_id)} == {
+        datetime(2037, 7, 9, 15, 0)
+    }
+    db.close()
+
+
+def test_retention_removes_whole_months_before_the_cutoff():
+    expired = add_race(datetime(1990, 1, 20, 14, 0), "Retention Downs")
+    kept = add_race(datetime(1990, 3, 2, 14, 0), "Retention Downs")
+    db = SessionLocal()
+
+    result = PartitionManager(SessionLocal).drop_before(db, datetime(1990, 3, 25))
+    db.commit()
+
+    assert result == {"partitions_dropped": 0, "races_deleted": 1}
+    assert db.get(models.Race, expired) is None
+    assert db.query(models.Horse).filter(models.Horse.race_id == expired).count() == 0
+    assert db.query(models.Bet).filter(models.Bet.race_id == expired).count() == 0
+    assert db.query(models.RaceAnalysis).filter(models.RaceAnalysis.race_id == expired).count() == 0
+    assert db.query(models.Horse).filter(models.Horse.race_id == kept).count() == 2
+    assert db.query(models.Bet).filter(models.Bet.race_id == kept).count() == 1
+    db.close()
+
+
+def test_maintenance_creates_nothing_without_postgres():
+    assert PartitionManager(SessionLocal, retention_months=None).run_once() == {"created": []}
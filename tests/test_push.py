@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from src.app import main
+from src.app.services.http_client import FetchResult, Validators
+from src.app.services.push import Message, PushHub, Subscriber
+
+client = TestClient(main.app)
+
+
+def odds_message(race_id, odds):
+    return Message({"type": "odds", "race_id": race_id, "odds": odds}, {("race_id", race_id)}, key=("odds", race_id))
+
+
+def test_queued_odds_coalesce_and_a_full_queue_asks_for_a_resync():
+    subscriber = Subscriber(max_queue=2)
+
+    assert subscriber.offer(odds_message(1, {1: 3.0, 2: 5.0})) == "queued"
+    assert subscriber.offer(odds_message(1, {1: 3.5})) == "coalesced"
+    assert subscriber.take() == ['{"type":"odds","race_id":1,"odds":{"1":3.5,"2":5.0}}']
+
+    for race_id in (1, 2):
+        subscriber.offer(odds_message(race_id, {1: 2.0}))
+    assert subscriber.offer(odds_message(3, {1: 2.0})) == "dropped"
+    subscriber.offer(odds_message(4, {1: 2.0}))
+    assert subscriber.take() == ['{"type": "resync", "dropped": 3}', '{"type":"odds","race_id":4,"odds":{"1":2.0}}']
+
+
+def test_race_card_changes_reach_date_subscribers(monkeypatch):
+    cards = [{"race_time": "13:30", "race_track": "Push Ayr", "race_type": "Flat", "horses": [{"name": "Push Runner", "odds": 3.0}]}]
+
+    class Source:
+        def fetch_race_cards(self, day, validators=None):
+            return FetchResult(cards, Validators())
+
+    monkeypatch.setitem(main.race_card_sources, "racing_api", Source())
+    with client.websocket_connect("/ws?date=2044-03-01&track=Elsewhere") as ws:
+        assert ws.receive_json() == {"type": "subscribed", "date": ["2044-03-01"], "track": ["elsewhere"], "race_id": []}
+        races = client.get("/race-cards", params={"date": "2044-03-01", "source": "racing_api"}).json()
+        message = ws.receive_json()
+
+    assert message == {
+        "type": "race_card", "race_id": races[0]["id"], "date": "2044-03-01", "track": "Push Ayr", "off_time": "13:30",
+        "changes": [{"change_type": "race_added"}],
+    }
+
+
+def test_clients_change_topics_over_the_socket():
+    with client.websocket_connect("/ws") as ws:
+        assert ws.receive_json()["race_id"] == []
+        ws.send_json({"action": "subscribe", "race_id": [41, 42], "track": "Push Kempton"})
+        assert ws.receive_json() == {"type": "subscribed", "date": [], "track": ["push kempton"], "race_id": [41, 42]}
+        ws.send_json({"action": "unsubscribe", "race_id": 42})
+        assert ws.receive_json()["race_id"] == [41]
+        ws.send_json({"action": "subscribe", "date": "not a date"})
+        assert ws.receive_json()["type"] == "error"
+
+        main.push_hub.publish("odds", 42, datetime(2044, 3, 2), "Push Sandown", odds={7: 4.0})
+        main.push_hub.publish("odds", 43, datetime(2044, 3, 2), "Push Kempton", odds={8: 6.0})
+        message = ws.receive_json()
+
+    assert message == {"type": "odds", "race_id": 43, "date": "2044-03-02", "track": "Push Kempton", "odds": {"8": 6.0}}
+    assert main.push_hub.metrics()["subscribers"] == 0
+
+
+def test_a_client_that_stops_reading_is_disconnected():
+    class StalledSocket:
+        closed_with = None
+
+        async def send_text(self, text):
+            await asyncio.sleep(10)
+
+        async def receive_json(self):
+            await asyncio.sleep(10)
+
+        async def close(self, code):
+            self.closed_with = code
+
+    hub = PushHub(send_timeout=0.05)
+    socket = StalledSocket()
+
+    async def connect_and_publish():
+        connection = asyncio.create_task(hub.serve(socket, {("race_id", 1)}))
+        await asyncio.sleep(0.1)
+        # The stuck send is noticed when the next message for the client arrives
+        hub.publish("odds", 1, None, None, odds={1: 2.0})
+        await connection
+
+    asyncio.run(connect_and_publish())
+
+    assert socket.closed_with == 1013
+    assert hub.metrics() == {
+        "published": 1, "delivered": 0, "coalesced": 0, "dropped": 0, "slow_disconnects": 1,
+        "subscribers": 0, "topics": 0, "queued": 0,
+    }
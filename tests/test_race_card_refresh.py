@@ -0,0 +1,146 @@
+import copy
+import json
+from datetime import date, datetime
+
+from fastapi.testclient import TestClient
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.services.http_client import FetchResult, Validators
+from src.app.services.race_card_refresh import diff_cards, snapshot_cards
+from src.app.services.racing_api import RacingAPI
+
+client = TestClient(main.app)
+
+CARDS = [
+    {
+        "race_time": "13:30", "race_track": "Refresh Ayr", "race_type": "Flat",
+        "horses": [
+            {"name": "Golden Eagle", "jockey": "John Smith", "trainer": "Bob Brown", "odds": 3.5},
+            {"name": "Silver Streak", "jockey": "Mike Johnson", "trainer": "Sarah Green", "odds": 2.5},
+        ],
+    },
+    {
+        "race_time": "14:05", "race_track": "Refresh Ascot", "race_type": "Hurdle",
+        "horses": [{"name": "Bronze Bolt", "jockey": "Tom Wilson", "trainer": "David White", "odds": 6.0}],
+    },
+]
+
+
+def updated_cards():
+    """Golden Eagle drifts, Silver Streak is scratched and a 15:10 race is added."""
+    cards = copy.deepcopy(CARDS)
+    cards[0]["horses"] = [{**cards[0]["horses"][0], "odds": 4.0}]
+    cards.append({"race_time": "15:10", "race_track": "Refresh Ascot", "race_type": "Chase", "horses": []})
+    return cards
+
+
+class FakeSource:
+    """Serves `pages` in turn with ETag "v<n>", answering 304 while the client's ETag is current."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.page = 0
+        self.sent = []
+
+    def fetch_race_cards(self, day, validators=None):
+        self.sent.append(validators)
+        etag = f'"v{self.page}"'
+        if validators is not None and validators.etag == etag:
+            return FetchResult(None, validators)
+        return FetchResult(copy.deepcopy(self.pages[self.page]), Validators(etag=etag))
+
+    def publish(self):
+        self.page += 1
+
+
+def test_diff_finds_new_races_scratched_runners_and_odds_moves():
+    changes = diff_cards(snapshot_cards(CARDS), snapshot_cards(updated_cards()))
+
+    assert [(c["change_type"], c["track"], c["off_time"], c["horse_name"], c["old_value"], c["new_value"])
+            for c in changes] == [
+        ("odds_changed", "Refresh Ayr", "13:30", "Golden Eagle", 3.5, 4.0),
+        ("runner_scratched", "Refresh Ayr", "13:30", "Silver Streak", None, None),
+        ("race_added", "Refresh Ascot", "15:10", None, None, None),
+    ]
+    assert diff_cards(snapshot_cards(CARDS), snapshot_cards(copy.deepcopy(CARDS))) == []
+
+
+def test_refresh_sends_validators_and_applies_only_the_delta(monkeypatch):
+    source = FakeSource([CARDS, updated_cards()])
+    monkeypatch.setitem(main.race_card_sources, "racing_api", source)
+    params = {"date": "2042-06-01", "source": "racing_api"}
+
+    first = client.get("/race-cards", params=params)
+    since = client.get("/race-cards/changes", params={"date": "2042-06-01"}).json()["next"]
+    cached = client.get("/race-cards", params=params)
+    source.publish()
+    changed = client.get("/race-cards", params=params)
+
+    assert [json.loads(r.headers["X-Race-Card-Refresh"])["status"] for r in (first, cached, changed)] == [
+        "changed", "not_modified", "changed",
+    ]
+    assert source.sent[0] is None and source.sent[1].etag == source.sent[2].etag == '"v0"'
+    assert len(changed.json()) == 3
+    # Only the Ayr race and the new race were written; the untouched Ascot race counts as unchanged
+    assert json.loads(changed.headers["X-Ingest-Report"])["races"] == {"inserted": 1, "updated": 1, "unchanged": 1}
+
+    db = SessionLocal()
+    horses = {horse.name: horse for horse in db.query(models.Horse).filter(models.Horse.race_date == datetime(2042, 6, 1))}
+    db.close()
+    assert horses["Golden Eagle"].odds == 4.0
+    assert horses["Silver Streak"].scratched_at is not None
+    assert horses["Bronze Bolt"].scratched_at is None
+
+    feed = client.get("/race-cards/changes", params={"since": since}).json()
+    assert [(c["change_type"], c["horse_name"]) for c in feed["changes"]] == [
+        ("odds_changed", "Golden Eagle"), ("runner_scratched", "Silver Streak"), ("race_added", None),
+    ]
+    assert all(c["race_id"] for c in feed["changes"])
+    assert client.get("/race-cards/changes", params={"since": feed["next"]}).json() == {
+        "changes": [], "next": feed["next"],
+    }
+
+
+def test_failed_fetch_does_not_scratch_the_day(monkeypatch):
+    source = FakeSource([CARDS, []])
+    monkeypatch.setitem(main.race_card_sources, "racing_api", source)
+    params = {"date": "2042-06-02", "source": "racing_api"}
+    client.get("/race-cards", params=params)
+    source.publish()
+
+    empty = client.get("/race-cards", params=params)
+
+    assert json.loads(empty.headers["X-Race-Card-Refresh"])["status"] == "empty"
+    assert len(empty.json()) == 2
+    assert client.get("/race-cards/changes", params={"date": "2042-06-02"}).json()["changes"][-1]["change_type"] == "race_added"
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+def test_racing_api_fetch_is_conditional(monkeypatch):
+    api = RacingAPI()
+    sent = []
+    responses = [
+        FakeResponse(200, {"races": [{"race_id": "1", **CARDS[1]}]}, {"ETag": '"abc"', "Last-Modified": "Mon, 01 Jun 2042 09:00:00 GMT"}),
+        FakeResponse(304),
+    ]
+    monkeypatch.setattr(api.session, "get", lambda url, **kwargs: sent.append(kwargs["headers"]) or responses.pop(0))
+
+    fresh = api.fetch_race_cards(date(2042, 6, 1))
+    cached = api.fetch_race_cards(date(2042, 6, 1), fresh.validators)
+
+    assert fresh.data[0]["race_track"] == "Refresh Ascot" and not fresh.not_modified
+    assert cached.not_modified and cached.validators == fresh.validators
+    assert sent == [None, {"If-None-Match": '"abc"', "If-Modified-Since": "Mon, 01 Jun 2042 09:00:00 GMT"}]
@@ -0,0 +1,66 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from src.app import main, models
+from src.app.database import SessionLocal, get_async_engine
+
+client = TestClient(main.app)
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = get_async_engine().sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def add_race(runners: int, with_analysis: bool) -> int:
+    db = SessionLocal()
+    race = models.Race(race_date=datetime(2036, 5, 1, 14, runners), track="Full Card Park",
+                       off_time=f"14:{runners:02d}", race_type="Flat", distance=1600)
+    race.horses = [models.Horse(name=f"Runner {n}", odds=2.0 + n) for n in range(runners)]
+    if with_analysis:
+        race.analysis = models.RaceAnalysis(
+            winner_prediction="Runner 0", confidence_score=70.0, stake_recommendation=50.0,
+            expected_profit=5.0, analysis_reasoning="Form", risk_assessment="LOW",
+        )
+    db.add(race)
+    db.commit()
+    race_id = race.id
+    db.close()
+    return race_id
+
+
+def test_full_race_is_one_query_regardless_of_field_size():
+    small, large = add_race(2, with_analysis=True), add_race(20, with_analysis=True)
+
+    for race_id, runners in ((small, 2), (large, 20)):
+        with count_queries() as statements:
+            response = client.get(f"/races/{race_id}/full")
+
+        assert response.status_code == 200
+        assert len(statements) == 1, statements
+        body = response.json()
+        assert len(body["horses"]) == runners
+        assert body["analysis"]["winner_prediction"] == "Runner 0"
+
+
+def test_full_race_without_analysis_or_runners():
+    race_id = add_race(0, with_analysis=False)
+
+    body = client.get(f"/races/{race_id}/full").json()
+
+    assert body["horses"] == []
+    assert body["analysis"] is None
+    assert client.get("/races/999999/full").status_code == 404
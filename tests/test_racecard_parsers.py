@@ -0,0 +1,21 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.app.services.racecard_parsers import PARSERS, get_parser
+
+CORPUS = sorted((Path(__file__).parent / "fixtures" / "racecards").glob("*.html"))
+
+
+@pytest.mark.parametrize("backend", sorted(PARSERS))
+@pytest.mark.parametrize("page", CORPUS, ids=lambda page: page.stem)
+def test_parser_matches_golden_output(backend, page):
+    expected = json.loads(page.with_suffix(".json").read_text())
+
+    assert get_parser(backend).parse(page.read_text()) == expected
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_parser("regex")
@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.services.settlement import EACH_WAY, PLACE, WIN, paid_shares, parse_position, payout_coefficients, place_terms
+
+client = TestClient(main.app)
+
+DAY = datetime(2045, 5, 1)
+
+
+def test_place_terms_and_dead_heats():
+    assert [place_terms(n) for n in (4, 5, 7, 8, 16)] == [(0, 0.0), (2, 0.25), (2, 0.25), (3, 0.2), (3, 0.2)]
+    assert place_terms(12, handicap=True) == (3, 0.25) and place_terms(16, handicap=True) == (4, 0.25)
+    assert [parse_position(value) for value in (1, "2", "3=", "PU", "NR", None)] == [
+        (1, False), (2, False), (3, False), (None, False), (None, True), (None, False),
+    ]
+
+    # Dead heat for first: each winner is paid half, both place in full; two tie for the last of three places
+    positions = np.array([1, 1, 3, 3, np.nan])
+    np.testing.assert_allclose(paid_shares(positions, 1), [0.5, 0.5, 0, 0, 0])
+    np.testing.assert_allclose(paid_shares(positions, 3), [1, 1, 0.5, 0.5, 0])
+
+
+def test_payout_coefficients_for_every_bet_type():
+    bet_type = np.array([WIN, WIN, PLACE, PLACE, EACH_WAY, EACH_WAY, EACH_WAY, WIN])
+    win = np.array([1.0, 0.0, 1.0, 0.0, 1.0, 0.0, 0.0, 1.0])
+    place = np.array([1.0, 1.0, 1.0, 0.0, 1.0, 1.0, 0.0, 1.0])
+    void = np.array([False] * 7 + [True])
+    a, b = payout_coefficients(bet_type, win, place, np.full(8, 0.2), void)
+
+    # 10 staked at 6.0: the place part pays a fifth of the odds
+    returns = 10 * (a * 6.0 + b)
+    np.testing.assert_allclose(returns, [60, 0, 20, 0, 40, 10, 0, 10])
+
+
+def add_race(db, off_time, race_type, runners, race_date=DAY):
+    race = models.Race(race_date=race_date, track="Settle Ascot", off_time=off_time, race_type=race_type)
+    race.horses = [models.Horse(name=name, race_date=race_date) for name in runners]
+    db.add(race)
+    db.flush()
+    return race, {horse.name: horse.id for horse in race.horses}
+
+
+def test_results_settle_pending_bets_and_the_bankroll(monkeypatch):
+    db = SessionLocal()
+    first, a = add_race(db, "14:00", "Flat", [f"Alpha {n}" for n in range(1, 9)])
+    # Created through POST /races with its off in race_date; still the same day
+    second, b = add_race(db, "15:00", "Handicap", [f"Bravo {n}" for n in range(1, 6)], DAY.replace(hour=15))
+    bankroll = models.Bankroll(current_amount=1000.0, initial_amount=1000.0)
+    db.add(bankroll)
+    bets = [
+        (first, a["Alpha 1"], "WIN", 10, 5.0),
+        (first, a["Alpha 2"], "PLACE", 10, 9.0),
+        (first, a["Alpha 1"], "EACH_WAY", 20, 5.0),
+        (first, a["Alpha 3"], "EACH_WAY", 20, 11.0),
+        (first, a["Alpha 8"], "WIN", 10, 3.0),
+        (first, a["Alpha 4"], "WIN", 5, 4.0),
+        (second, b["Bravo 3"], "WIN", 100, 3.0),
+        (second, b["Bravo 1"], "WIN", 10, 4.0),
+    ]
+    db.add_all([
+        models.Bet(race_id=race.id, horse_id=horse_id, bet_type=bet_type, stake=stake, odds=odds, result="PENDING",
+                   placed_at=DAY)
+        for race, horse_id, bet_type, stake, odds in bets
+    ])
+    settled_already = models.Bet(race_id=first.id, horse_id=a["Alpha 4"], bet_type="WIN", stake=5, odds=4.0,
+                                 result="WON", profit=99.0, placed_at=DAY)
+    db.add(settled_already)
+    db.commit()
+
+    results = [
+        {"race_track": "Settle Ascot", "race_time": "14:00", "runners": [
+            {"name": "Alpha 1", "position": 1}, {"name": "Alpha 2", "position": "2"}, {"name": "Alpha 3", "position": 3},
+            {"name": "Alpha 4", "position": "PU"}, {"name": "Alpha 5", "position": 4}, {"name": "Alpha 6", "position": 5},
+            {"name": "Alpha 7", "position": 6}, {"name": "Alpha 8", "position": "NR"},
+        ]},
+        {"track": "Settle Ascot", "off_time": "15:00", "runners": [
+            {"name": "Bravo 1", "position": "1="}, {"name": "Bravo 2", "position": "1="}, {"name": "Bravo 3", "position": 3},
+        ]},
+        {"track": "Settle Ayr", "off_time": "16:00", "runners": []},
+    ]
+
+    class Source:
+        def fetch_results(self, day):
+            return results
+
+    monkeypatch.setitem(main.results_sources, "racing_api", Source())
+    report = client.post(f"/results/{DAY.date()}/settle", params={"source": "racing_api"}).json()
+    again = client.post(f"/results/{DAY.date()}/settle", params={"source": "racing_api"}).json()
+
+    # Alpha 8 didn't run, leaving seven: two places at 1/4, so Alpha 3's each-way bet loses.
+    # Race one makes 40 + 20 + 50 - 20 + 0 - 5 = 85; race two loses 100 and wins half of 40 on the dead heat
+    assert report == {
+        "status": "settled", "races_resulted": 2, "unmatched": ["Settle Ayr|16:00"], "races_settled": 2,
+        "bets_settled": 8, "won": 4, "lost": 3, "void": 1, "staked": 185.0, "returns": 180.0, "profit": -5.0,
+        "bankroll": 995.0, "max_drawdown": pytest.approx(90 / 1085 * 100, abs=1e-3),
+    }
+    assert (again["races_resulted"], again["bets_settled"], again["bankroll"]) == (2, 0, 995.0)
+
+    db.expire_all()
+    stored = {bet.id: (bet.result, bet.profit) for bet in db.query(models.Bet).filter(models.Bet.placed_at == DAY)}
+    assert sorted(result for result, _ in stored.values()) == ["LOST"] * 3 + ["VOID"] + ["WON"] * 5
+    assert stored[settled_already.id] == ("WON", 99.0)
+    assert sum(profit for bet_id, (_, profit) in stored.items() if bet_id != settled_already.id) == pytest.approx(-5.0)
+    horses = {horse.name: horse for horse in db.query(models.Horse).filter(models.Horse.race_id == first.id)}
+    assert [horses[f"Alpha {n}"].finish_position for n in (1, 3, 4, 8)] == [1, 3, None, None]
+    assert horses["Alpha 8"].scratched_at is not None and db.get(models.Race, first.id).result_at is not None
+    bankroll = db.get(models.Bankroll, bankroll.id)
+    assert (bankroll.current_amount, bankroll.peak_amount) == (pytest.approx(995.0), pytest.approx(1085.0))
+
+    db.delete(bankroll)
+    db.commit()
+    db.close()
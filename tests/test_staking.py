@@ -0,0 +1,105 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.services.staking import (
+    BELOW_CONFIDENCE, CORRELATION, MAX_STAKE, NO_EDGE, STOP_LOSS, RiskLimits, current_bankroll, stake_plan,
+)
+
+client = TestClient(main.app)
+
+LIMITS = RiskLimits(confidence_threshold=30.0, max_stake_percentage=5.0, correlation_threshold=6.0)
+
+
+def test_fractional_kelly_with_per_bet_cap_and_confidence_floor():
+    plan = stake_plan(
+        probability=[0.5, 0.4, 0.2, 0.3],
+        odds=[3.0, 3.0, 10.0, 2.0],
+        group=[1, 2, 3, 4],
+        bankroll=1000.0,
+        limits=LIMITS,
+    )
+
+    np.testing.assert_allclose(plan["kelly"], [0.25, 0.1, 1 / 9, 0.0])
+    # Quarter Kelly: 6.25% capped to 5%, 2.5%, then no bet below 30% confidence or without an edge
+    assert plan["stake"].tolist() == [50.0, 25.0, 0.0, 0.0]
+    assert plan["limits"].tolist() == [MAX_STAKE, 0, BELOW_CONFIDENCE, NO_EDGE]
+    np.testing.assert_allclose(plan["expected_profit"], [25.0, 5.0, 0.0, 0.0])
+
+
+def test_runners_in_one_race_share_the_correlation_limit():
+    plan = stake_plan([0.5, 0.4, 0.4], [3.0, 3.0, 3.0], [7, 7, 8], 1000.0, LIMITS)
+
+    # Race 7 wanted 50 + 25 = 75, scaled down to 6% of the bankroll
+    assert plan["stake"].tolist() == [40.0, 20.0, 25.0]
+    assert plan["limits"].tolist() == [MAX_STAKE | CORRELATION, CORRELATION, 0]
+
+
+def test_plan_is_scaled_into_the_stop_loss_budget():
+    scaled = stake_plan([0.5, 0.4], [3.0, 3.0], [1, 2], 1000.0, LIMITS, loss_budget=30.0)
+    halted = stake_plan([0.5, 0.4], [3.0, 3.0], [1, 2], 1000.0, LIMITS, loss_budget=-5.0)
+
+    assert scaled["stake"].tolist() == [20.0, 10.0]
+    assert scaled["limits"].tolist() == [MAX_STAKE | STOP_LOSS, STOP_LOSS]
+    assert halted["stake"].tolist() == [0.0, 0.0]
+
+
+@pytest.fixture
+def losing_day():
+    """A 2% daily stop-loss and 25 already lost on 5 March 2041."""
+    db = SessionLocal()
+    risk = models.RiskParameter(confidence_threshold=30.0, max_stake_percentage=5.0, correlation_threshold=10.0,
+                                stop_loss_daily=2.0)
+    race = models.Race(race_date=datetime(2041, 3, 5, 13, 0), track="Staking Cheltenham", off_time="13:00",
+                       race_type="Hurdle", distance=3200)
+    race.horses = [models.Horse(name="Staking Loser", jockey="J", trainer="T", odds=5.0)]
+    db.add_all([risk, race])
+    db.flush()
+    bet = models.Bet(race_id=race.id, horse_id=race.horses[0].id, stake=25.0, odds=5.0, bet_type="WIN",
+                     placed_at=datetime(2041, 3, 5, 12, 0), result="LOST", profit=-25.0)
+    db.add(bet)
+    db.commit()
+    yield
+    db.delete(bet)
+    db.delete(race)
+    db.delete(risk)
+    db.commit()
+    db.close()
+
+
+def test_stop_loss_halts_the_day(losing_day):
+    db = SessionLocal()
+    candidates = [{"race_id": 1, "horse_id": 1, "odds": 3.0, "probability": 0.5}]
+    halted = main.staking_service.plan(db, candidates, now=datetime(2041, 3, 5, 15, 0))
+    next_day = main.staking_service.plan(db, candidates, now=datetime(2041, 3, 6, 15, 0))
+    db.close()
+
+    assert halted["halted"] and halted["total_stake"] == 0.0
+    assert halted["exposure"]["pnl_today"] == -25.0
+    assert halted["bets"][0]["limits"] == ["max_stake", "stop_loss"]
+    assert not next_day["halted"] and next_day["total_stake"] > 0.0
+
+
+def test_plan_endpoint_builds_candidates_from_the_days_analyses():
+    db = SessionLocal()
+    race = models.Race(race_date=datetime(2041, 4, 9, 14, 0), track="Staking Aintree", off_time="14:00",
+                       race_type="Chase", distance=4000)
+    race.horses = [models.Horse(name="Staking Fancy", jockey="J", trainer="T", odds=3.0),
+                   models.Horse(name="Staking Outsider", jockey="J", trainer="T", odds=20.0)]
+    race.analysis = models.RaceAnalysis(winner_prediction="Staking Fancy", confidence_score=60.0)
+    db.add(race)
+    db.commit()
+    bankroll = current_bankroll(db)
+    db.close()
+
+    plan = client.post("/staking/plan", json={"race_date": "2041-04-09"}).json()
+
+    [bet] = plan["bets"]
+    assert (bet["probability"], bet["odds"], bet["kelly"]) == (0.6, 3.0, pytest.approx(0.4))
+    assert bet["stake"] == pytest.approx(bankroll * 0.05)
+    assert bet["limits"] == ["max_stake"]
+    assert client.post("/staking/plan", json={}).status_code == 422
@@ -0,0 +1,112 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import main, models
+from src.app.database import SessionLocal
+from src.app.services.claude_service import ClaudeService, RaceAnalysisRequest, RaceAnalysisResponse
+from src.app.services.streaming_json import IncrementalJSONParser
+
+REQUEST = RaceAnalysisRequest(
+    race={"track": "Ayr", "distance": 1600},
+    horses=[{"name": "Golden Eagle", "odds": 3.5}, {"name": "Silver Streak", "odds": 2.5}],
+)
+DOCUMENT = json.dumps({
+    "winner": "Golden \"Goldie\" Eagle",
+    "confidence": 72.5,
+    "notes": {"draw": [1, {"bias": "}"}]},
+    "each_way": False,
+    "reasoning": "Won over {course} and distance, \\ unbeaten",
+})
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64, len(DOCUMENT)])
+def test_incremental_parser_matches_json_loads_for_any_chunking(chunk_size):
+    parser = IncrementalJSONParser()
+    seen = {}
+    for i in range(0, len(DOCUMENT), chunk_size):
+        seen.update(parser.feed(DOCUMENT[i:i + chunk_size]))
+
+    assert seen == json.loads(DOCUMENT)
+    assert parser.complete
+
+
+def test_incremental_parser_emits_fields_before_the_object_closes():
+    parser = IncrementalJSONParser()
+
+    assert parser.feed('{"winner": "Golden Eagle", "confidence": 7') == {"winner": "Golden Eagle"}
+    assert parser.feed('2.5, "reasoning": "Strong rec') == {"confidence": 72.5}
+    assert parser.feed('ent form"}') == {"reasoning": "Strong recent form"}
+
+
+def test_tool_use_reply_is_mapped_without_fallback(fake_anthropic):
+    service = ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url)
+
+    analysis = service.analyze_request(REQUEST)
+
+    assert fake_anthropic.requests[0]["tool_choice"] == {"type": "tool", "name": "record_race_analysis"}
+    assert analysis.winner_prediction == "Golden Eagle"
+    assert analysis.risk_assessment == "MEDIUM"
+    assert service.parse_stats == {"tool_use": 1, "json_text": 0, "fallback": 0}
+
+
+def test_text_reply_with_nested_braces_still_parses(fake_anthropic):
+    fake_anthropic.text_reply = (
+        'Analysis: {"winner": "Silver Streak", "confidence": 80, '
+        '"sectionals": {"last_2f": 23.1}, "reasoning": "Quickest finisher"} Good luck!'
+    )
+    service = ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url)
+
+    analysis = service.analyze_request(REQUEST)
+
+    assert analysis.winner_prediction == "Silver Streak"
+    assert analysis.analysis_reasoning == "Quickest finisher"
+    assert service.parse_stats["json_text"] == 1
+
+
+def test_unparseable_reply_is_counted_as_fallback(fake_anthropic):
+    fake_anthropic.text_reply = "I would not bet on this race."
+    service = ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url)
+
+    analysis = service.analyze_request(REQUEST)
+
+    assert analysis.winner_prediction == "Unknown"
+    assert service.parse_stats["fallback"] == 1
+
+
+def test_stream_analysis_yields_headline_fields_before_reasoning(fake_anthropic):
+    service = ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url, requests_per_minute=6000)
+
+    async def collect():
+        return [item async for item in service.stream_analysis(REQUEST, race_id=1)]
+
+    items = asyncio.run(collect())
+
+    fields = [field for field, _ in items]
+    assert fields[0] == "winner"
+    assert fields.index("confidence") < fields.index("reasoning") < fields.index("analysis")
+    assert isinstance(items[-1][1], RaceAnalysisResponse)
+    assert service.usage.report()["totals"]["calls"] == 1
+
+
+def test_stream_endpoint_persists_the_final_analysis(fake_anthropic, monkeypatch):
+    service = ClaudeService(api_key="test-key", base_url=fake_anthropic.base_url, requests_per_minute=6000)
+    monkeypatch.setattr(main, "claude_service", service)
+    db = SessionLocal()
+    race = models.Race(race_date=datetime(2033, 2, 1, 14, 0), track="Stream Ayr", off_time="14:00", race_type="Flat", distance=1600)
+    race.horses = [models.Horse(name="Golden Eagle", odds=3.5)]
+    db.add(race)
+    db.commit()
+
+    response = TestClient(main.app).get(f"/races/{race.id}/analysis/stream")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {"field": "winner", "value": "Golden Eagle"}
+    assert lines[-1]["field"] == "analysis"
+    assert lines[-1]["value"]["race_id"] == race.id
+    assert db.query(models.RaceAnalysis).filter(models.RaceAnalysis.race_id == race.id).count() == 1
+    assert TestClient(main.app).get("/analysis-parse/stats").json()["fallback_rate"] == 0.0
+    db.close()
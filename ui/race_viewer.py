@@ -59,6 +59,11 @@ class RaceViewer:
         # Add status label
         self.status_label = ttk.Label(self.buttons_frame, text="")
         self.status_label.grid(row=0, column=1, padx=5)
+
+        # Last race cards and their validators, so an unchanged day costs a 304
+        self.session = requests.Session()
+        self.racecards = []
+        self.validators = {}
         
         # Load data
         self.refresh_data()
@@ -104,10 +109,18 @@ class RaceViewer:
                 'region_codes': ['gb', 'ire']
             }
             
-            response = requests.get(url, auth=auth, params=params)
+            response = self.session.get(url, auth=auth, params=params, headers=self.validators)
+            if response.status_code == 304:
+                return self.racecards
             response.raise_for_status()
-            
-            return response.json()['racecards']
+
+            self.racecards = response.json()['racecards']
+            self.validators = {}
+            if response.headers.get('ETag'):
+                self.validators['If-None-Match'] = response.headers['ETag']
+            if response.headers.get('Last-Modified'):
+                self.validators['If-Modified-Since'] = response.headers['Last-Modified']
+            return self.racecards
             
         except Exception as e:
             print(f"Error fetching race data: {e}")